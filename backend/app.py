@@ -3,26 +3,106 @@ Hindi-Speaking AI Assistant - Main Application
 FastAPI backend for Hindi speech-to-text, response generation, and text-to-speech
 """
 
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
-from config import APP_TITLE, APP_DESCRIPTION, APP_VERSION, CORS_ORIGINS
-from routes import system, audio
+from config import (
+    APP_TITLE, APP_DESCRIPTION, APP_VERSION, CORS_ORIGINS, WARMUP_ENABLED, WARMUP_PHRASES,
+    ADMISSION_ENABLED, ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_MAX_QUEUE_WAIT, ADMISSION_PATHS,
+    MAX_UPLOAD_SIZE, UPLOAD_PATHS,
+    validate_settings, ensure_directories
+)
+from middleware.admission import AdmissionController, AdmissionControlMiddleware
+from middleware.upload_limit import UploadLimitMiddleware
+from routes import system, audio, jobs, voice
+from services.warmup import warm_up
+from utils.metrics import HTTPMetricsMiddleware, REGISTRY
+from utils.timing import StageTimer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Time spent importing the application and its routes, reported at startup
+IMPORT_MS = (time.perf_counter() - _import_started) * 1000
+
+
+async def _warm_up_in_background(report: dict):
+    """Run the warmup and attach its outcome to the startup report"""
+    report["warmup"] = await warm_up(audio.backends, audio.tts_service, WARMUP_PHRASES)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the services and start background work; stop it again on shutdown"""
+    logger.info(f"🚀 Starting {APP_TITLE} v{APP_VERSION}")
+
+    timer = StageTimer(record_metrics=False)
+    with timer.stage("config"):
+        validate_settings()
+        ensure_directories()
+    with timer.stage("services"):
+        audio.init_services()
+        jobs.init_services()
+    with timer.stage("background"):
+        audio.janitor.start()
+        await jobs.job_manager.start()
+
+    stages = {"import": IMPORT_MS, **timer.stages}
+    app.state.startup = {
+        "stages_ms": {name: round(ms, 2) for name, ms in stages.items()},
+        "total_ms": round(sum(stages.values()), 2),
+        "warmup": "running" if WARMUP_ENABLED else None
+    }
+    logger.info(
+        f"⏱️  Ready in {app.state.startup['total_ms']:.0f} ms ("
+        + ", ".join(f"{name} {ms:.0f} ms" for name, ms in stages.items()) + ")"
+    )
+    logger.info(f"📚 API Documentation: http://localhost:8000/docs")
+
+    warmup_task = asyncio.create_task(_warm_up_in_background(app.state.startup)) if WARMUP_ENABLED else None
+
+    yield
+
+    logger.info("🛑 Shutting down application")
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    await jobs.job_manager.stop()
+    await audio.janitor.stop()
+    audio.audio_transcoder.shutdown()
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title=APP_TITLE,
     description=APP_DESCRIPTION,
     version=APP_VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Shed pipeline requests the server cannot start soon (inside CORS, so browsers can read the 503)
+admission = AdmissionController(
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    max_queue_wait=ADMISSION_MAX_QUEUE_WAIT
+) if ADMISSION_ENABLED else None
+app.state.admission = admission
+if admission is not None:
+    app.add_middleware(AdmissionControlMiddleware, controller=admission, paths=ADMISSION_PATHS)
+
+# Turn away uploads that declare an oversized body before it is spooled (and before they queue)
+app.add_middleware(UploadLimitMiddleware, max_size=MAX_UPLOAD_SIZE, paths=UPLOAD_PATHS)
+
 # Configure CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -32,22 +112,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, latency and bytes per route for /metrics
+app.add_middleware(HTTPMetricsMiddleware)
+
 # Register routers
 app.include_router(system.router)
 app.include_router(audio.router)
+app.include_router(jobs.router)
+app.include_router(voice.router)
 
-
-@app.on_event("startup")
-async def startup_event():
-    """Execute on application startup"""
-    logger.info(f"🚀 Starting {APP_TITLE} v{APP_VERSION}")
-    logger.info(f"📚 API Documentation: http://localhost:8000/docs")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Execute on application shutdown"""
-    logger.info("🛑 Shutting down application")
+REGISTRY.register_collector(
+    "hindi_startup_duration_seconds", "gauge", "Time spent in each startup phase of this process",
+    lambda: [
+        ({"phase": name}, round(ms / 1000, 6))
+        for name, ms in getattr(app.state, "startup", {}).get("stages_ms", {}).items()
+    ]
+)
+REGISTRY.register_collector(
+    "hindi_admission_queue_depth", "gauge", "Pipeline requests waiting for admission",
+    lambda: [({}, admission.queue_depth)] if admission is not None else []
+)
+REGISTRY.register_collector(
+    "hindi_admission_rejected_total", "counter", "Pipeline requests shed with 503 (queue full or wait too long, or timed out queued)",
+    lambda: [
+        ({"reason": "rejected"}, admission.rejected),
+        ({"reason": "timed_out"}, admission.timed_out)
+    ] if admission is not None else []
+)
 
 
 if __name__ == "__main__":
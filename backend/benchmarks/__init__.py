@@ -0,0 +1,4 @@
+"""
+End-to-end benchmarks for the Hindi AI Assistant API
+Run from the backend directory: python -m benchmarks.run_benchmark --help
+"""
@@ -0,0 +1,369 @@
+"""
+Benchmark Harness - Drives the API in-process with the fake service backends
+Reports throughput and p50/p95/p99 latency per pipeline stage (from the
+Server-Timing header) and per request, saves the results as JSON and
+compares them against a stored baseline (benchmarks/baseline.json, committed)
+
+Usage (from the backend directory):
+    python -m benchmarks.run_benchmark --concurrency 16 --requests 200
+    python -m benchmarks.run_benchmark --save-baseline
+"""
+
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCHMARK_DIR / "results" / "latest.json"
+
+SCENARIOS = ("text", "audio", "fetch")
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> dict:
+    """Latency summary in milliseconds"""
+    ordered = sorted(values)
+    summary = {f"p{p}": round(percentile(ordered, p), 2) for p in PERCENTILES}
+    summary["mean"] = round(sum(ordered) / len(ordered), 2) if ordered else 0.0
+    summary["max"] = round(ordered[-1], 2) if ordered else 0.0
+    return summary
+
+
+def make_text(index: int, chars: int) -> str:
+    """Unique Hindi text of roughly the requested length"""
+    base = "नमस्ते, कृपया मुझे आज के मौसम के बारे में बताइए। "
+    return (base * (chars // len(base) + 1))[:chars] + f" ({index})"
+
+
+def make_wav(index: int, seconds: float, sample_rate: int = 16000) -> bytes:
+    """Unique mono 16-bit tone, so uploads are not deduplicated"""
+    frequency = 220 + index % 400
+    frames = bytearray()
+    for n in range(int(seconds * sample_rate)):
+        sample = int(8000 * math.sin(2 * math.pi * frequency * n / sample_rate))
+        frames += sample.to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class ScenarioResult:
+    """Per-request measurements for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.totals: List[float] = []
+        self.stages: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def record(self, status_code: int, total_ms: float, stages: Dict[str, float]):
+        if status_code >= 400:
+            key = str(status_code)
+            self.errors[key] = self.errors.get(key, 0) + 1
+            return
+        self.totals.append(total_ms)
+        for stage, duration in stages.items():
+            self.stages.setdefault(stage, []).append(duration)
+
+    def report(self) -> dict:
+        completed = len(self.totals)
+        attempted = completed + sum(self.errors.values())
+        latency = {"total": summarize(self.totals)}
+        latency.update({stage: summarize(values) for stage, values in self.stages.items()})
+        return {
+            "requests": attempted,
+            "errors": self.errors,
+            "error_rate": round(1 - completed / attempted, 4) if attempted else 0.0,
+            "duration_seconds": round(self.elapsed, 3),
+            "throughput_rps": round(completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "latency_ms": latency,
+        }
+
+
+async def run_scenario(name: str, count: int, concurrency: int, send) -> ScenarioResult:
+    """
+    Issue count requests with at most concurrency in flight
+
+    Args:
+        name: Scenario name
+        count: Number of requests
+        concurrency: Number of concurrent workers
+        send: Coroutine function taking the request index and returning
+            (status code, total milliseconds, stage milliseconds)
+    """
+    from utils.timing import parse_server_timing
+
+    result = ScenarioResult(name)
+    next_index = iter(range(count))
+
+    async def worker():
+        for index in next_index:
+            started = time.perf_counter()
+            response = await send(index)
+            total_ms = (time.perf_counter() - started) * 1000
+            result.record(response.status_code, total_ms, parse_server_timing(response.headers.get("server-timing")))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run_benchmarks(args) -> dict:
+    """Run the selected scenarios against the in-process app"""
+    import httpx
+
+    app_module = importlib.import_module("app")
+    transport = httpx.ASGITransport(app=app_module.app)
+    audio_urls: List[str] = []
+
+    # The transport does not run the lifespan; services are built by its startup hook
+    async with app_module.app.router.lifespan_context(app_module.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def send_text(index: int):
+            response = await client.post("/api/process-text", json={
+                "text": make_text(index, args.text_chars),
+                "use_cache": args.use_cache
+            })
+            if response.status_code == 200:
+                audio_urls.append(response.json()["audio_url"])
+            return response
+
+        wav_cache: Dict[int, bytes] = {}
+
+        async def send_audio(index: int):
+            # Payloads are generated up front so WAV synthesis is not timed
+            files = {"audio_file": (f"bench_{index}.wav", wav_cache.pop(index), "audio/wav")}
+            response = await client.post(
+                "/api/process-audio",
+                files=files,
+                params={"use_cache": str(args.use_cache).lower()}
+            )
+            if response.status_code == 200:
+                audio_urls.append(response.json()["audio_url"])
+            return response
+
+        async def send_fetch(index: int):
+            return await client.get(audio_urls[index % len(audio_urls)])
+
+        senders = {"text": send_text, "audio": send_audio, "fetch": send_fetch}
+        offset = 0
+        scenarios = {}
+        for name in args.scenarios:
+            if name == "fetch" and not audio_urls:
+                # Generate something to fetch
+                for index in range(min(args.requests, 10)):
+                    await send_text(10 ** 6 + index)
+
+            for phase, count in (("warmup", args.warmup), ("measured", args.requests)):
+                if name == "audio":
+                    for index in range(offset, offset + count):
+                        wav_cache[index] = make_wav(index, args.audio_seconds)
+                base = offset
+                result = await run_scenario(
+                    name, count, args.concurrency, lambda i, base=base: senders[name](base + i)
+                )
+                offset += count
+                if phase == "measured":
+                    scenarios[name] = result.report()
+                    print(_format_scenario(name, scenarios[name]))
+
+        stats = (await client.get("/api/stats")).json()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "text_chars": args.text_chars,
+            "audio_seconds": args.audio_seconds,
+            "use_cache": args.use_cache,
+            "backend": {key: value for key, value in os.environ.items() if key.startswith(("SERVICE_BACKEND", "FAKE_"))},
+        },
+        "scenarios": scenarios,
+        "server_stats": stats,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Compare a run against the baseline
+
+    A latency percentile regresses when it is more than tolerance (relative)
+    and min_delta_ms (absolute) slower; throughput regresses when it drops by
+    more than tolerance.
+
+    Returns:
+        Human-readable regression descriptions (empty when none)
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s"
+            )
+
+        for stage, summary in result["latency_ms"].items():
+            old = before["latency_ms"].get(stage)
+            if not old:
+                continue
+            for key in (f"p{p}" for p in PERCENTILES):
+                if summary[key] > old[key] * (1 + tolerance) and summary[key] - old[key] > min_delta_ms:
+                    regressions.append(f"{name}/{stage}: {key} {old[key]} -> {summary[key]} ms")
+    return regressions
+
+
+def baseline_mismatches(current: dict, baseline: dict) -> List[str]:
+    """
+    Differences that make a comparison less meaningful
+
+    Returns:
+        Run parameters that differ from the baseline's, and scenarios it does not cover
+    """
+    notes = []
+    for key in ("concurrency", "requests", "text_chars", "audio_seconds", "use_cache", "backend"):
+        before, now = baseline.get("meta", {}).get(key), current["meta"].get(key)
+        if before != now:
+            notes.append(f"{key} is {now} here but {before} in the baseline")
+    for name in current["scenarios"]:
+        if name not in baseline.get("scenarios", {}):
+            notes.append(f"scenario {name} is not in the baseline and was not compared")
+    return notes
+
+
+def _format_scenario(name: str, report: dict) -> str:
+    lines = [
+        f"\n{name}: {report['requests']} requests, {report['throughput_rps']} req/s, "
+        f"error rate {report['error_rate']:.2%}",
+        f"  {'stage':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)",
+    ]
+    for stage, summary in report["latency_ms"].items():
+        lines.append(
+            f"  {stage:<12}{summary['p50']:>10}{summary['p95']:>10}{summary['p99']:>10}{summary['max']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def use_fake_backends(prefix: str) -> Path:
+    """
+    Point the app at the fake backends and scratch directories, unless overridden by the caller
+
+    The quota is raised so runs measure the API layer, not the token bucket.
+
+    Returns:
+        The scratch directory (remove it when done)
+    """
+    scratch = Path(tempfile.mkdtemp(prefix=prefix))
+    os.environ.setdefault("SERVICE_BACKEND", "fake")
+    os.environ.setdefault("UPLOAD_DIR", str(scratch / "uploads"))
+    os.environ.setdefault("OUTPUT_DIR", str(scratch / "outputs"))
+    os.environ.setdefault("RESPONSE_CACHE_DB", "")
+    os.environ.setdefault("TRANSCRIPTION_CACHE_DB", "")
+    os.environ.setdefault("JOB_DB", "")
+    os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", "600000")
+    os.environ.setdefault("GEMINI_BURST", "1000")
+    os.environ.setdefault("GEMINI_MAX_IN_FLIGHT", "64")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, str(BENCHMARK_DIR.parent))
+    return scratch
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Comma-separated scenarios to run (text, audio, fetch)")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--text-chars", type=int, default=200, help="Length of /process-text payloads")
+    parser.add_argument("--audio-seconds", type=float, default=5.0, help="Length of /process-audio uploads")
+    parser.add_argument("--use-cache", action="store_true", help="Allow response memoization")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    scratch = use_fake_backends("hindi-bench-")
+    try:
+        results = asyncio.run(run_benchmarks(args))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    status, regressions = "saved", []
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nBaseline saved to {args.baseline} (commit it to pin it)")
+    elif not args.baseline.exists():
+        status = "missing"
+        print(f"\nNO BASELINE at {args.baseline}: nothing was compared. "
+              f"Record one with --save-baseline and commit it.")
+    else:
+        status = "compared"
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        for note in baseline_mismatches(results, baseline):
+            print(f"Note: {note}")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+
+    results["baseline"] = {"path": str(args.baseline), "status": status, "regressions": regressions}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    if status == "compared":
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
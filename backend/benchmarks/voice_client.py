@@ -0,0 +1,296 @@
+"""
+Voice Client - Replays a recording over the voice WebSocket as a microphone would
+Streams the audio in real time (or faster), prints the server's events and
+measures end-of-speech-to-reply latency per turn on the client side
+
+Usage (from the backend directory):
+    python -m benchmarks.voice_client recording.wav                  # in-process, fake backends
+    python -m benchmarks.voice_client recording.wav --url ws://localhost:8000/api/voice
+    python -m benchmarks.voice_client                                # synthetic two-phrase utterance
+
+WAV files are streamed as they are (16-bit PCM, downmixed to mono); other
+formats are decoded with pydub, which needs ffmpeg.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import shutil
+import sys
+import time
+import wave
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from benchmarks.run_benchmark import summarize, use_fake_backends
+
+SAMPLE_WIDTH = 2
+
+
+def load_pcm(path: Path, sample_rate: int) -> Tuple[bytes, int]:
+    """
+    Read a recording as 16-bit little-endian mono PCM
+
+    Args:
+        path: Audio file
+        sample_rate: Rate to decode non-WAV files at
+
+    Returns:
+        (PCM samples, sample rate)
+    """
+    try:
+        with wave.open(str(path), "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise SystemExit(f"{path}: only 16-bit WAV files can be streamed as they are")
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except wave.Error:
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(str(path)).set_channels(1).set_frame_rate(sample_rate).set_sample_width(SAMPLE_WIDTH)
+        return segment.raw_data, sample_rate
+
+    if channels == 1:
+        return frames, rate
+    samples = array("h", frames)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    mono = array("h", (sum(samples[i:i + channels]) // channels for i in range(0, len(samples), channels)))
+    if sys.byteorder == "big":
+        mono.byteswap()
+    return mono.tobytes(), rate
+
+
+def synthetic_utterance(sample_rate: int) -> bytes:
+    """Two voiced phrases with a short pause between them, framed by quiet noise"""
+    def tone(ms: int, amplitude: int) -> bytes:
+        samples = array("h", (
+            int(amplitude * math.sin(2 * math.pi * (180 + 40 * math.sin(n / 800)) * n / sample_rate))
+            for n in range(sample_rate * ms // 1000)
+        ))
+        if sys.byteorder == "big":
+            samples.byteswap()
+        return samples.tobytes()
+
+    return tone(300, 30) + tone(1200, 6000) + tone(450, 30) + tone(900, 6000) + tone(200, 30)
+
+
+class InProcessConnection:
+    """WebSocket connection to the app running in this event loop (fake backends)"""
+
+    def __init__(self, app, path: str, query: str):
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [(b"host", b"voice-client")],
+            "client": ("127.0.0.1", 0),
+            "server": ("voice-client", 80),
+            "subprotocols": [],
+        }
+        self._incoming.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(app(scope, self._incoming.get, self._outgoing.put))
+
+    async def send(self, data):
+        key = "bytes" if isinstance(data, bytes) else "text"
+        await self._incoming.put({"type": "websocket.receive", key: data})
+
+    async def recv(self):
+        while True:
+            message = await self._outgoing.get()
+            if message["type"] == "websocket.send":
+                return message.get("bytes") if message.get("bytes") is not None else message.get("text")
+            if message["type"] == "websocket.close":
+                raise ConnectionError(f"closed by server ({message.get('code')})")
+
+    async def close(self):
+        await self._incoming.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def replay(connection, pcm: bytes, sample_rate: int, args) -> dict:
+    """
+    Stream the audio, collect the events and measure latency
+
+    Returns:
+        Per-turn results and a latency summary
+    """
+    chunk_bytes = sample_rate * args.chunk_ms // 1000 * SAMPLE_WIDTH
+    sent: List[Tuple[float, float]] = []  # (stream ms sent, wall time)
+    turns: Dict[int, dict] = {}
+    closed = asyncio.Event()
+    started = time.perf_counter()
+    last_event_at = started
+    end_of_turn_ms = 1000.0
+
+    def log(text: str):
+        if not args.quiet:
+            print(f"[{time.perf_counter() - started:7.3f}s] {text}")
+
+    def sent_at(stream_ms: float) -> Optional[float]:
+        return next((wall for position, wall in sent if position >= stream_ms), None)
+
+    async def receiver():
+        nonlocal last_event_at, end_of_turn_ms
+        while True:
+            try:
+                message = await connection.recv()
+            except Exception as e:
+                log(f"connection closed: {e}")
+                closed.set()
+                return
+            now = last_event_at = time.perf_counter()
+            if isinstance(message, bytes):
+                log(f"  audio: {len(message)} bytes")
+                continue
+
+            event = json.loads(message)
+            kind = event.get("type")
+            turn = turns.setdefault(event.get("turn", 0), {}) if "turn" in event else None
+            if kind == "partial":
+                log(f"partial   turn {event['turn']} segment {event['segment']} "
+                    f"({event['start_ms']:.0f}-{event['end_ms']:.0f} ms): {event['text']}")
+            elif kind == "transcript":
+                turn["transcript"] = event["text"]
+                turn["end_of_speech_sent_at"] = sent_at(event["end_ms"])
+                log(f"transcript turn {event['turn']}: {event['text']}")
+            elif kind == "reply":
+                if "first_audio_at" not in turn and turn.get("end_of_speech_sent_at") is not None:
+                    turn["first_audio_at"] = now
+                    turn["client_latency_ms"] = round((now - turn["end_of_speech_sent_at"]) * 1000, 1)
+                log(f"reply     turn {event['turn']} sentence {event['index']}: {event['text']}")
+            elif kind == "reply_done":
+                turn["response"] = event["response"]
+                turn["server_latency_ms"] = event["latency_ms"]
+                log(f"done      turn {event['turn']}: client {turn.get('client_latency_ms')} ms, server {event['latency_ms']}")
+            elif kind == "interrupted":
+                turn["interrupted"] = True
+                log(f"interrupted turn {event['turn']}")
+            elif kind == "ready":
+                end_of_turn_ms = event["end_of_turn_ms"]
+                log(f"ready     {event}")
+            elif kind == "error":
+                if turn is not None:
+                    turn["error"] = event["detail"]
+                log(f"error     {event}")
+            else:
+                log(f"{kind:<9} {event}")
+
+    receiving = asyncio.create_task(receiver())
+    try:
+        position = 0
+        stream_started = time.perf_counter()
+        while position < len(pcm):
+            chunk = pcm[position:position + chunk_bytes]
+            position += len(chunk)
+            if args.speed > 0:
+                due = stream_started + position / SAMPLE_WIDTH / sample_rate / args.speed
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await connection.send(chunk)
+            sent.append((position / SAMPLE_WIDTH / sample_rate * 1000, time.perf_counter()))
+
+        if args.end:
+            await connection.send(json.dumps({"type": "end"}))
+        else:
+            # Trailing silence, so the server sees the pause that ends the turn
+            silence = bytes(chunk_bytes)
+            for _ in range(max(1, args.trailing_silence_ms // args.chunk_ms)):
+                await asyncio.sleep(args.chunk_ms / 1000 / args.speed if args.speed > 0 else 0)
+                await connection.send(silence)
+                position += len(silence)
+                sent.append((position / SAMPLE_WIDTH / sample_rate * 1000, time.perf_counter()))
+
+        # Done once every turn has its reply and the server has gone quiet
+        # (it may still be working through audio sent faster than real time)
+        deadline = time.perf_counter() + args.timeout
+        while not closed.is_set():
+            now = time.perf_counter()
+            open_turns = [t for t in turns.values() if not {"response", "error", "interrupted"} & t.keys()]
+            if not open_turns and now - last_event_at > end_of_turn_ms / 1000 + 1:
+                break
+            if now > deadline:
+                print(f"Timed out after {args.timeout}s waiting for replies")
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        receiving.cancel()
+        await asyncio.gather(receiving, return_exceptions=True)
+        await connection.close()
+
+    latencies = [t["client_latency_ms"] for t in turns.values() if "client_latency_ms" in t]
+    reported = ("transcript", "response", "client_latency_ms", "server_latency_ms", "interrupted", "error")
+    return {
+        "audio_seconds": round(len(pcm) / SAMPLE_WIDTH / sample_rate, 2),
+        "turns": {number: {key: t[key] for key in reported if key in t} for number, t in turns.items()},
+        "end_of_speech_to_first_audio_ms": summarize(latencies) if latencies else None,
+    }
+
+
+async def run(args) -> dict:
+    """Connect, replay and report"""
+    if args.file is not None:
+        pcm, sample_rate = load_pcm(args.file, args.sample_rate)
+    else:
+        pcm, sample_rate = synthetic_utterance(args.sample_rate), args.sample_rate
+    query = urlencode({"sample_rate": sample_rate, "use_cache": str(args.use_cache).lower(), "audio": "binary"})
+
+    if args.url:
+        try:
+            import websockets
+        except ImportError:
+            raise SystemExit("Connecting to a server needs the websockets package (pip install websockets)")
+        separator = "&" if "?" in args.url else "?"
+        async with websockets.connect(f"{args.url}{separator}{query}", max_size=None) as websocket:
+            return await replay(websocket, pcm, sample_rate, args)
+
+    app_module = importlib.import_module("app")
+    async with app_module.app.router.lifespan_context(app_module.app):
+        return await replay(InProcessConnection(app_module.app, "/api/voice", query), pcm, sample_rate, args)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", type=Path, nargs="?", help="Recording to replay (default: a synthetic utterance)")
+    parser.add_argument("--url", help="Voice endpoint of a running server, e.g. ws://localhost:8000/api/voice")
+    parser.add_argument("--sample-rate", type=int, default=16000, help="Rate for decoded and synthetic audio")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Audio per message")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed (0 sends as fast as possible)")
+    parser.add_argument("--trailing-silence-ms", type=int, default=1500, help="Silence sent after the recording")
+    parser.add_argument("--end", action="store_true", help="Send an end command instead of trailing silence")
+    parser.add_argument("--use-cache", action="store_true", help="Allow response memoization")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the replies")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    scratch = None if args.url else use_fake_backends("hindi-voice-")
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"\nEnd of speech to first reply audio (ms): {results['end_of_speech_to_first_audio_ms']}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Results written to {args.output}")
+    return 0 if results["end_of_speech_to_first_audio_ms"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
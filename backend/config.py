@@ -14,35 +14,178 @@ load_dotenv()
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent
 
-# API Configuration
+# Service Backends ("gemini" for Gemini + gTTS, "fake" for offline load testing)
+SERVICE_BACKEND = os.getenv("SERVICE_BACKEND", "gemini").lower()
+
+# API Configuration (checked at startup by validate_settings)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
-    raise ValueError(
-        "GEMINI_API_KEY not configured. "
-        "Please add your API key to the .env file. "
-        "Get one at: https://makersuite.google.com/app/apikey"
-    )
+
+# Fake Backends (deterministic stand-ins; only used when SERVICE_BACKEND=fake)
+FAKE_LATENCY_DISTRIBUTION = os.getenv("FAKE_LATENCY_DISTRIBUTION", "lognormal")  # fixed, uniform, exponential, lognormal
+FAKE_LATENCY_SPREAD = float(os.getenv("FAKE_LATENCY_SPREAD", 0.5))
+FAKE_TRANSCRIBE_LATENCY_MS = float(os.getenv("FAKE_TRANSCRIBE_LATENCY_MS", 800))
+FAKE_GENERATE_LATENCY_MS = float(os.getenv("FAKE_GENERATE_LATENCY_MS", 600))
+FAKE_TTS_LATENCY_MS = float(os.getenv("FAKE_TTS_LATENCY_MS", 300))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", 0.0))
+FAKE_RATE_LIMIT_RATE = float(os.getenv("FAKE_RATE_LIMIT_RATE", 0.0))
+FAKE_SEED = int(os.getenv("FAKE_SEED", 42))
 
 # Server Configuration
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
 RELOAD = os.getenv("RELOAD", "True").lower() == "true"
+# Worker processes for the production launch mode (python run_backend.py --production)
+WORKERS = int(os.getenv("WORKERS", 1))
+# SQLite file through which worker processes share the Gemini quota and elect one janitor;
+# leave empty for a single process (run_backend.py fills it in when starting several workers)
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "")
 
 # CORS Configuration
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
 # Directory Configuration
-UPLOAD_DIR = BASE_DIR / "uploads"
-OUTPUT_DIR = BASE_DIR / "outputs"
-
-# Create directories if they don't exist
-UPLOAD_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", BASE_DIR / "uploads"))
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", BASE_DIR / "outputs"))
 
 # File Upload Configuration
 MAX_UPLOAD_SIZE = 25 * 1024 * 1024  # 25MB
+# Endpoints taking file uploads; a declared Content-Length over the limit is rejected before the body is read
+UPLOAD_PATHS = ["/api/process-audio", "/api/jobs"]
 ALLOWED_AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.ogg', '.webm', '.weba']
 
+# Audio Preprocessing (silence trim, mono downmix, resample, Opus re-encode)
+AUDIO_PREPROCESSING_ENABLED = os.getenv("AUDIO_PREPROCESSING_ENABLED", "True").lower() == "true"
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", 16000))
+AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "24k")
+AUDIO_SILENCE_THRESHOLD_DBFS = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DBFS", -45.0))
+
+# Long Audio Transcription (split at pauses, transcribed concurrently)
+LONG_AUDIO_THRESHOLD_SECONDS = float(os.getenv("LONG_AUDIO_THRESHOLD_SECONDS", 60))
+LONG_AUDIO_SEGMENT_SECONDS = float(os.getenv("LONG_AUDIO_SEGMENT_SECONDS", 30))
+LONG_AUDIO_OVERLAP_SECONDS = float(os.getenv("LONG_AUDIO_OVERLAP_SECONDS", 1.5))
+
+# TTS Cache Configuration
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # 200MB
+
+# Segmented TTS: longer responses are split at danda and clause boundaries, the segments
+# synthesized concurrently and their MP3 frames joined (0 sends the whole text in one call)
+TTS_SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_MAX_CHARS", 100))
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", 8))
+
+# Outbound TTS HTTP: one pooled keep-alive session shared by all TTS threads
+# Leave TTS_ENDPOINT_URL empty for Google Translate ("{tld}" is substituted), or point it at a stub server
+TTS_ENDPOINT_URL = os.getenv("TTS_ENDPOINT_URL", "")
+TTS_POOL_SIZE = int(os.getenv("TTS_POOL_SIZE", TTS_MAX_CONCURRENCY))
+TTS_CONNECT_TIMEOUT = float(os.getenv("TTS_CONNECT_TIMEOUT", 5))  # seconds
+TTS_READ_TIMEOUT = float(os.getenv("TTS_READ_TIMEOUT", 15))  # seconds
+
+# Gemini Rate Limiting (token bucket shared by transcription and generation)
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 30))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", 1))
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", 4))
+
+# Gemini retries (jittered exponential backoff; Retry-After hints up to GEMINI_RETRY_MAX_WAIT are waited out)
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", 3))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", 0.5))  # seconds
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", 8))  # seconds
+GEMINI_RETRY_MAX_WAIT = float(os.getenv("GEMINI_RETRY_MAX_WAIT", 10))  # seconds
+# Circuit breaker: after this many consecutive failures, fail fast with 503 + Retry-After
+GEMINI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("GEMINI_CIRCUIT_FAILURE_THRESHOLD", 5))
+GEMINI_CIRCUIT_RESET_SECONDS = float(os.getenv("GEMINI_CIRCUIT_RESET_SECONDS", 30))
+
+# Hedged generation: a call still running past this percentile of recent latencies gets one
+# duplicate (only when a rate limit slot is free right now); the first answer wins
+GEMINI_HEDGE_ENABLED = os.getenv("GEMINI_HEDGE_ENABLED", "False").lower() == "true"
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", 95))
+GEMINI_HEDGE_WINDOW = int(os.getenv("GEMINI_HEDGE_WINDOW", 200))  # recent calls the percentile is taken over
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 20))
+
+# Hot in-memory tier for recently generated audio clips
+AUDIO_HOT_CACHE_MAX_BYTES = int(os.getenv("AUDIO_HOT_CACHE_MAX_BYTES", 32 * 1024 * 1024))  # 32MB
+AUDIO_HOT_CACHE_MAX_FILE_BYTES = int(os.getenv("AUDIO_HOT_CACHE_MAX_FILE_BYTES", 2 * 1024 * 1024))  # 2MB
+
+# Reply audio formats: clients may ask for Opus (?format=opus|webm or an Accept header)
+# instead of the stored MP3; variants are encoded by ffmpeg in a process pool and kept on disk
+AUDIO_VARIANT_BITRATE = os.getenv("AUDIO_VARIANT_BITRATE", "24k")
+AUDIO_VARIANT_BITRATES = [
+    bitrate.strip() for bitrate in os.getenv("AUDIO_VARIANT_BITRATES", "16k,24k,32k,48k").split(",") if bitrate.strip()
+]
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", 2))
+TRANSCODE_TIMEOUT_SECONDS = float(os.getenv("TRANSCODE_TIMEOUT_SECONDS", 30))
+
+# Admission control for the pipeline endpoints: requests beyond ADMISSION_MAX_IN_FLIGHT queue;
+# when the queue is full or the estimated wait exceeds ADMISSION_MAX_QUEUE_WAIT they get 503 + Retry-After
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 16))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+ADMISSION_MAX_QUEUE_WAIT = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT", 10))  # seconds
+ADMISSION_PATHS = [
+    path.strip()
+    for path in os.getenv("ADMISSION_PATHS", "/api/process-audio,/api/process-text,/api/process-text/stream").split(",")
+    if path.strip()
+]
+
+# Voice WebSocket (/api/voice): 16-bit mono PCM is split at pauses of VOICE_SEGMENT_SILENCE_MS and each
+# segment transcribed while the user keeps talking (one Gemini call per segment); a pause of
+# VOICE_END_OF_TURN_MS ends the turn, and that wait is part of the end-of-speech-to-reply latency
+VOICE_SAMPLE_RATE = int(os.getenv("VOICE_SAMPLE_RATE", 16000))  # default; clients may pass ?sample_rate=
+VOICE_FRAME_MS = int(os.getenv("VOICE_FRAME_MS", 20))
+VOICE_SPEECH_THRESHOLD_DBFS = float(os.getenv("VOICE_SPEECH_THRESHOLD_DBFS", AUDIO_SILENCE_THRESHOLD_DBFS))
+VOICE_NOISE_MARGIN_DB = float(os.getenv("VOICE_NOISE_MARGIN_DB", 10))  # speech must be this far above the noise floor
+VOICE_SEGMENT_SILENCE_MS = float(os.getenv("VOICE_SEGMENT_SILENCE_MS", 400))
+VOICE_END_OF_TURN_MS = float(os.getenv("VOICE_END_OF_TURN_MS", 700))
+VOICE_MIN_SPEECH_MS = float(os.getenv("VOICE_MIN_SPEECH_MS", 200))  # shorter noise bursts are ignored
+VOICE_MAX_SEGMENT_SECONDS = float(os.getenv("VOICE_MAX_SEGMENT_SECONDS", 10))
+VOICE_PADDING_MS = float(os.getenv("VOICE_PADDING_MS", 200))
+# New speech cancels a reply in progress (a reply with no audio sent yet is folded into the new turn)
+VOICE_BARGE_IN = os.getenv("VOICE_BARGE_IN", "True").lower() == "true"
+VOICE_MAX_SESSIONS = int(os.getenv("VOICE_MAX_SESSIONS", 64))
+VOICE_MAX_MESSAGE_BYTES = int(os.getenv("VOICE_MAX_MESSAGE_BYTES", 64 * 1024))
+
+# Batch Text Processing (/api/process-text/batch)
+BATCH_MAX_TEXTS = int(os.getenv("BATCH_MAX_TEXTS", 500))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+
+# Asynchronous Jobs (/api/jobs): background workers with a persistent SQLite job store
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", 100))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", 3600))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", 30))  # long-poll cap
+# Leave empty to keep jobs in memory only
+JOB_DB = os.getenv("JOB_DB", str(BASE_DIR / "jobs.db"))
+
+# Response Cache Configuration
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 24 * 3600))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+# SQLite file for the persistent tier; leave empty to keep the cache in memory only
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "")
+
+# Transcription Cache: uploads are hashed as they arrive; the same recording (with the same
+# preprocessing settings) is transcribed once. Entries are persisted, bounded by count
+TRANSCRIPTION_CACHE_ENABLED = os.getenv("TRANSCRIPTION_CACHE_ENABLED", "True").lower() == "true"
+TRANSCRIPTION_CACHE_TTL = int(os.getenv("TRANSCRIPTION_CACHE_TTL", 30 * 24 * 3600))  # seconds
+TRANSCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", 1024))  # in memory
+TRANSCRIPTION_CACHE_MAX_PERSISTENT_ENTRIES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_PERSISTENT_ENTRIES", 50000))  # trimmed every 100 writes
+# SQLite file for the persistent tier; leave empty to keep the cache in memory only
+TRANSCRIPTION_CACHE_DB = os.getenv("TRANSCRIPTION_CACHE_DB", str(BASE_DIR / "transcription_cache.db"))
+
+# Retention Janitor (background cleanup; oldest files are evicted first)
+JANITOR_INTERVAL_SECONDS = float(os.getenv("JANITOR_INTERVAL_SECONDS", 300))
+UPLOAD_MAX_AGE_HOURS = float(os.getenv("UPLOAD_MAX_AGE_HOURS", 1))
+UPLOAD_MAX_TOTAL_BYTES = int(os.getenv("UPLOAD_MAX_TOTAL_BYTES", 500 * 1024 * 1024))  # 500MB
+OUTPUT_MAX_AGE_HOURS = float(os.getenv("OUTPUT_MAX_AGE_HOURS", 24))
+OUTPUT_MAX_TOTAL_BYTES = int(os.getenv("OUTPUT_MAX_TOTAL_BYTES", 1024 * 1024 * 1024))  # 1GB
+
+# Startup Warmup (runs in the background once the server is up; requests are served meanwhile)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "False").lower() == "true"
+# Phrases synthesized ahead of time so their audio is served from the TTS cache, separated by "|"
+WARMUP_PHRASES = [
+    phrase.strip()
+    for phrase in os.getenv("WARMUP_PHRASES", "नमस्ते! मैं आपकी क्या मदद कर सकता हूँ?").split("|")
+    if phrase.strip()
+]
+
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 logging.basicConfig(
@@ -54,3 +197,27 @@ logging.basicConfig(
 APP_TITLE = "Hindi-Speaking AI Assistant"
 APP_DESCRIPTION = "AI Assistant with Hindi Speech-to-Text, LLM Response, and Text-to-Speech"
 APP_VERSION = "1.0.0"
+
+
+def validate_settings():
+    """
+    Check settings that would make every request fail
+
+    Called from the application startup hook rather than at import time, so
+    tooling can import the app without credentials.
+
+    Raises:
+        ValueError: If the Gemini backend is selected without an API key
+    """
+    if SERVICE_BACKEND == "gemini" and (not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here"):
+        raise ValueError(
+            "GEMINI_API_KEY not configured. "
+            "Please add your API key to the .env file. "
+            "Get one at: https://makersuite.google.com/app/apikey"
+        )
+
+
+def ensure_directories():
+    """Create the upload and output directories if they don't exist"""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
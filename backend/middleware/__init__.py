@@ -0,0 +1 @@
+# Middleware package - ASGI middleware wrapping the application
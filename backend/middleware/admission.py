@@ -0,0 +1,193 @@
+"""
+Admission Control - Load shedding for the pipeline endpoints
+Bounds in-flight and queued requests, and turns away work that would wait
+too long with 503 and a Retry-After estimated from the queue
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO queue and wait-time estimates
+
+    Expected wait for a queued request is its queue position times the
+    average service time, divided by the number of requests served at once.
+    A request is rejected up front when the queue is full or that estimate
+    exceeds max_queue_wait, and a queued request gives up once it has
+    waited max_queue_wait.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_queue: int = 32,
+        max_queue_wait: float = 10.0,
+        initial_service_seconds: float = 1.0,
+        smoothing: float = 0.2
+    ):
+        """
+        Initialize the controller
+
+        Args:
+            max_in_flight: Requests processed at once
+            max_queue: Requests allowed to wait for a slot
+            max_queue_wait: Longest time a request may wait in the queue, in seconds
+            initial_service_seconds: Service time assumed before any request has finished
+            smoothing: Weight of the newest sample in the service time average
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.max_queue_wait = max_queue_wait
+        self.smoothing = smoothing
+        self.service_seconds = initial_service_seconds
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a slot"""
+        return len(self._waiters)
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the request at this queue position (1 = next) gets a slot"""
+        return position * self.service_seconds / self.max_in_flight
+
+    def retry_after(self) -> int:
+        """Whole seconds a rejected client should wait: until the current queue has drained"""
+        return max(1, math.ceil(self.estimated_wait(self.queue_depth + 1)))
+
+    async def admit(self) -> bool:
+        """
+        Take a slot, queueing for one if the estimated wait allows
+
+        Returns:
+            True if admitted (call release() when done), False if rejected
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self.admitted += 1
+            return True
+
+        if self.queue_depth >= self.max_queue or self.estimated_wait(self.queue_depth + 1) > self.max_queue_wait:
+            self.rejected += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(future, timeout=self.max_queue_wait)
+        except asyncio.TimeoutError:
+            self._discard(future)
+            self.timed_out += 1
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if future.done() and not future.cancelled():
+                self.release()
+            self._discard(future)
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self, service_seconds: Optional[float] = None):
+        """
+        Return a slot, handing it to the next queued request
+
+        Args:
+            service_seconds: How long the request took, to refine the estimate
+        """
+        if service_seconds is not None:
+            self.service_seconds += self.smoothing * (service_seconds - self.service_seconds)
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot passes straight to the waiter; in_flight is unchanged
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _discard(self, future: asyncio.Future):
+        """Remove a waiter that gave up"""
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        """Return occupancy, counters and the current estimates"""
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "max_queue_wait_seconds": self.max_queue_wait,
+            "service_seconds": round(self.service_seconds, 4),
+            "estimated_wait_seconds": round(self.estimated_wait(self.queue_depth + 1), 3),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying an AdmissionController to selected paths"""
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str]):
+        """
+        Wrap an application
+
+        Args:
+            app: The wrapped ASGI application
+            controller: Shared admission state
+            paths: Exact request paths under admission control; all others pass through
+        """
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.admit():
+            await self._reject(send, self.controller.retry_after())
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - started)
+
+    @staticmethod
+    async def _reject(send, retry_after: int):
+        """Send a 503 without reading the request body"""
+        body = json.dumps({"detail": "Server is busy. Please retry later."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
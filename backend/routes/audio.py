@@ -3,33 +3,313 @@ Audio Processing API Endpoints
 Handles audio upload, transcription, response generation, and TTS
 """
 
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import json
 import logging
+import math
+import os
+import uuid
+from email.utils import formatdate
 from pathlib import Path
+from typing import List, Optional
 
+from services.backends import BackendSet, create_backends
 from services.gemini_service import GeminiService
 from services.tts_service import TTSService
-from config import UPLOAD_DIR, OUTPUT_DIR, ALLOWED_AUDIO_EXTENSIONS, GEMINI_API_KEY
+from services.tts_cache import TTSCache
+from services.response_cache import ResponseCache
+from services.rate_limiter import RateLimitScheduler, PRIORITY_LOW
+from services.hedging import HedgePolicy
+from services.shared_state import SharedState
+from services.audio_preprocessor import AudioPreprocessor
+from services.janitor import RetentionJanitor, RetentionPolicy
+from services.pipeline import AudioPipeline, PipelineError
+from services.resilience import CircuitBreaker, RetryPolicy, UpstreamError, CIRCUIT_STATE_VALUES
+from services.audio_store import AudioStore, is_safe_filename, is_content_addressed, make_etag, media_type_for
+from services.transcoder import AudioTranscoder, SOURCE_FORMAT, OUTPUT_FORMATS
+from utils.file_utils import save_upload, get_audio_mime_type, UploadTooLargeError, in_flight_files, write_zip_archive
+from utils.metrics import REGISTRY
+from utils.http_utils import parse_range_header, etag_matches, RangeNotSatisfiableError
+from utils.timing import StageTimer
+from config import (
+    UPLOAD_DIR, OUTPUT_DIR, ALLOWED_AUDIO_EXTENSIONS, MAX_UPLOAD_SIZE, GEMINI_API_KEY, TTS_CACHE_MAX_BYTES,
+    TTS_SEGMENT_MAX_CHARS, TTS_MAX_CONCURRENCY, TTS_ENDPOINT_URL, TTS_POOL_SIZE, TTS_CONNECT_TIMEOUT, TTS_READ_TIMEOUT,
+    AUDIO_HOT_CACHE_MAX_BYTES, AUDIO_HOT_CACHE_MAX_FILE_BYTES, RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_DB,
+    GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST, GEMINI_MAX_IN_FLIGHT, GEMINI_MAX_ATTEMPTS, GEMINI_RETRY_BASE_DELAY,
+    GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_MAX_WAIT, GEMINI_CIRCUIT_FAILURE_THRESHOLD, GEMINI_CIRCUIT_RESET_SECONDS,
+    GEMINI_HEDGE_ENABLED, GEMINI_HEDGE_PERCENTILE, GEMINI_HEDGE_WINDOW, GEMINI_HEDGE_MIN_SAMPLES,
+    AUDIO_PREPROCESSING_ENABLED, AUDIO_SAMPLE_RATE, AUDIO_BITRATE, AUDIO_SILENCE_THRESHOLD_DBFS,
+    LONG_AUDIO_THRESHOLD_SECONDS, LONG_AUDIO_SEGMENT_SECONDS, LONG_AUDIO_OVERLAP_SECONDS,
+    JANITOR_INTERVAL_SECONDS, UPLOAD_MAX_AGE_HOURS, UPLOAD_MAX_TOTAL_BYTES,
+    OUTPUT_MAX_AGE_HOURS, OUTPUT_MAX_TOTAL_BYTES, BATCH_MAX_TEXTS, BATCH_MAX_CONCURRENCY,
+    SERVICE_BACKEND, FAKE_LATENCY_DISTRIBUTION, FAKE_LATENCY_SPREAD, FAKE_TRANSCRIBE_LATENCY_MS,
+    FAKE_GENERATE_LATENCY_MS, FAKE_TTS_LATENCY_MS, FAKE_ERROR_RATE, FAKE_RATE_LIMIT_RATE, FAKE_SEED,
+    SHARED_STATE_DB, TRANSCRIPTION_CACHE_ENABLED, TRANSCRIPTION_CACHE_TTL, TRANSCRIPTION_CACHE_MAX_ENTRIES,
+    TRANSCRIPTION_CACHE_MAX_PERSISTENT_ENTRIES, TRANSCRIPTION_CACHE_DB, AUDIO_VARIANT_BITRATE, AUDIO_VARIANT_BITRATES,
+    TRANSCODE_WORKERS, TRANSCODE_TIMEOUT_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter(prefix="/api", tags=["audio"])
 
-# Initialize services (singleton pattern)
-gemini_service = GeminiService(api_key=GEMINI_API_KEY)
-tts_service = TTSService()
+# Services (singletons) are built by init_services() from the application's
+# startup hook, so importing this module stays cheap and never fails on settings
+backends: Optional[BackendSet] = None
+shared_state: Optional[SharedState] = None
+response_cache: Optional[ResponseCache] = None
+transcription_cache: Optional[ResponseCache] = None
+gemini_scheduler: Optional[RateLimitScheduler] = None
+gemini_service: Optional[GeminiService] = None
+audio_preprocessor: Optional[AudioPreprocessor] = None
+audio_store: Optional[AudioStore] = None
+tts_cache: Optional[TTSCache] = None
+tts_service: Optional[TTSService] = None
+audio_transcoder: Optional[AudioTranscoder] = None
+audio_pipeline: Optional[AudioPipeline] = None
+janitor: Optional[RetentionJanitor] = None
+
+
+def init_services():
+    """Build the service singletons and register their metrics (idempotent)"""
+    global backends, shared_state, response_cache, transcription_cache, gemini_scheduler, gemini_service, audio_preprocessor
+    global audio_store, tts_cache, tts_service, audio_transcoder, audio_pipeline, janitor
+
+    if audio_pipeline is not None:
+        return
+
+    backends = create_backends(
+        SERVICE_BACKEND,
+        api_key=GEMINI_API_KEY,
+        latency_distribution=FAKE_LATENCY_DISTRIBUTION,
+        latency_spread=FAKE_LATENCY_SPREAD,
+        transcribe_latency_ms=FAKE_TRANSCRIBE_LATENCY_MS,
+        generate_latency_ms=FAKE_GENERATE_LATENCY_MS,
+        tts_latency_ms=FAKE_TTS_LATENCY_MS,
+        error_rate=FAKE_ERROR_RATE,
+        rate_limit_rate=FAKE_RATE_LIMIT_RATE,
+        seed=FAKE_SEED,
+        tts_endpoint_url=TTS_ENDPOINT_URL,
+        tts_pool_size=TTS_POOL_SIZE,
+        tts_connect_timeout=TTS_CONNECT_TIMEOUT,
+        tts_read_timeout=TTS_READ_TIMEOUT
+    )
+    # Cross-process state when several worker processes serve the app
+    shared_state = SharedState(Path(SHARED_STATE_DB)) if SHARED_STATE_DB else None
+    response_cache = ResponseCache(
+        ttl_seconds=RESPONSE_CACHE_TTL,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        sqlite_path=RESPONSE_CACHE_DB or None
+    ) if RESPONSE_CACHE_ENABLED else None
+    transcription_cache = ResponseCache(
+        ttl_seconds=TRANSCRIPTION_CACHE_TTL,
+        max_entries=TRANSCRIPTION_CACHE_MAX_ENTRIES,
+        sqlite_path=TRANSCRIPTION_CACHE_DB or None,
+        table="transcription_cache",
+        max_persistent_entries=TRANSCRIPTION_CACHE_MAX_PERSISTENT_ENTRIES
+    ) if TRANSCRIPTION_CACHE_ENABLED else None
+    gemini_scheduler = RateLimitScheduler(
+        requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+        burst=GEMINI_BURST,
+        max_in_flight=GEMINI_MAX_IN_FLIGHT,
+        shared_state=shared_state
+    )
+    gemini_service = GeminiService(
+        transcriber=backends.transcriber,
+        generator=backends.generator,
+        response_cache=response_cache,
+        scheduler=gemini_scheduler,
+        retry_policy=RetryPolicy(
+            max_attempts=GEMINI_MAX_ATTEMPTS,
+            base_delay=GEMINI_RETRY_BASE_DELAY,
+            max_delay=GEMINI_RETRY_MAX_DELAY,
+            max_retry_after=GEMINI_RETRY_MAX_WAIT
+        ),
+        circuit_breaker=CircuitBreaker(
+            "gemini",
+            failure_threshold=GEMINI_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=GEMINI_CIRCUIT_RESET_SECONDS
+        ),
+        hedge_policy=HedgePolicy(
+            percentile=GEMINI_HEDGE_PERCENTILE,
+            window=GEMINI_HEDGE_WINDOW,
+            min_samples=GEMINI_HEDGE_MIN_SAMPLES
+        ) if GEMINI_HEDGE_ENABLED else None
+    )
+    audio_preprocessor = AudioPreprocessor(
+        sample_rate=AUDIO_SAMPLE_RATE,
+        bitrate=AUDIO_BITRATE,
+        silence_threshold_dbfs=AUDIO_SILENCE_THRESHOLD_DBFS,
+        long_audio_threshold_ms=int(LONG_AUDIO_THRESHOLD_SECONDS * 1000),
+        segment_ms=int(LONG_AUDIO_SEGMENT_SECONDS * 1000),
+        overlap_ms=int(LONG_AUDIO_OVERLAP_SECONDS * 1000)
+    ) if AUDIO_PREPROCESSING_ENABLED else None
+    audio_store = AudioStore(max_bytes=AUDIO_HOT_CACHE_MAX_BYTES, max_file_bytes=AUDIO_HOT_CACHE_MAX_FILE_BYTES)
+    tts_cache = TTSCache(OUTPUT_DIR, max_bytes=TTS_CACHE_MAX_BYTES, in_flight=in_flight_files)
+    tts_service = TTSService(
+        cache=tts_cache,
+        synthesizer=backends.synthesizer,
+        audio_store=audio_store,
+        segment_max_chars=TTS_SEGMENT_MAX_CHARS,
+        max_concurrency=TTS_MAX_CONCURRENCY
+    )
+    audio_transcoder = AudioTranscoder(
+        OUTPUT_DIR,
+        default_bitrate=AUDIO_VARIANT_BITRATE,
+        bitrates=AUDIO_VARIANT_BITRATES,
+        max_workers=TRANSCODE_WORKERS,
+        timeout_seconds=TRANSCODE_TIMEOUT_SECONDS
+    )
+    audio_pipeline = AudioPipeline(
+        gemini_service,
+        tts_service,
+        preprocessor=audio_preprocessor,
+        transcription_cache=transcription_cache
+    )
+
+    # Background cleanup, started and stopped with the application
+    janitor = RetentionJanitor(
+        policies=[
+            RetentionPolicy("uploads", UPLOAD_DIR, UPLOAD_MAX_AGE_HOURS, UPLOAD_MAX_TOTAL_BYTES),
+            RetentionPolicy("outputs", OUTPUT_DIR, OUTPUT_MAX_AGE_HOURS, OUTPUT_MAX_TOTAL_BYTES)
+        ],
+        interval_seconds=JANITOR_INTERVAL_SECONDS,
+        in_flight=in_flight_files,
+        on_delete=_on_file_deleted,
+        shared_state=shared_state
+    )
+
+    _register_metrics()
+
+
+def _on_file_deleted(path: Path):
+    """Keep in-memory indexes in sync with files removed by the janitor"""
+    audio_store.discard(path.name)
+    tts_cache.discard(path.name)
+
+
+def _cache_samples(counter: str):
+    """Hit or miss counts of every cache, read at scrape time"""
+    samples = [
+        ({"cache": "tts"}, getattr(tts_cache, counter)),
+        ({"cache": "audio_hot_tier"}, getattr(audio_store, counter)),
+    ]
+    if response_cache is not None:
+        hits = response_cache.memory_hits + response_cache.persistent_hits
+        samples.append(({"cache": "response"}, hits if counter == "hits" else response_cache.misses))
+    if transcription_cache is not None:
+        hits = transcription_cache.memory_hits + transcription_cache.persistent_hits
+        samples.append(({"cache": "transcription"}, hits if counter == "hits" else transcription_cache.misses))
+    return samples
+
+
+def _tts_connection_samples():
+    """TTS requests on new and reused connections, for backends that pool them"""
+    stats = tts_service.synthesizer.connection_stats()
+    if not stats:
+        return []
+    return [
+        ({"connection": "new"}, stats["connections_opened"]),
+        ({"connection": "reused"}, stats["connections_reused"])
+    ]
+
+
+def _hedge_samples():
+    """Generation calls, hedges sent, hedges that finished first and hedges skipped for lack of quota"""
+    policy = gemini_service.hedge_policy
+    if policy is None:
+        return []
+    return [
+        ({"outcome": "calls"}, policy.calls),
+        ({"outcome": "hedged"}, policy.hedged),
+        ({"outcome": "won"}, policy.hedge_wins),
+        ({"outcome": "skipped"}, policy.skipped)
+    ]
+
+
+def _register_metrics():
+    """Export figures the services already track on /metrics without extra hot-path work"""
+    REGISTRY.register_collector(
+        "hindi_cache_hits_total", "counter", "Cache hits by cache (ratio = hits / (hits + misses))",
+        lambda: _cache_samples("hits")
+    )
+    REGISTRY.register_collector(
+        "hindi_cache_misses_total", "counter", "Cache misses by cache",
+        lambda: _cache_samples("misses")
+    )
+    REGISTRY.register_collector(
+        "hindi_singleflight_deduplicated_total", "counter", "Calls served by an identical in-flight call",
+        lambda: [
+            ({"group": "gemini"}, gemini_service.singleflight.deduplicated),
+            ({"group": "tts"}, tts_service.singleflight.deduplicated)
+        ]
+    )
+    REGISTRY.register_collector(
+        "hindi_tts_http_requests_total", "counter", "Requests sent to the TTS endpoint, by connection reuse",
+        _tts_connection_samples
+    )
+    REGISTRY.register_collector(
+        "hindi_audio_variants_total", "counter", "Reply audio variants by format, transcoded or served from disk",
+        lambda: [
+            ({"format": name, "result": "transcoded"}, count)
+            for name, count in audio_transcoder.transcodes.items()
+        ] + [
+            ({"format": name, "result": "cached"}, count)
+            for name, count in audio_transcoder.variant_hits.items()
+        ]
+    )
+    REGISTRY.register_collector(
+        "hindi_circuit_open", "gauge", "1 while the Gemini circuit breaker fails calls fast (0.5 half-open)",
+        lambda: [({"upstream": "gemini"}, CIRCUIT_STATE_VALUES[gemini_service.circuit_breaker.state])]
+    )
+    REGISTRY.register_collector(
+        "hindi_circuit_rejected_total", "counter", "Calls failed fast by the circuit breaker",
+        lambda: [({"upstream": "gemini"}, gemini_service.circuit_breaker.rejected)]
+    )
+    REGISTRY.register_collector(
+        "hindi_hedge_calls_total", "counter", "Hedged Gemini generation calls by outcome (hedge rate = hedged / calls, win rate = won / hedged)",
+        _hedge_samples
+    )
+    REGISTRY.register_collector(
+        "hindi_rate_limit_queue_depth", "gauge", "Gemini calls waiting for a rate limit slot",
+        lambda: [({}, gemini_scheduler.stats()["queue_depth"])]
+    )
+    REGISTRY.register_collector(
+        "hindi_rate_limit_in_flight", "gauge", "Gemini calls currently holding a slot",
+        lambda: [({}, gemini_scheduler.stats()["in_flight"])]
+    )
+    REGISTRY.register_collector(
+        "hindi_preprocess_bytes_total", "counter", "Audio bytes before and after preprocessing",
+        lambda: [
+            ({"direction": "in"}, audio_preprocessor.total_original_bytes),
+            ({"direction": "out"}, audio_preprocessor.total_processed_bytes)
+        ] if audio_preprocessor is not None else []
+    )
 
 
 # Pydantic model for text processing
 class TextRequest(BaseModel):
     text: str
+    use_cache: bool = True  # set False to bypass response memoization
+
+
+class BatchTextRequest(BaseModel):
+    texts: List[str]
+    use_cache: bool = True
+    concurrency: Optional[int] = None  # defaults to (and is capped at) BATCH_MAX_CONCURRENCY
+    archive: bool = False  # bundle the audio and a manifest into one zip file
 
 
 @router.post("/process-audio")
-async def process_audio(audio_file: UploadFile = File(...)):
+async def process_audio(
+    http_request: Request,
+    audio_file: UploadFile = File(...),
+    use_cache: bool = Query(True, description="Set false to bypass response memoization")
+):
     """
     Process uploaded audio files (for file upload functionality)
     
@@ -43,11 +323,15 @@ async def process_audio(audio_file: UploadFile = File(...)):
     Note: For live recording, use /process-text endpoint with Web Speech API
     
     Args:
+        http_request: Incoming request (identifies the client for fair scheduling)
         audio_file: Uploaded audio file
+        use_cache: Serve memoized responses when available
         
     Returns:
         JSON with transcription, response, and audio URL
     """
+    audio_path = None
+    timer = StageTimer()
     try:
         logger.info(f"Received audio file: {audio_file.filename}")
         
@@ -59,60 +343,43 @@ async def process_audio(audio_file: UploadFile = File(...)):
                 detail=f"Invalid file format. Allowed formats: {', '.join(ALLOWED_AUDIO_EXTENSIONS)}"
             )
         
-        # Save uploaded audio file
-        audio_path = UPLOAD_DIR / audio_file.filename
-        with open(audio_path, "wb") as f:
-            content = await audio_file.read()
-            f.write(content)
-        
-        logger.info(f"Audio file saved to: {audio_path}")
-        
-        # Step 1: Transcribe Hindi speech to text using Gemini
-        logger.info("Transcribing audio with Gemini...")
-        transcription = await gemini_service.transcribe_audio(str(audio_path))
-        
-        if not transcription:
+        # Save uploaded audio file (streamed in chunks, size-limited)
+        try:
+            with timer.stage("upload"):
+                audio_path, audio_data, content_hash = await save_upload(audio_file, UPLOAD_DIR, MAX_UPLOAD_SIZE)
+        except UploadTooLargeError:
             raise HTTPException(
-                status_code=429,
-                detail="Failed to transcribe audio. If you're getting rate limited, please wait 2-3 minutes and try again. Otherwise, ensure the audio is clear and in Hindi."
+                status_code=413,
+                detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
             )
         
-        logger.info(f"Transcription: {transcription}")
+        # Keep the retention janitor away from the upload until we are done
+        in_flight_files.acquire(audio_path)
         
-        # Step 2: Generate Hindi response using Gemini LLM
-        logger.info("Generating response with Gemini LLM...")
-        response_text = await gemini_service.generate_response(transcription)
+        logger.info(f"Audio file saved to: {audio_path} ({len(audio_data)} bytes)")
         
-        if not response_text:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate response"
+        mime_type = get_audio_mime_type(file_ext)
+        try:
+            result = await audio_pipeline.run(
+                audio_data,
+                mime_type,
+                use_cache=use_cache,
+                client_id=_client_id(http_request),
+                timer=timer,
+                content_hash=content_hash
             )
-        
-        logger.info(f"Response: {response_text}")
-        
-        # Step 3: Convert response to speech using gTTS
-        logger.info("Converting response to speech...")
-        audio_filename = f"response_{Path(audio_file.filename).stem}.mp3"
-        audio_output_path = OUTPUT_DIR / audio_filename
-        
-        success = await tts_service.text_to_speech(response_text, str(audio_output_path))
-        
-        if not success:
+        except PipelineError as e:
             raise HTTPException(
-                status_code=500,
-                detail="Failed to generate speech audio"
+                status_code=e.status_code,
+                detail=e.detail,
+                headers=_retry_after_headers(e.retry_after)
             )
         
-        logger.info(f"Audio response saved to: {audio_output_path}")
-        
         # Return response with audio file URL
         return JSONResponse(content={
             "success": True,
-            "transcription": transcription,
-            "response": response_text,
-            "audio_url": f"/api/audio/{audio_filename}"
-        })
+            **result.to_dict()
+        }, headers={"Server-Timing": timer.header()})
         
     except HTTPException as he:
         raise he
@@ -122,36 +389,189 @@ async def process_audio(audio_file: UploadFile = File(...)):
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+    finally:
+        if audio_path is not None:
+            in_flight_files.release(audio_path)
 
 
 @router.get("/audio/{filename}")
-async def get_audio(filename: str):
+async def get_audio(
+    filename: str,
+    request: Request,
+    audio_format: Optional[str] = Query(None, alias="format", description="mp3, opus (Opus in OGG) or webm"),
+    bitrate: Optional[str] = Query(None, description="Bitrate of an Opus variant, e.g. 24k")
+):
     """
     Serve generated audio files
     
+    Supports single byte ranges (206) for seeking and strong ETags with
+    If-None-Match (304). Content-addressed files are marked immutable so
+    browsers replay them from cache. Recently generated clips are served
+    from memory.
+    
+    MP3 replies can be requested as Opus with ?format= or an Accept header
+    naming audio/ogg or audio/webm. Each variant is transcoded once and
+    served from disk afterwards; without ffmpeg, negotiation falls back to MP3.
+    
     Args:
         filename: Name of the audio file
+        request: Incoming request (conditional, range and Accept headers)
+        audio_format: Requested format (overrides the Accept header)
+        bitrate: Requested Opus bitrate (defaults to AUDIO_VARIANT_BITRATE)
         
     Returns:
         Audio file response
     """
+    if not is_safe_filename(filename):
+        raise HTTPException(
+            status_code=404,
+            detail="Audio file not found"
+        )
+    
+    format_name = _requested_format(filename, audio_format, request.headers.get("accept"))
+    bitrate = bitrate or audio_transcoder.default_bitrate
+    if not audio_transcoder.is_valid_bitrate(bitrate):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported bitrate; use one of {', '.join(audio_transcoder.bitrates)}"
+        )
+    
+    timer = StageTimer()
+    with timer.stage("lookup"):
+        blob, stat_result = await _lookup_audio(filename)
+    
+    if format_name != SOURCE_FORMAT:
+        with timer.stage("transcode"):
+            variant = await audio_transcoder.get_variant(filename, format_name, bitrate)
+        # A failed transcode still leaves the MP3, which every client can play
+        if variant is not None:
+            filename = variant
+            blob, stat_result = await _lookup_audio(filename)
+    
     audio_path = OUTPUT_DIR / filename
+    media_type = media_type_for(filename)
+    if blob is not None:
+        size = len(blob.data)
+        etag = blob.etag
+    else:
+        size = stat_result.st_size
+        etag = make_etag(filename, size, stat_result.st_mtime_ns)
+    
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable" if is_content_addressed(filename) else "no-cache",
+        "Last-Modified": formatdate(
+            blob.last_modified if blob is not None else stat_result.st_mtime, usegmt=True
+        ),
+        # The same URL yields MP3 or Opus depending on the Accept header
+        "Vary": "Accept",
+        "Server-Timing": timer.header()
+    }
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    # A Range is only honoured if the client's copy is still current
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None
+    
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except RangeNotSatisfiableError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        if blob is not None:
+            return Response(content=blob.data, media_type=media_type, headers=headers)
+        return FileResponse(
+            path=audio_path,
+            media_type=media_type,
+            headers=headers,
+            stat_result=stat_result
+        )
+    
+    start, end = byte_range
+    if blob is not None:
+        body = blob.data[start:end + 1]
+    else:
+        with timer.stage("read"):
+            body = await asyncio.to_thread(_read_range, audio_path, start, end - start + 1)
+    
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Server-Timing"] = timer.header()
+    return Response(content=body, status_code=206, media_type=media_type, headers=headers)
+
+
+def _requested_format(filename: str, audio_format: Optional[str], accept: Optional[str]) -> str:
+    """
+    Resolve the format to serve a file in
     
-    if not audio_path.exists():
+    Args:
+        filename: Name of the requested file
+        audio_format: Value of the ?format= parameter (or None)
+        accept: Value of the Accept header (or None)
+        
+    Returns:
+        SOURCE_FORMAT to serve the file as stored, otherwise a key of OUTPUT_FORMATS
+        
+    Raises:
+        HTTPException: 400 for an unknown format, 406 if an explicitly
+            requested format cannot be produced
+    """
+    transcodable = Path(filename).suffix.lower() == ".mp3" and audio_transcoder.available
+    if audio_format is None:
+        return audio_transcoder.negotiate(accept) if transcodable else SOURCE_FORMAT
+    
+    format_name = audio_transcoder.resolve_format(audio_format)
+    if format_name is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported audio format; use one of {', '.join([SOURCE_FORMAT, *OUTPUT_FORMATS])}"
+        )
+    if format_name == SOURCE_FORMAT:
+        return SOURCE_FORMAT
+    if not transcodable:
+        raise HTTPException(
+            status_code=406,
+            detail=f"This file cannot be served as {format_name}"
+        )
+    return format_name
+
+
+async def _lookup_audio(filename: str):
+    """
+    Find an audio file in the hot tier or on disk
+    
+    Returns:
+        (blob, None) for a clip held in memory, (None, stat_result) otherwise
+        
+    Raises:
+        HTTPException: 404 if the file does not exist
+    """
+    blob = audio_store.get(filename)
+    if blob is not None:
+        return blob, None
+    try:
+        return None, await asyncio.to_thread(os.stat, OUTPUT_DIR / filename)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=404,
             detail="Audio file not found"
         )
-    
-    return FileResponse(
-        path=audio_path,
-        media_type="audio/mpeg",
-        filename=filename
-    )
+
+
+def _read_range(path: Path, start: int, length: int) -> bytes:
+    """Read part of a file (blocking)"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
 
 
 @router.post("/process-text")
-async def process_text(request: TextRequest):
+async def process_text(request: TextRequest, http_request: Request):
     """
     Process text directly (from Web Speech API)
     
@@ -163,16 +583,29 @@ async def process_text(request: TextRequest):
     
     Args:
         request: TextRequest with transcribed text
+        http_request: Incoming request (identifies the client for fair scheduling)
         
     Returns:
         JSON with transcription, response, and audio URL
     """
+    timer = StageTimer()
     try:
         logger.info(f"Received text for processing: {request.text}")
         
         # Step 1: Generate Hindi response using Gemini LLM
         logger.info("Generating response with Gemini LLM...")
-        response_text = await gemini_service.generate_response(request.text)
+        with timer.stage("generate"):
+            try:
+                response_text = await gemini_service.generate_response(
+                    request.text, use_cache=request.use_cache, client_id=_client_id(http_request)
+                )
+            except UpstreamError as e:
+                error = PipelineError.from_upstream(e, "generate response")
+                raise HTTPException(
+                    status_code=error.status_code,
+                    detail=error.detail,
+                    headers=_retry_after_headers(error.retry_after)
+                )
         
         if not response_text:
             raise HTTPException(
@@ -184,14 +617,10 @@ async def process_text(request: TextRequest):
         
         # Step 2: Convert response to speech using gTTS
         logger.info("Converting response to speech...")
-        import uuid
-        unique_id = str(uuid.uuid4())
-        audio_filename = f"response_text_{unique_id}.mp3"
-        audio_output_path = OUTPUT_DIR / audio_filename
-        
-        success = await tts_service.text_to_speech(response_text, str(audio_output_path))
+        with timer.stage("tts"):
+            audio_output_path = await tts_service.synthesize(response_text)
         
-        if not success:
+        if not audio_output_path:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to generate speech audio"
@@ -200,11 +629,11 @@ async def process_text(request: TextRequest):
         logger.info(f"Audio response saved to: {audio_output_path}")
         
         # Return results
-        return {
+        return JSONResponse(content={
             "transcription": request.text,  # Return the original text
             "response": response_text,
-            "audio_url": f"/api/audio/{audio_filename}"
-        }
+            "audio_url": f"/api/audio/{audio_output_path.name}"
+        }, headers={"Server-Timing": timer.header()})
         
     except HTTPException:
         raise
@@ -216,35 +645,313 @@ async def process_text(request: TextRequest):
         )
 
 
+@router.post("/process-text/stream")
+async def process_text_stream(request: TextRequest, http_request: Request):
+    """
+    Process text with sentence-level streaming (NDJSON)
+    
+    The Gemini response is read as a stream and split at Devanagari
+    sentence boundaries. Each finished sentence is sent to TTS right away,
+    so the first audio clip is ready while later sentences are still being
+    generated. Events are emitted one JSON object per line, in order:
+    
+    - {"type": "transcription", "text": ...}
+    - {"type": "sentence", "index": n, "text": ..., "audio_url": ...}
+    - {"type": "done", "response": ...}
+    - {"type": "error", "detail": ...}
+    
+    Args:
+        request: TextRequest with transcribed text
+        http_request: Incoming request (identifies the client for fair scheduling)
+        
+    Returns:
+        NDJSON stream of pipeline events
+    """
+    logger.info(f"Received text for streaming: {request.text}")
+    
+    client_id = _client_id(http_request)
+    
+    async def event_stream():
+        replies = audio_pipeline.stream_reply(request.text, use_cache=request.use_cache, client_id=client_id)
+        sentences = []
+        try:
+            yield _ndjson({"type": "transcription", "text": request.text})
+            
+            try:
+                async for sentence, audio_path in replies:
+                    if not audio_path:
+                        yield _ndjson({"type": "error", "detail": "Failed to generate speech audio"})
+                        return
+                    
+                    yield _ndjson({
+                        "type": "sentence",
+                        "index": len(sentences),
+                        "text": sentence,
+                        "audio_url": f"/api/audio/{audio_path.name}"
+                    })
+                    sentences.append(sentence)
+            except Exception as e:
+                logger.error(f"Error streaming text: {str(e)}")
+                yield _ndjson(_error_event(e, "generate response"))
+                return
+            
+            if not sentences:
+                yield _ndjson({"type": "error", "detail": "Failed to generate response"})
+                return
+            
+            yield _ndjson({"type": "done", "response": " ".join(sentences)})
+        finally:
+            # Client went away or the pipeline failed: stop outstanding work
+            await replies.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/process-text/batch")
+async def process_text_batch(request: BatchTextRequest, http_request: Request):
+    """
+    Process many texts in one request, streaming results as NDJSON
+    
+    Texts are processed by a bounded pool of workers. Gemini calls go
+    through the shared rate limit scheduler at low priority, so a batch runs
+    at the quota limit without delaying interactive requests. Each result is
+    emitted as soon as it finishes (not in input order):
+    
+    - {"type": "result", "index": i, "text": ..., "response": ..., "audio_url": ...}
+    - {"type": "error", "index": i, "detail": ...}
+    - {"type": "done", "completed": n, "failed": m, "archive_url": ...}
+    
+    Args:
+        request: BatchTextRequest with the texts and options
+        http_request: Incoming request (identifies the client for fair scheduling)
+        
+    Returns:
+        NDJSON stream of per-text results
+    """
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="No texts provided")
+    if len(request.texts) > BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many texts. Maximum batch size is {BATCH_MAX_TEXTS}"
+        )
+    
+    concurrency = min(request.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY, len(request.texts))
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="Concurrency must be at least 1")
+    
+    logger.info(f"Received batch of {len(request.texts)} texts (concurrency {concurrency})")
+    client_id = _client_id(http_request)
+    results: asyncio.Queue = asyncio.Queue()
+    indexes = iter(range(len(request.texts)))
+    # index -> audio path, held against cleanup until the archive is written
+    archived = {}
+    
+    async def process_one(index: int) -> dict:
+        text = request.texts[index]
+        try:
+            response_text = await gemini_service.generate_response(
+                text, use_cache=request.use_cache, client_id=client_id, priority=PRIORITY_LOW
+            )
+        except Exception as e:
+            logger.error(f"Error generating response for batch item {index}: {str(e)}")
+            return {"index": index, **_error_event(e, "generate response")}
+        if not response_text:
+            return {"type": "error", "index": index, "detail": "Failed to generate response"}
+        
+        try:
+            audio_path = await tts_service.synthesize(response_text)
+        except Exception as e:
+            logger.error(f"Error synthesizing speech for batch item {index}: {str(e)}")
+            return {"index": index, **_error_event(e, "generate speech audio")}
+        if not audio_path:
+            return {"type": "error", "index": index, "detail": "Failed to generate speech audio"}
+        
+        if request.archive:
+            in_flight_files.acquire(audio_path)
+            archived[index] = audio_path
+        return {
+            "type": "result",
+            "index": index,
+            "text": text,
+            "response": response_text,
+            "audio_url": f"/api/audio/{audio_path.name}"
+        }
+    
+    async def worker():
+        for index in indexes:
+            try:
+                await results.put(await process_one(index))
+            except Exception as e:
+                logger.error(f"Error processing batch item {index}: {str(e)}")
+                await results.put({"index": index, **_error_event(e, "process text")})
+    
+    async def event_stream():
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        manifest = []
+        failed = 0
+        try:
+            for _ in range(len(request.texts)):
+                event = await results.get()
+                if event["type"] == "result":
+                    manifest.append(event)
+                else:
+                    failed += 1
+                yield _ndjson(event)
+            
+            archive_url = None
+            if request.archive and manifest:
+                archive_url = await _write_batch_archive(manifest, archived)
+            
+            yield _ndjson({
+                "type": "done",
+                "completed": len(manifest),
+                "failed": failed,
+                "archive_url": archive_url
+            })
+        finally:
+            # Client went away: stop outstanding work
+            for task in workers:
+                task.cancel()
+            for audio_path in archived.values():
+                in_flight_files.release(audio_path)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _write_batch_archive(manifest: List[dict], audio_paths: dict) -> Optional[str]:
+    """Zip a batch's audio files with a manifest; returns the archive URL or None"""
+    manifest = sorted(manifest, key=lambda event: event["index"])
+    members = []
+    entries = []
+    for event in manifest:
+        arcname = f"{event['index']:04d}.mp3"
+        members.append((arcname, audio_paths[event["index"]]))
+        entries.append({
+            "index": event["index"],
+            "text": event["text"],
+            "response": event["response"],
+            "file": arcname
+        })
+    
+    archive_path = OUTPUT_DIR / f"batch_{uuid.uuid4().hex}.zip"
+    try:
+        await asyncio.to_thread(
+            write_zip_archive,
+            archive_path,
+            members,
+            {"manifest.json": json.dumps(entries, ensure_ascii=False, indent=2).encode("utf-8")}
+        )
+    except Exception as e:
+        logger.error(f"Failed to write batch archive: {str(e)}")
+        return None
+    
+    logger.info(f"Batch archive saved to: {archive_path}")
+    return f"/api/audio/{archive_path.name}"
+
+
+def _client_id(http_request: Request) -> str:
+    """Identify the caller for per-client fair scheduling"""
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def _retry_after_headers(retry_after: Optional[float]) -> Optional[dict]:
+    """Retry-After header for a 429/503 response (whole seconds, rounded up)"""
+    if retry_after is None:
+        return None
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+def _error_event(error: Exception, action: str) -> dict:
+    """Streaming error event for the failed action; upstream outages carry the status and a retry_after hint"""
+    if isinstance(error, UpstreamError):
+        return {
+            "type": "error",
+            "detail": PipelineError.from_upstream(error, action).detail,
+            "status_code": error.status_code,
+            "retry_after": max(1, math.ceil(error.retry_after or 1))
+        }
+    return {"type": "error", "detail": f"Failed to {action}"}
+
+
+def _ndjson(event: dict) -> str:
+    """Serialize one streaming event as an NDJSON line"""
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+@router.get("/stats")
+async def get_stats(http_request: Request):
+    """
+    Report cache and scheduler statistics
+    
+    Args:
+        http_request: Incoming request (gives access to the startup report)
+    
+    Returns:
+        Hit ratio and occupancy for each cache, queue depth and wait times
+        for the Gemini rate limit scheduler, deduplicated call counts, and
+        this process's startup time and admission control figures
+    """
+    return {
+        "startup": getattr(http_request.app.state, "startup", None),
+        "admission": http_request.app.state.admission.stats() if getattr(http_request.app.state, "admission", None) else None,
+        "backends": backends.stats(),
+        "tts_cache": tts_service.cache.stats(),
+        "tts": tts_service.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "transcription_cache": transcription_cache.stats() if transcription_cache else None,
+        "audio_store": audio_store.stats(),
+        "transcoder": audio_transcoder.stats(),
+        "janitor": janitor.stats(),
+        "gemini_scheduler": gemini_scheduler.stats(),
+        "gemini": gemini_service.stats(),
+        "audio_preprocessing": audio_preprocessor.stats() if audio_preprocessor else None,
+        "singleflight": {
+            "gemini": gemini_service.singleflight.stats(),
+            "tts": tts_service.singleflight.stats(),
+            "transcode": audio_transcoder.singleflight.stats()
+        }
+    }
+
+
 @router.delete("/cleanup")
-async def cleanup_files():
+async def cleanup_files(
+    purge: bool = Query(False, description="Delete every file not used by an in-flight request")
+):
     """
     Clean up uploaded and generated files
     
+    Runs a retention sweep now instead of waiting for the background
+    janitor. The sweep runs in a worker thread and never deletes files that
+    in-flight requests are still using.
+    
+    Args:
+        purge: Ignore the age/size limits and delete everything not in flight
+    
     Returns:
-        Success message
+        Success message with files deleted, bytes reclaimed and runtime
     """
     try:
-        # Clean uploads
-        upload_count = 0
-        for file in UPLOAD_DIR.glob("*"):
-            if file.is_file():
-                file.unlink()
-                upload_count += 1
-        
-        # Clean outputs
-        output_count = 0
-        for file in OUTPUT_DIR.glob("*"):
-            if file.is_file():
-                file.unlink()
-                output_count += 1
+        report = await janitor.run_once(purge=purge)
+        upload_count = report["directories"]["uploads"]["files_deleted"]
+        output_count = report["directories"]["outputs"]["files_deleted"]
         
         logger.info(f"Cleaned {upload_count} uploads and {output_count} outputs")
         
         return {
             "message": "Files cleaned up successfully",
             "uploads_deleted": upload_count,
-            "outputs_deleted": output_count
+            "outputs_deleted": output_count,
+            "bytes_reclaimed": report["bytes_reclaimed"],
+            "runtime_seconds": report["runtime_seconds"]
         }
     except Exception as e:
         logger.error(f"Cleanup failed: {str(e)}")
@@ -0,0 +1,182 @@
+"""
+Asynchronous Job API Endpoints
+Submit audio for background processing, then poll (or long-poll) for the result
+"""
+
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+import logging
+from pathlib import Path
+from typing import Optional
+
+from routes import audio
+from routes.audio import _client_id
+from services.job_queue import JobManager, JobQueueFullError
+from services.job_store import JobStore, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED
+from utils.file_utils import save_upload, get_audio_mime_type, UploadTooLargeError, in_flight_files
+from utils.metrics import REGISTRY
+from config import (
+    UPLOAD_DIR, ALLOWED_AUDIO_EXTENSIONS, MAX_UPLOAD_SIZE,
+    JOB_WORKERS, JOB_MAX_QUEUE, JOB_RESULT_TTL_SECONDS, JOB_MAX_WAIT_SECONDS, JOB_DB
+)
+
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Built by init_services() from the application's startup hook, after the
+# audio services; workers are started with the application
+job_manager: Optional[JobManager] = None
+
+
+def init_services():
+    """Build the job manager and register its metrics (idempotent)"""
+    global job_manager
+
+    if job_manager is not None:
+        return
+
+    job_manager = JobManager(
+        store=JobStore(JOB_DB or None),
+        pipeline=audio.audio_pipeline,
+        workers=JOB_WORKERS,
+        max_queue=JOB_MAX_QUEUE,
+        result_ttl_seconds=JOB_RESULT_TTL_SECONDS,
+        in_flight=in_flight_files
+    )
+
+    REGISTRY.register_collector(
+        "hindi_job_queue_depth", "gauge", "Jobs waiting for a worker",
+        lambda: [({}, job_manager.queue_depth)]
+    )
+    REGISTRY.register_collector(
+        "hindi_jobs_running", "gauge", "Jobs currently being processed",
+        lambda: [({}, job_manager.running)]
+    )
+
+
+@router.post("", status_code=202)
+async def submit_job(
+    http_request: Request,
+    audio_file: UploadFile = File(...),
+    use_cache: bool = Query(True, description="Set false to bypass response memoization")
+):
+    """
+    Submit an audio file for background processing
+
+    The upload is saved and queued; the connection is released right away.
+    Poll the status URL (optionally with ?wait=seconds to long-poll) until
+    the job has finished.
+
+    Args:
+        http_request: Incoming request (identifies the client for fair scheduling)
+        audio_file: Uploaded audio file
+        use_cache: Serve memoized responses when available
+
+    Returns:
+        202 with the job id and status URLs, or 503 with Retry-After when the queue is full
+    """
+    logger.info(f"Received audio file for job: {audio_file.filename}")
+
+    file_ext = Path(audio_file.filename).suffix.lower()
+    if file_ext not in ALLOWED_AUDIO_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file format. Allowed formats: {', '.join(ALLOWED_AUDIO_EXTENSIONS)}"
+        )
+
+    try:
+        audio_path, _, _ = await save_upload(audio_file, UPLOAD_DIR, MAX_UPLOAD_SIZE, keep_contents=False)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+        )
+
+    try:
+        job = await job_manager.submit(
+            audio_path, get_audio_mime_type(file_ext), use_cache, _client_id(http_request)
+        )
+    except JobQueueFullError as e:
+        audio_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Too many queued jobs. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    status_url = f"/api/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content={
+            **job.to_dict(),
+            "status_url": status_url,
+            "result_url": f"{status_url}/result"
+        },
+        headers={"Location": status_url}
+    )
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish (long-poll)")
+):
+    """
+    Get the status of a job
+
+    Args:
+        job_id: Job identifier
+        wait: Long-poll for up to this many seconds (capped by JOB_MAX_WAIT_SECONDS)
+
+    Returns:
+        Job status, with the result or error once finished
+    """
+    job = await job_manager.wait(job_id, min(wait, JOB_MAX_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Get the result of a finished job
+
+    Args:
+        job_id: Job identifier
+
+    Returns:
+        The pipeline result (same shape as /api/process-audio), 202 while the
+        job is pending, or the job's error status if it failed
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    if job.status == JOB_SUCCEEDED:
+        return {"success": True, **job.result}
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    if job.status == JOB_CANCELLED:
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+
+    return JSONResponse(status_code=202, content=job.to_dict(), headers={"Retry-After": "1"})
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job
+
+    Args:
+        job_id: Job identifier
+
+    Returns:
+        Job status after cancellation (finished jobs are left unchanged)
+    """
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
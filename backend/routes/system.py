@@ -3,7 +3,9 @@ System Health Check API Endpoints
 """
 
 from fastapi import APIRouter
+from fastapi.responses import Response
 from config import APP_TITLE, APP_VERSION
+from utils.metrics import REGISTRY, CONTENT_TYPE
 
 # Create router
 router = APIRouter(tags=["system"])
@@ -23,7 +25,12 @@ async def root():
             "/health": "Health check",
             "/api/process-audio": "Process audio file",
             "/api/process-text": "Process text directly",
+            "/api/process-text/stream": "Process text with streamed per-sentence audio (NDJSON)",
+            "/api/process-text/batch": "Process many texts with bounded concurrency (NDJSON, optional zip)",
             "/api/audio/{filename}": "Get audio file",
+            "/api/jobs": "Submit audio for background processing (then poll /api/jobs/{job_id})",
+            "/api/stats": "Cache and scheduler statistics",
+            "/metrics": "Prometheus metrics",
             "/api/cleanup": "Clean temporary files",
             "/docs": "API documentation"
         }
@@ -39,3 +46,15 @@ async def health_check():
         "status": "healthy",
         "version": APP_VERSION
     }
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics endpoint
+    
+    Stage and rate-limit latency histograms, HTTP request counts, latency
+    and bytes per route, upstream error classes and cache hit counts, in
+    the Prometheus text exposition format.
+    """
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,159 @@
+"""
+Voice WebSocket Endpoint
+Full-duplex conversation: microphone PCM in, partial transcripts and reply audio out
+"""
+
+from fastapi import APIRouter, Query, WebSocket
+import json
+import logging
+from typing import Set
+
+from routes import audio
+from routes.audio import _client_id
+from services.voice_activity import SpeechSegmenter
+from services.voice_session import VoiceSession
+from utils.metrics import REGISTRY
+from config import (
+    VOICE_SAMPLE_RATE, VOICE_FRAME_MS, VOICE_SPEECH_THRESHOLD_DBFS, VOICE_NOISE_MARGIN_DB,
+    VOICE_SEGMENT_SILENCE_MS, VOICE_END_OF_TURN_MS, VOICE_MIN_SPEECH_MS, VOICE_MAX_SEGMENT_SECONDS,
+    VOICE_PADDING_MS, VOICE_BARGE_IN, VOICE_MAX_SESSIONS, VOICE_MAX_MESSAGE_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/api", tags=["voice"])
+
+# WebSocket close codes (RFC 6455)
+CLOSE_TOO_BIG = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+
+active_sessions: Set[VoiceSession] = set()
+session_counts = {"accepted": 0, "rejected": 0}
+
+
+@router.websocket("/voice")
+async def voice(
+    websocket: WebSocket,
+    sample_rate: int = Query(VOICE_SAMPLE_RATE, ge=8000, le=48000, description="Sample rate of the PCM sent"),
+    use_cache: bool = Query(True, description="Set false to bypass response memoization"),
+    audio_delivery: str = Query("binary", alias="audio", pattern="^(binary|url)$",
+                                description="binary: reply audio follows each reply event; url: links only")
+):
+    """
+    Converse by voice over a WebSocket
+
+    The client streams 16-bit little-endian mono PCM as binary messages
+    (20-100 ms each is typical) and may send JSON text commands:
+
+    - {"type": "end"}: the speaker has stopped (push-to-talk release); ends the turn now
+    - {"type": "cancel"}: stop the reply in progress
+
+    The server splits the stream at pauses and transcribes each segment
+    while the speaker is still talking. A longer pause ends the turn; the
+    reply is then generated and synthesized sentence by sentence. Events
+    are JSON text messages:
+
+    - {"type": "ready", "sample_rate": ..., "end_of_turn_ms": ...}
+    - {"type": "speech_start", "turn": n, "start_ms": ...}
+    - {"type": "partial", "turn": n, "segment": i, "text": ..., "start_ms": ..., "end_ms": ...}
+    - {"type": "transcript", "turn": n, "text": ..., "end_ms": ...}
+    - {"type": "reply", "turn": n, "index": i, "text": ..., "audio_url": ..., "audio_bytes": ...}
+      followed by the MP3 clip as a binary message when audio_bytes > 0
+    - {"type": "reply_done", "turn": n, "response": ..., "latency_ms": {...}}
+    - {"type": "interrupted", "turn": n}
+    - {"type": "error", "turn": n, "detail": ..., "status_code": ..., "retry_after": ...}
+
+    Stream times (*_ms) are measured from the first sample sent.
+
+    Args:
+        websocket: The connection
+        sample_rate: Sample rate of the client's PCM
+        use_cache: Serve memoized responses when available
+        audio_delivery: How reply audio is delivered
+    """
+    await websocket.accept()
+    if len(active_sessions) >= VOICE_MAX_SESSIONS:
+        session_counts["rejected"] += 1
+        await websocket.send_text(json.dumps({
+            "type": "error",
+            "status_code": 503,
+            "detail": "Server is busy. Please retry later.",
+            "retry_after": 5
+        }))
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+
+    segmenter = SpeechSegmenter(
+        sample_rate=sample_rate,
+        frame_ms=VOICE_FRAME_MS,
+        threshold_dbfs=VOICE_SPEECH_THRESHOLD_DBFS,
+        noise_margin_db=VOICE_NOISE_MARGIN_DB,
+        segment_silence_ms=VOICE_SEGMENT_SILENCE_MS,
+        end_of_turn_ms=VOICE_END_OF_TURN_MS,
+        min_speech_ms=VOICE_MIN_SPEECH_MS,
+        max_segment_seconds=VOICE_MAX_SEGMENT_SECONDS,
+        padding_ms=VOICE_PADDING_MS
+    )
+    session = VoiceSession(
+        websocket,
+        audio.audio_pipeline,
+        audio.audio_store,
+        segmenter,
+        client_id=_client_id(websocket),
+        use_cache=use_cache,
+        send_audio=audio_delivery == "binary",
+        barge_in=VOICE_BARGE_IN
+    )
+    active_sessions.add(session)
+    session_counts["accepted"] += 1
+    logger.info(f"Voice session opened ({sample_rate} Hz)")
+
+    try:
+        await session.start()
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes") is not None:
+                if len(message["bytes"]) > VOICE_MAX_MESSAGE_BYTES:
+                    await session.send({
+                        "type": "error",
+                        "detail": f"Audio messages must not exceed {VOICE_MAX_MESSAGE_BYTES} bytes"
+                    })
+                    await websocket.close(code=CLOSE_TOO_BIG)
+                    break
+                await session.feed(message["bytes"])
+                continue
+
+            command = _parse_command(message.get("text"))
+            if command == "end":
+                await session.end_turn()
+            elif command == "cancel":
+                await session.cancel_reply()
+            else:
+                await session.send({"type": "error", "detail": "Unknown command; send {\"type\": \"end\"} or {\"type\": \"cancel\"}"})
+    finally:
+        active_sessions.discard(session)
+        await session.close()
+        logger.info(f"Voice session closed: {session.stats()}")
+
+
+def _parse_command(text) -> str:
+    """The type of a JSON command message, or "" if it is not one"""
+    try:
+        command = json.loads(text)
+    except (TypeError, ValueError):
+        return ""
+    return command.get("type", "") if isinstance(command, dict) else ""
+
+
+REGISTRY.register_collector(
+    "hindi_voice_sessions", "gauge", "Open voice WebSocket sessions",
+    lambda: [({}, len(active_sessions))]
+)
+REGISTRY.register_collector(
+    "hindi_voice_sessions_total", "counter", "Voice WebSocket sessions by outcome (accepted, or rejected at VOICE_MAX_SESSIONS)",
+    lambda: [({"outcome": outcome}, count) for outcome, count in session_counts.items()]
+)
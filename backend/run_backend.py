@@ -1,11 +1,17 @@
 """
 Backend Server Startup Script
 Run this file to start the Hindi AI Assistant backend server
+
+    python run_backend.py                  # development: one process, auto-reload
+    python run_backend.py --production     # one worker process per CPU core, no reload
+    python run_backend.py --workers 4      # four worker processes, no reload
 """
 
+import argparse
+import os
 import uvicorn
 import logging
-from config import HOST, PORT, RELOAD, APP_TITLE, APP_VERSION
+from config import BASE_DIR, HOST, PORT, RELOAD, WORKERS, APP_TITLE, APP_VERSION
 
 # Configure logging
 logging.basicConfig(
@@ -15,8 +21,58 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# State every worker process must see the same copy of, and its default file
+SHARED_FILES = {
+    "SHARED_STATE_DB": BASE_DIR / "shared_state.db",
+    "RESPONSE_CACHE_DB": BASE_DIR / "response_cache.db",
+    "JOB_DB": BASE_DIR / "jobs.db",
+    "TRANSCRIPTION_CACHE_DB": BASE_DIR / "transcription_cache.db",
+}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description=f"{APP_TITLE} backend server")
+    parser.add_argument(
+        "--production", action="store_true",
+        help="Turn auto-reload off and start one worker process per CPU core (unless WORKERS is set)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Number of worker processes (implies no auto-reload when above 1)"
+    )
+    return parser.parse_args()
+
+
+def resolve_workers(args: argparse.Namespace) -> int:
+    """Number of worker processes to start"""
+    if args.workers is not None:
+        return max(1, args.workers)
+    if args.production and "WORKERS" not in os.environ:
+        return os.cpu_count() or 1
+    return max(1, WORKERS)
+
+
+def share_state_across_workers():
+    """
+    Point every worker process at the same SQLite files
+
+    Workers are spawned as fresh interpreters and read their settings from
+    the environment, so the paths are set there before uvicorn starts them.
+    Explicit non-empty settings win.
+    """
+    for name, default in SHARED_FILES.items():
+        if not os.environ.get(name):
+            os.environ[name] = str(default)
+        logger.info(f"🔗 {name}: {os.environ[name]}")
+
+
 def main():
     """Start the FastAPI backend server"""
+    args = parse_args()
+    workers = resolve_workers(args)
+    reload = RELOAD and not args.production and workers == 1
+
     logger.info("=" * 70)
     logger.info(f"🚀 {APP_TITLE} - Backend Server")
     logger.info(f"📦 Version: {APP_VERSION}")
@@ -24,6 +80,9 @@ def main():
     logger.info(f"🌐 Starting server on http://{HOST}:{PORT}")
     logger.info(f"📚 API Documentation: http://{HOST}:{PORT}/docs")
     logger.info(f"📖 Alternative Docs: http://{HOST}:{PORT}/redoc")
+    logger.info(f"⚙️  Workers: {workers} (auto-reload {'on' if reload else 'off'})")
+    if workers > 1:
+        share_state_across_workers()
     logger.info("=" * 70)
     logger.info("Press CTRL+C to stop the server")
     logger.info("=" * 70)
@@ -33,7 +92,8 @@ def main():
             "app:app",
             host=HOST,
             port=PORT,
-            reload=RELOAD,
+            reload=reload,
+            workers=workers,
             log_level="info"
         )
     except KeyboardInterrupt:
@@ -0,0 +1,230 @@
+"""
+Audio Preprocessor - Shrinks uploads before transcription
+Detects the container, trims silence, downmixes to mono, resamples and re-encodes,
+and splits long recordings into overlapping segments at silence boundaries
+"""
+
+import asyncio
+import io
+import logging
+import shutil
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from utils.file_utils import detect_audio_format, CONTAINER_MIME_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreprocessedAudio:
+    """Result of preprocessing one upload"""
+    data: bytes
+    mime_type: str
+    source_format: Optional[str]
+    original_bytes: int
+    processed_bytes: int
+    duration_ms: Optional[int] = None
+    trimmed_ms: int = 0
+    # Overlapping pieces of a long recording, re-encoded as segment_mime_type (empty for short audio)
+    segments: List[bytes] = field(default_factory=list)
+    segment_mime_type: Optional[str] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+
+class AudioPreprocessor:
+    """Pipeline stage that makes audio payloads smaller before transcription"""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        bitrate: str = "24k",
+        silence_threshold_dbfs: float = -45.0,
+        keep_silence_ms: int = 200,
+        long_audio_threshold_ms: int = 60000,
+        segment_ms: int = 30000,
+        overlap_ms: int = 1500
+    ):
+        """
+        Initialize the preprocessor
+
+        Args:
+            sample_rate: Target sample rate in Hz (16 kHz is plenty for speech)
+            bitrate: Opus bitrate for the re-encoded audio
+            silence_threshold_dbfs: Loudness below which audio counts as silence
+            keep_silence_ms: Silence kept at each end so words are not clipped
+            long_audio_threshold_ms: Recordings longer than this are split into segments
+            segment_ms: Target segment length
+            overlap_ms: Audio shared by consecutive segments
+        """
+        self.sample_rate = sample_rate
+        self.bitrate = bitrate
+        self.silence_threshold_dbfs = silence_threshold_dbfs
+        self.keep_silence_ms = keep_silence_ms
+        self.long_audio_threshold_ms = long_audio_threshold_ms
+        self.segment_ms = segment_ms
+        self.overlap_ms = overlap_ms
+
+        # Without ffmpeg only WAV can be decoded, and only WAV can be written
+        self.ffmpeg_available = shutil.which("ffmpeg") is not None
+        if not self.ffmpeg_available:
+            logger.warning("ffmpeg not found: audio preprocessing limited to WAV uploads")
+
+        self.requests = 0
+        self.total_original_bytes = 0
+        self.total_processed_bytes = 0
+
+        logger.info("Audio Preprocessor initialized")
+
+    def settings_key(self) -> str:
+        """Identify the settings that shape the output, for caching results derived from it"""
+        return (
+            f"{self.sample_rate}:{self.bitrate}:{self.silence_threshold_dbfs}:{self.keep_silence_ms}:"
+            f"{self.long_audio_threshold_ms}:{self.segment_ms}:{self.overlap_ms}:{int(self.ffmpeg_available)}"
+        )
+
+    async def process(self, audio_data: bytes, fallback_mime_type: str = "audio/webm") -> PreprocessedAudio:
+        """
+        Preprocess audio off the event loop
+
+        Falls back to the original bytes whenever the audio cannot be decoded
+        or the processed version would not be smaller. Long recordings are
+        segmented whenever they can be decoded (ffmpeg, or WAV input), even if
+        the original bytes are sent.
+
+        Args:
+            audio_data: Raw uploaded audio
+            fallback_mime_type: MIME type to use if the container is not recognized
+
+        Returns:
+            PreprocessedAudio with the payload to send and size figures
+        """
+        source_format = detect_audio_format(audio_data[:12])
+        result = PreprocessedAudio(
+            data=audio_data,
+            mime_type=CONTAINER_MIME_TYPES.get(source_format, fallback_mime_type),
+            source_format=source_format,
+            original_bytes=len(audio_data),
+            processed_bytes=len(audio_data)
+        )
+
+        if source_format and (self.ffmpeg_available or source_format == "wav"):
+            try:
+                processed = await asyncio.to_thread(self._process_sync, audio_data, source_format)
+                if processed.processed_bytes < result.processed_bytes:
+                    result = processed
+                else:
+                    # Send the original, but a long recording is still split
+                    result.duration_ms = processed.duration_ms
+                    result.segments = processed.segments
+                    result.segment_mime_type = processed.segment_mime_type
+            except Exception as e:
+                logger.error(f"Audio preprocessing error: {str(e)}")
+                logger.warning("Audio could not be decoded: a long recording will be transcribed in one request")
+        else:
+            logger.warning(
+                f"Cannot decode {source_format or 'unrecognized'} audio"
+                f"{'' if self.ffmpeg_available else ' without ffmpeg'}: "
+                "a long recording will be transcribed in one request"
+            )
+
+        self.requests += 1
+        self.total_original_bytes += result.original_bytes
+        self.total_processed_bytes += result.processed_bytes
+        logger.info(
+            f"Preprocessed {source_format or 'unknown'} audio: "
+            f"{result.original_bytes} -> {result.processed_bytes} bytes "
+            f"(saved {result.bytes_saved}, trimmed {result.trimmed_ms}ms, "
+            f"{len(result.segments) or 1} segment(s))"
+        )
+        return result
+
+    def stats(self) -> dict:
+        """Return cumulative byte savings"""
+        saved = self.total_original_bytes - self.total_processed_bytes
+        return {
+            "requests": self.requests,
+            "original_bytes": self.total_original_bytes,
+            "processed_bytes": self.total_processed_bytes,
+            "bytes_saved": saved,
+            "saved_ratio": round(saved / self.total_original_bytes, 4) if self.total_original_bytes else 0.0,
+        }
+
+    def _process_sync(self, audio_data: bytes, source_format: str) -> PreprocessedAudio:
+        """Decode, trim, downmix, resample and re-encode (runs in a worker thread)"""
+        # Imported here: pydub warns at import time when ffmpeg is missing
+        from pydub import AudioSegment
+        from pydub.silence import detect_leading_silence
+
+        segment = AudioSegment.from_file(io.BytesIO(audio_data), format=source_format)
+        original_duration = len(segment)
+
+        # Trim leading and trailing silence, keeping a little padding
+        lead = detect_leading_silence(segment, silence_threshold=self.silence_threshold_dbfs)
+        trail = detect_leading_silence(segment.reverse(), silence_threshold=self.silence_threshold_dbfs)
+        start = max(0, lead - self.keep_silence_ms)
+        end = min(original_duration, original_duration - trail + self.keep_silence_ms)
+        if end > start:
+            segment = segment[start:end]
+
+        segment = segment.set_channels(1).set_frame_rate(self.sample_rate)
+        data, mime_type = self._encode(segment)
+
+        segments = []
+        if len(segment) > self.long_audio_threshold_ms:
+            bounds = [0] + self._split_points(segment) + [len(segment)]
+            for i in range(len(bounds) - 1):
+                start = max(0, bounds[i] - self.overlap_ms) if i else 0
+                segments.append(self._encode(segment[start:bounds[i + 1]])[0])
+
+        return PreprocessedAudio(
+            data=data,
+            mime_type=mime_type,
+            source_format=source_format,
+            original_bytes=len(audio_data),
+            processed_bytes=len(data),
+            duration_ms=len(segment),
+            trimmed_ms=original_duration - len(segment),
+            segments=segments,
+            segment_mime_type=mime_type if segments else None
+        )
+
+    def _encode(self, segment) -> Tuple[bytes, str]:
+        """Encode an AudioSegment, returning (bytes, MIME type)"""
+        buffer = io.BytesIO()
+        if self.ffmpeg_available:
+            segment.export(buffer, format="ogg", codec="libopus", bitrate=self.bitrate)
+            return buffer.getvalue(), "audio/ogg"
+        segment.set_sample_width(2).export(buffer, format="wav")
+        return buffer.getvalue(), "audio/wav"
+
+    def _split_points(self, segment) -> List[int]:
+        """
+        Choose cut positions close to every segment_ms
+
+        Each cut is placed in the middle of the latest pause found in the
+        second half of the target window, so words are not cut in two. Falls
+        back to a hard cut when the window contains no pause.
+        """
+        from pydub.silence import detect_silence
+
+        pauses = detect_silence(
+            segment,
+            min_silence_len=300,
+            silence_thresh=self.silence_threshold_dbfs,
+            seek_step=10
+        )
+        midpoints = [(start + end) // 2 for start, end in pauses]
+
+        cuts = []
+        position = 0
+        while len(segment) - position > self.segment_ms:
+            target = position + self.segment_ms
+            window_start = position + self.segment_ms // 2
+            candidates = [m for m in midpoints if window_start <= m <= target]
+            position = max(candidates) if candidates else target
+            cuts.append(position)
+        return cuts
@@ -0,0 +1,160 @@
+"""
+Audio Store - Serving metadata and a hot in-memory tier for generated audio
+Recently generated clips are kept in memory so playback right after
+generation does not touch the disk
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Names the audio endpoint is willing to serve (no path separators, no dotfiles)
+SAFE_FILENAME_RE = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+# Content-addressed names: the file behind them never changes
+CONTENT_ADDRESSED_RE = re.compile(r"^tts_[0-9a-f]{64}\.")
+
+AUDIO_MEDIA_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".webm": "audio/webm",
+    ".wav": "audio/wav",
+    ".m4a": "audio/mp4",
+    # Batch archives are served alongside the clips they bundle
+    ".zip": "application/zip",
+}
+
+
+@dataclass
+class AudioBlob:
+    """Audio file contents held in the hot tier"""
+    data: bytes
+    etag: str
+    last_modified: float
+
+
+def is_safe_filename(filename: str) -> bool:
+    """Return True if filename is a plain name inside the output directory"""
+    return bool(SAFE_FILENAME_RE.match(filename)) and ".." not in filename
+
+
+def is_content_addressed(filename: str) -> bool:
+    """Return True if filename is derived from a hash of its contents"""
+    return bool(CONTENT_ADDRESSED_RE.match(filename))
+
+
+def make_etag(filename: str, size: int, mtime_ns: int) -> str:
+    """
+    Build a strong ETag for an audio file
+
+    Content-addressed files use their name, which already identifies the
+    bytes. Other files use size and modification time.
+    """
+    if is_content_addressed(filename):
+        return f'"{filename}"'
+    return f'"{size:x}-{mtime_ns:x}"'
+
+
+def media_type_for(filename: str) -> str:
+    """Return the Content-Type for an audio filename"""
+    return AUDIO_MEDIA_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream")
+
+
+class AudioStore:
+    """Byte-bounded LRU of recently generated audio clips"""
+
+    def __init__(self, max_bytes: int, max_file_bytes: int):
+        """
+        Initialize the hot tier
+
+        Args:
+            max_bytes: Total memory budget for cached clips
+            max_file_bytes: Clips larger than this are served from disk only
+        """
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+
+        self._blobs: "OrderedDict[str, AudioBlob]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(f"Audio store initialized (hot tier {max_bytes} bytes)")
+
+    def put(self, filename: str, data: bytes, mtime_ns: int) -> None:
+        """
+        Keep a freshly generated clip in memory
+
+        Args:
+            filename: Name the clip is served under
+            data: Clip contents (must match the file written to disk)
+            mtime_ns: Modification time of the file on disk, so both tiers
+                produce the same ETag
+        """
+        if len(data) > self.max_file_bytes:
+            return
+
+        blob = AudioBlob(
+            data=data,
+            etag=make_etag(filename, len(data), mtime_ns),
+            last_modified=mtime_ns / 1e9
+        )
+        with self._lock:
+            self._discard(filename)
+            self._blobs[filename] = blob
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and self._blobs:
+                _, evicted = self._blobs.popitem(last=False)
+                self._total_bytes -= len(evicted.data)
+
+    def get(self, filename: str) -> Optional[AudioBlob]:
+        """
+        Look up a clip in the hot tier
+
+        Args:
+            filename: Name the clip is served under
+
+        Returns:
+            AudioBlob or None if the clip must be read from disk
+        """
+        with self._lock:
+            blob = self._blobs.get(filename)
+            if blob is None:
+                self.misses += 1
+                return None
+            self._blobs.move_to_end(filename)
+            self.hits += 1
+            return blob
+
+    def discard(self, filename: str) -> None:
+        """Forget a clip (e.g. after its file was deleted)"""
+        with self._lock:
+            self._discard(filename)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._blobs),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _discard(self, filename: str):
+        """Drop an entry (caller holds the lock)"""
+        blob = self._blobs.pop(filename, None)
+        if blob is not None:
+            self._total_bytes -= len(blob.data)
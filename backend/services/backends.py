@@ -0,0 +1,520 @@
+"""
+Service Backends - Pluggable transcriber, generator and synthesizer implementations
+The Gemini and gTTS backends call the real services; the fake backends are
+deterministic local stand-ins used to load test the API layer offline
+"""
+
+import base64
+import hashlib
+import io
+import logging
+import math
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND_GEMINI = "gemini"
+BACKEND_FAKE = "fake"
+
+
+class BackendError(Exception):
+    """Upstream failure carrying the HTTP status the service answered with"""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Backend(ABC):
+    """Common base of every backend"""
+
+    def warm_up(self) -> None:
+        """Load SDKs and open connections ahead of the first call (blocking; optional)"""
+
+    def connection_stats(self) -> Optional[dict]:
+        """Outbound connection reuse figures, for backends that keep a connection pool"""
+        return None
+
+
+class Transcriber(Backend):
+    """Speech-to-text backend (blocking; called from a worker thread)"""
+
+    @abstractmethod
+    def transcribe(self, prompt: str, audio_data: bytes, mime_type: str) -> str:
+        """Return the transcription of audio_data, raising on failure"""
+
+
+class Generator(Backend):
+    """Text generation backend (blocking; called from a worker thread)"""
+
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """Return the full response to prompt, raising on failure"""
+
+    @abstractmethod
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response to prompt in chunks, raising on failure"""
+
+
+class Synthesizer(Backend):
+    """Text-to-speech backend (blocking; called from a worker thread)"""
+
+    @abstractmethod
+    def synthesize(self, text: str, language: str, slow: bool = False, tld: str = "com") -> bytes:
+        """Return MP3 audio for text, raising on failure"""
+
+
+class GeminiBackend(Transcriber, Generator):
+    """Transcription and generation through the Gemini API"""
+
+    # Inline requests are capped at 20MB in total; bigger audio goes through the File API
+    INLINE_AUDIO_LIMIT = 18 * 1024 * 1024
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
+        """
+        Initialize the backend; the SDK is loaded on first use (or by warm_up)
+
+        Args:
+            api_key: Gemini API key
+            model_name: Model used for both transcription and generation
+        """
+        self.api_key = api_key
+        self.model_name = model_name
+        self._genai = None
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The configured GenerativeModel, importing the SDK on first access"""
+        if self._model is None:
+            self._load()
+        return self._model
+
+    def warm_up(self) -> None:
+        self._load()
+        # Opens a connection; model metadata costs no generation quota
+        self._genai.get_model(f"models/{self.model_name}")
+
+    def _load(self):
+        """Import and configure the SDK (importing it takes hundreds of milliseconds)"""
+        with self._load_lock:
+            if self._model is not None:
+                return
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+            self._model = genai.GenerativeModel(self.model_name)
+            logger.info(f"Gemini backend initialized ({self.model_name})")
+
+    def transcribe(self, prompt: str, audio_data: bytes, mime_type: str) -> str:
+        model = self.model
+        uploaded_file = None
+        try:
+            # Large audio is uploaded once and referenced instead of sent inline
+            if len(audio_data) > self.INLINE_AUDIO_LIMIT:
+                uploaded_file = self._upload_audio(audio_data, mime_type)
+                audio_part = uploaded_file
+            else:
+                # The protobuf Blob only takes bytes (uploads arrive as a bytearray)
+                audio_part = {"mime_type": mime_type, "data": bytes(audio_data)}
+            return model.generate_content([prompt, audio_part]).text
+        finally:
+            if uploaded_file is not None:
+                try:
+                    self._genai.delete_file(uploaded_file.name)
+                except Exception as e:
+                    logger.warning(f"Failed to delete uploaded audio {uploaded_file.name}: {str(e)}")
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+    def _upload_audio(self, audio_data: bytes, mime_type: str):
+        """Upload audio through the File API and wait until it can be referenced"""
+        logger.info(f"Uploading {len(audio_data)} bytes of audio via the File API")
+        uploaded_file = self._genai.upload_file(io.BytesIO(audio_data), mime_type=mime_type)
+        while uploaded_file.state.name == "PROCESSING":
+            time.sleep(1)
+            uploaded_file = self._genai.get_file(uploaded_file.name)
+        if uploaded_file.state.name != "ACTIVE":
+            raise RuntimeError(f"Audio upload failed with state {uploaded_file.state.name}")
+        return uploaded_file
+
+
+class GTTSBackend(Synthesizer):
+    """
+    Text-to-speech through Google Translate's TTS endpoint
+
+    gTTS builds the requests (text tokenization and RPC encoding), but they
+    are sent through one pooled keep-alive session shared by every thread,
+    instead of gTTS's fresh connection per 100-character piece, so replies
+    do not each pay a TCP and TLS handshake.
+    """
+
+    DEFAULT_ENDPOINT = "https://translate.google.{tld}/_/TranslateWebserverUi/data/batchexecute"
+    _AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+    def __init__(
+        self,
+        endpoint_url: str = "",
+        pool_size: int = 8,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0
+    ):
+        """
+        Initialize the session
+
+        Args:
+            endpoint_url: TTS endpoint ("{tld}" is replaced; empty uses Google Translate)
+            pool_size: Keep-alive connections kept per host (callers beyond it wait)
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for response data
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.endpoint_url = endpoint_url or self.DEFAULT_ENDPOINT
+        self.timeout = (connect_timeout, read_timeout)
+        self._requests = requests
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self._session = requests.Session()
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+        logger.info(f"gTTS backend initialized ({self.endpoint_url}, pool of {pool_size})")
+
+    def synthesize(self, text: str, language: str, slow: bool = False, tld: str = "com") -> bytes:
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=language, slow=slow, tld=tld)
+        url = self.endpoint_url.replace("{tld}", tld)
+        audio = bytearray()
+        for body in tts.get_bodies():
+            audio += self._fetch_part(url, body, tts.GOOGLE_TTS_HEADERS)
+        return bytes(audio)
+
+    def warm_up(self) -> None:
+        from gtts import gTTS  # noqa: F401
+
+        # Any response leaves an open connection in the pool
+        try:
+            self._session.head(self.endpoint_url.replace("{tld}", "com"), timeout=self.timeout)
+        except self._requests.RequestException as e:
+            logger.warning(f"TTS connection warmup failed: {str(e)}")
+
+    def connection_stats(self) -> dict:
+        pools = self._adapter.poolmanager.pools
+        opened = requests_sent = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            "requests": requests_sent,
+            "connections_opened": opened,
+            "connections_reused": max(0, requests_sent - opened),
+            "reuse_ratio": round(1 - opened / requests_sent, 4) if requests_sent else 0.0,
+        }
+
+    def _fetch_part(self, url: str, body: str, headers: dict) -> bytes:
+        """Send one gTTS RPC and decode the audio it returns"""
+        try:
+            response = self._session.post(url, data=body, headers=headers, timeout=self.timeout)
+        except self._requests.Timeout as e:
+            raise BackendError(f"TTS request timed out: {str(e)}", status_code=504)
+        except self._requests.RequestException as e:
+            raise BackendError(f"TTS request failed: {str(e)}", status_code=502)
+
+        if response.status_code != 200:
+            retry_after = response.headers.get("Retry-After")
+            raise BackendError(
+                f"TTS endpoint returned HTTP {response.status_code}",
+                status_code=response.status_code,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+
+        match = self._AUDIO_RE.search(response.text)
+        if not match:
+            raise BackendError("TTS response contained no audio", status_code=502)
+        return base64.b64decode(match.group(1))
+
+
+class LatencyModel:
+    """Samples simulated upstream latency from a configurable distribution"""
+
+    DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+    def __init__(self, mean_ms: float, distribution: str = "lognormal", spread: float = 0.5, seed: int = 0):
+        """
+        Initialize the latency model
+
+        Args:
+            mean_ms: Mean latency in milliseconds
+            distribution: One of DISTRIBUTIONS
+            spread: Relative half-width for "uniform", sigma for "lognormal"
+            seed: Random seed, so runs are reproducible
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.mean_ms = mean_ms
+        self.distribution = distribution
+        self.spread = spread
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Return one latency in seconds"""
+        if self.mean_ms <= 0:
+            return 0.0
+        with self._lock:
+            if self.distribution == "fixed":
+                value = self.mean_ms
+            elif self.distribution == "uniform":
+                value = self.mean_ms * self._rng.uniform(1 - self.spread, 1 + self.spread)
+            elif self.distribution == "exponential":
+                value = self._rng.expovariate(1 / self.mean_ms)
+            else:
+                # mu is chosen so the distribution keeps mean_ms as its mean
+                mu = math.log(self.mean_ms) - self.spread ** 2 / 2
+                value = self._rng.lognormvariate(mu, self.spread)
+        return max(0.0, value) / 1000
+
+
+class FaultInjector:
+    """Randomly fails calls with a rate limit (429) or server error (500)"""
+
+    def __init__(self, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0, seed: int = 0):
+        """
+        Initialize the injector
+
+        Args:
+            error_rate: Fraction of calls failing with a server error
+            rate_limit_rate: Fraction of calls failing with 429
+            retry_after: Retry-After hint attached to injected 429s
+            seed: Random seed, so runs are reproducible
+        """
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.errors = 0
+        self.rate_limits = 0
+
+    def check(self, operation: str):
+        """
+        Decide the fate of one call
+
+        Raises:
+            BackendError: When the call was chosen to fail
+        """
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                self.rate_limits += 1
+                raise BackendError(f"Injected rate limit in {operation}", 429, self.retry_after)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                raise BackendError(f"Injected failure in {operation}", 500)
+
+    def stats(self) -> dict:
+        """Return call and injected failure counters"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors_injected": self.errors,
+                "rate_limits_injected": self.rate_limits,
+            }
+
+
+FAKE_TRANSCRIPTS = [
+    "नमस्ते, आप कैसे हैं?",
+    "आज मौसम कैसा रहेगा?",
+    "मुझे एक अच्छी किताब के बारे में बताइए।",
+    "भारत की राजधानी क्या है?",
+    "कृपया मुझे एक छोटी कहानी सुनाइए।",
+]
+
+FAKE_RESPONSES = [
+    "नमस्ते! मैं ठीक हूँ। आप बताइए, मैं आपकी क्या मदद कर सकता हूँ?",
+    "आज मौसम साफ़ रहने की संभावना है। बाहर जाते समय पानी साथ रखें।",
+    "गोदान एक बहुत अच्छी किताब है। इसे प्रेमचंद ने लिखा है।",
+    "भारत की राजधानी नई दिल्ली है। यह एक ऐतिहासिक शहर है।",
+    "एक गाँव में एक मेहनती किसान रहता था। उसकी मेहनत से पूरा गाँव खुशहाल हो गया।",
+]
+
+
+def _pick(options: list, material: bytes) -> str:
+    """
+    Choose an option deterministically from the input
+
+    A reference number derived from the input is appended, so distinct
+    inputs produce distinct text (and cache keys) like the real services.
+    """
+    digest = int(hashlib.sha256(material).hexdigest(), 16)
+    return f"{options[digest % len(options)]} संदर्भ संख्या {digest % 1000000}।"
+
+
+class FakeGeminiBackend(Transcriber, Generator):
+    """Deterministic offline stand-in for GeminiBackend"""
+
+    def __init__(self, transcribe_latency: LatencyModel, generate_latency: LatencyModel, faults: FaultInjector):
+        """
+        Initialize the fake
+
+        Args:
+            transcribe_latency: Latency of a transcription call
+            generate_latency: Latency of a full generation (streaming spreads it over the chunks)
+            faults: Failure injection shared by all calls
+        """
+        self.transcribe_latency = transcribe_latency
+        self.generate_latency = generate_latency
+        self.faults = faults
+
+    def transcribe(self, prompt: str, audio_data: bytes, mime_type: str) -> str:
+        time.sleep(self.transcribe_latency.sample())
+        self.faults.check("transcribe")
+        return _pick(FAKE_TRANSCRIPTS, audio_data)
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self.generate_latency.sample())
+        self.faults.check("generate")
+        return _pick(FAKE_RESPONSES, prompt.encode("utf-8"))
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        total = self.generate_latency.sample()
+        self.faults.check("generate")
+        words = _pick(FAKE_RESPONSES, prompt.encode("utf-8")).split(" ")
+        # Half the latency before the first chunk, the rest spread over the others
+        time.sleep(total / 2)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(total / 2 / (len(words) - 1))
+            yield word if i == 0 else " " + word
+
+
+class FakeTTSBackend(Synthesizer):
+    """
+    Offline stand-in for GTTSBackend returning silent MP3 audio
+
+    Like gTTS, text is fetched in pieces of up to 100 characters one after
+    another, so one call's latency grows with the length of the text.
+    """
+
+    # MPEG-1 Layer III, 32 kbps, 44.1 kHz, mono: 104 bytes per 26ms frame
+    SILENT_FRAME = b"\xff\xfb\x10\xc4" + b"\x00" * 100
+    FRAMES_PER_CHARACTER = 3
+    PIECE_CHARS = 100
+
+    def __init__(self, latency: LatencyModel, faults: FaultInjector):
+        """
+        Initialize the fake
+
+        Args:
+            latency: Latency of one 100-character piece
+            faults: Failure injection shared by all calls
+        """
+        self.latency = latency
+        self.faults = faults
+
+    def synthesize(self, text: str, language: str, slow: bool = False, tld: str = "com") -> bytes:
+        for _ in range(max(1, math.ceil(len(text) / self.PIECE_CHARS))):
+            time.sleep(self.latency.sample())
+        self.faults.check("synthesize")
+        return self.SILENT_FRAME * max(1, len(text) * self.FRAMES_PER_CHARACTER)
+
+
+@dataclass
+class BackendSet:
+    """Backends selected for one process"""
+    kind: str
+    transcriber: Transcriber
+    generator: Generator
+    synthesizer: Synthesizer
+    faults: Optional[FaultInjector] = None
+
+    def stats(self) -> dict:
+        """Return the backend kind and injected failure counters"""
+        return {
+            "kind": self.kind,
+            "faults": self.faults.stats() if self.faults is not None else None,
+        }
+
+    def warm_up(self) -> None:
+        """Warm up each distinct backend (blocking)"""
+        backends = {id(backend): backend for backend in (self.transcriber, self.generator, self.synthesizer)}
+        for backend in backends.values():
+            backend.warm_up()
+
+
+def create_backends(
+    kind: str,
+    api_key: Optional[str] = None,
+    latency_distribution: str = "lognormal",
+    latency_spread: float = 0.5,
+    transcribe_latency_ms: float = 800,
+    generate_latency_ms: float = 600,
+    tts_latency_ms: float = 300,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    seed: int = 0,
+    tts_endpoint_url: str = "",
+    tts_pool_size: int = 8,
+    tts_connect_timeout: float = 5.0,
+    tts_read_timeout: float = 15.0
+) -> BackendSet:
+    """
+    Build the backends selected by configuration
+
+    Args:
+        kind: BACKEND_GEMINI for the real services, BACKEND_FAKE for local stand-ins
+        api_key: Gemini API key (real backends only)
+        latency_distribution: Fake latency distribution (see LatencyModel)
+        latency_spread: Fake latency spread (see LatencyModel)
+        transcribe_latency_ms: Mean fake transcription latency
+        generate_latency_ms: Mean fake generation latency
+        tts_latency_ms: Mean fake synthesis latency
+        error_rate: Fraction of fake calls failing with a server error
+        rate_limit_rate: Fraction of fake calls failing with 429
+        seed: Seed for fake latency and failures
+        tts_endpoint_url: gTTS endpoint override (e.g. a local stub server)
+        tts_pool_size: Keep-alive connections for TTS requests
+        tts_connect_timeout: TTS connection timeout in seconds
+        tts_read_timeout: TTS read timeout in seconds
+
+    Returns:
+        BackendSet with the transcriber, generator and synthesizer
+    """
+    if kind == BACKEND_GEMINI:
+        gemini = GeminiBackend(api_key)
+        synthesizer = GTTSBackend(tts_endpoint_url, tts_pool_size, tts_connect_timeout, tts_read_timeout)
+        return BackendSet(kind, gemini, gemini, synthesizer)
+
+    if kind == BACKEND_FAKE:
+        def latency(mean_ms: float, offset: int) -> LatencyModel:
+            return LatencyModel(mean_ms, latency_distribution, latency_spread, seed + offset)
+
+        faults = FaultInjector(error_rate, rate_limit_rate, seed=seed)
+        gemini = FakeGeminiBackend(latency(transcribe_latency_ms, 1), latency(generate_latency_ms, 2), faults)
+        logger.warning(
+            f"Using fake backends ({latency_distribution} latency, "
+            f"{error_rate:.0%} errors, {rate_limit_rate:.0%} rate limits)"
+        )
+        return BackendSet(kind, gemini, gemini, FakeTTSBackend(latency(tts_latency_ms, 3), faults), faults)
+
+    raise ValueError(f"Unknown service backend: {kind}")
@@ -3,125 +3,472 @@ Gemini Service - Speech-to-Text and Response Generation
 Uses Google Gemini 2.5 Flash for Hindi language processing
 """
 
-import google.generativeai as genai
+import hashlib
 import logging
-from typing import Optional
-import asyncio
-from pathlib import Path
 import time
+from typing import AsyncIterator, Callable, List, Optional
+import asyncio
+
+from services.backends import Transcriber, Generator
+from services.hedging import HedgePolicy
+from services.rate_limiter import RateLimitScheduler, PRIORITY_HIGH, PRIORITY_NORMAL
+from services.resilience import (
+    CircuitBreaker, RetryPolicy, UpstreamError, PERMANENT, classify_error, retry_after_hint
+)
+from services.response_cache import ResponseCache
+from services.singleflight import SingleFlight
+from utils.metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, error_class
+from utils.text_utils import normalize_hindi_text, merge_overlapping_transcripts
 
 logger = logging.getLogger(__name__)
 
+TRANSCRIPTION_PROMPT = "Transcribe this Hindi audio accurately. Return ONLY the Devanagari text without explanations."
+
+# Bump PROMPT_VERSION whenever RESPONSE_PROMPT changes so memoized
+# responses generated from the old template are not reused
+PROMPT_VERSION = "1"
+RESPONSE_PROMPT = """You are a helpful Hindi-speaking AI assistant.
+Respond ONLY in Hindi (Devanagari script).
+Keep responses concise (2-3 sentences).
+Be polite and helpful.
+
+User said: {user_input}
+
+Response:"""
+
 
 class GeminiService:
-    """Service for Gemini API interactions"""
+    """Service for transcription and response generation (Gemini or a stand-in backend)"""
     
-    def __init__(self, api_key: str):
-        """Initialize Gemini service with API key"""
-        self.api_key = api_key
-        genai.configure(api_key=api_key)
+    # Generation finishes requests that already paid for transcription,
+    # so it is served ahead of new transcriptions when the quota is tight
+    TRANSCRIPTION_PRIORITY = PRIORITY_NORMAL
+    GENERATION_PRIORITY = PRIORITY_HIGH
+    
+    def __init__(
+        self,
+        transcriber: Transcriber,
+        generator: Generator,
+        response_cache: Optional[ResponseCache] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedge_policy: Optional[HedgePolicy] = None
+    ):
+        """
+        Initialize the service with its backends
         
-        # Initialize model
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        Args:
+            transcriber: Speech-to-text backend
+            generator: Response generation backend
+            response_cache: Optional memoization cache for generate_response
+            scheduler: Rate limit scheduler shared by all Gemini calls
+                (defaults to 30 requests/minute, one call at a time)
+            retry_policy: Backoff for rate-limit and transient failures
+            circuit_breaker: Fails calls fast while Gemini is degraded
+            hedge_policy: Duplicates slow generation calls (None disables hedging)
+        """
+        self.transcriber = transcriber
+        self.generator = generator
+        self.response_cache = response_cache
         
         # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 2  # seconds between requests
+        self.scheduler = scheduler or RateLimitScheduler(requests_per_minute=30, burst=1, max_in_flight=1)
+        
+        # Retries and fail-fast while the upstream is degraded
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker("gemini")
+        self.retries = 0
+        
+        # Tail latency: a slow generation call gets one duplicate
+        self.hedge_policy = hedge_policy
+        
+        # Identical concurrent calls share one upstream request
+        self.singleflight = SingleFlight("gemini")
         
         logger.info("Gemini Service initialized")
     
-    async def transcribe_audio(self, audio_path: str) -> Optional[str]:
+    async def transcribe_audio(
+        self,
+        audio_data: bytes,
+        mime_type: str = "audio/webm",
+        client_id: str = "default"
+    ) -> Optional[str]:
         """
         Transcribe Hindi audio to text
         
         Args:
-            audio_path: Path to audio file
+            audio_data: Raw audio file contents
+            mime_type: MIME type of the audio container
+            client_id: Caller identity for fair scheduling
             
         Returns:
             Transcribed Hindi text or None if failed
+            
+        Raises:
+            UpstreamError: If Gemini is rate limited or unavailable (after retries)
+        """
+        if not audio_data:
+            logger.error("Empty audio provided")
+            return None
+        
+        audio_key = hashlib.sha256(audio_data).hexdigest()
+        return await self.singleflight.do(
+            f"transcribe:{audio_key}",
+            lambda: self._transcribe(audio_data, mime_type, client_id)
+        )
+    
+    async def transcribe_segments(
+        self,
+        segments: List[bytes],
+        mime_type: str = "audio/webm",
+        client_id: str = "default"
+    ) -> Optional[str]:
+        """
+        Transcribe a long recording split into overlapping segments
+        
+        Segments are transcribed concurrently (each call still goes through
+        the rate limit scheduler) and the texts are stitched back together
+        with the repeated words from the overlaps removed.
+        
+        Args:
+            segments: Audio segments in playback order
+            mime_type: MIME type shared by all segments
+            client_id: Caller identity for fair scheduling
+            
+        Returns:
+            Transcribed Hindi text or None if any segment failed
+            
+        Raises:
+            UpstreamError: If Gemini is rate limited or unavailable (after retries)
         """
+        logger.info(f"Transcribing {len(segments)} segments concurrently")
+        parts = await asyncio.gather(*[
+            self.transcribe_audio(segment, mime_type=mime_type, client_id=client_id)
+            for segment in segments
+        ])
+        
+        if any(part is None for part in parts):
+            logger.error("Segment transcription failed")
+            return None
+        
+        return merge_overlapping_transcripts(parts)
+    
+    async def _transcribe(self, audio_data: bytes, mime_type: str, client_id: str) -> Optional[str]:
+        """Run one transcription call against the backend"""
         try:
-            # Rate limiting
-            await self._rate_limit()
-            
-            # Read audio file
-            audio_file = Path(audio_path)
-            if not audio_file.exists():
-                logger.error(f"Audio file not found: {audio_path}")
-                return None
-            
-            with open(audio_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Transcription prompt
-            prompt = "Transcribe this Hindi audio accurately. Return ONLY the Devanagari text without explanations."
-            
-            # Generate transcription
-            content_parts = [
-                prompt,
-                {"mime_type": "audio/webm", "data": audio_data}
-            ]
-            
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                content_parts
+            response_text = await self._call(
+                "transcribe",
+                self.TRANSCRIPTION_PRIORITY,
+                client_id,
+                self.transcriber.transcribe,
+                TRANSCRIPTION_PROMPT,
+                audio_data,
+                mime_type
             )
             
-            transcription = response.text.strip()
+            transcription = response_text.strip()
             logger.info(f"Transcription: {transcription[:50]}...")
             
             return transcription
             
+        except UpstreamError:
+            raise
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
             return None
     
-    async def generate_response(self, user_input: str) -> Optional[str]:
+    async def generate_response(
+        self,
+        user_input: str,
+        use_cache: bool = True,
+        client_id: str = "default",
+        priority: Optional[int] = None
+    ) -> Optional[str]:
         """
         Generate Hindi response using Gemini LLM
         
         Args:
             user_input: Hindi text from user
+            use_cache: Serve and store memoized responses (when a cache is configured)
+            client_id: Caller identity for fair scheduling
+            priority: Scheduler priority (defaults to GENERATION_PRIORITY; bulk
+                work passes PRIORITY_LOW so interactive requests go first)
             
         Returns:
             Generated Hindi response or None if failed
+            
+        Raises:
+            UpstreamError: If Gemini is rate limited or unavailable (after retries)
         """
+        cache_key = None
+        if self.response_cache is not None and use_cache:
+            cache_key = self._response_cache_key(user_input)
+            cached_response = await self.response_cache.get(cache_key)
+            if cached_response is not None:
+                logger.info(f"Response cache hit: {cached_response[:50]}...")
+                return cached_response
+        
+        flight_key = cache_key or self._response_cache_key(user_input)
+        return await self.singleflight.do(
+            f"generate:{flight_key}",
+            lambda: self._generate(user_input, cache_key, client_id, priority)
+        )
+    
+    async def _generate(
+        self,
+        user_input: str,
+        cache_key: Optional[str],
+        client_id: str,
+        priority: Optional[int] = None
+    ) -> Optional[str]:
+        """Run one response generation call and memoize the result"""
         try:
-            # Rate limiting
-            await self._rate_limit()
-            
             # Response generation prompt
-            prompt = f"""You are a helpful Hindi-speaking AI assistant.
-Respond ONLY in Hindi (Devanagari script).
-Keep responses concise (2-3 sentences).
-Be polite and helpful.
-
-User said: {user_input}
-
-Response:"""
+            prompt = RESPONSE_PROMPT.format(user_input=user_input)
             
             # Generate response
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
+            slot_priority = self.GENERATION_PRIORITY if priority is None else priority
+            response_text = await self._call(
+                "generate", slot_priority, client_id, self.generator.generate, prompt, hedge=True
             )
             
-            hindi_response = response.text.strip()
+            hindi_response = response_text.strip()
             logger.info(f"Response generated: {hindi_response[:50]}...")
             
+            if cache_key is not None and hindi_response:
+                await self.response_cache.set(cache_key, hindi_response)
+            
             return hindi_response
             
+        except UpstreamError:
+            raise
         except Exception as e:
             logger.error(f"Response generation error: {str(e)}")
             return None
     
-    async def _rate_limit(self):
-        """Apply rate limiting between API calls"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+    async def stream_response(
+        self,
+        user_input: str,
+        use_cache: bool = True,
+        client_id: str = "default"
+    ) -> AsyncIterator[str]:
+        """
+        Generate a Hindi response, yielding text chunks as the model produces them
+        
+        Args:
+            user_input: Hindi text from user
+            use_cache: Serve and store memoized responses (when a cache is configured)
+            client_id: Caller identity for fair scheduling
+            
+        Yields:
+            Response text chunks; a cache hit yields the whole response at once
+            
+        Raises:
+            RuntimeError: If the model call fails permanently
+            UpstreamError: If Gemini is rate limited or unavailable (after retries)
+        """
+        cache_key = None
+        if self.response_cache is not None and use_cache:
+            cache_key = self._response_cache_key(user_input)
+            cached_response = await self.response_cache.get(cache_key)
+            if cached_response is not None:
+                logger.info(f"Response cache hit: {cached_response[:50]}...")
+                yield cached_response
+                return
+        
+        prompt = RESPONSE_PROMPT.format(user_input=user_input)
+        loop = asyncio.get_running_loop()
+        done = object()
+        
+        def produce(queue: asyncio.Queue):
+            """Iterate the blocking stream in a worker thread"""
+            try:
+                for text in self.generator.generate_stream(prompt):
+                    loop.call_soon_threadsafe(queue.put_nowait, text)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+        
+        chunks = []
+        attempt = 0
+        while True:
+            self.circuit_breaker.check()
+            attempt += 1
+            queue: asyncio.Queue = asyncio.Queue()
+            failure = None
+            async with self.scheduler.slot(self.GENERATION_PRIORITY, client_id):
+                producer = loop.run_in_executor(None, produce, queue)
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    if isinstance(item, Exception):
+                        failure = item
+                        break
+                    chunks.append(item)
+                    yield item
+                await producer
+            
+            if failure is None:
+                self.circuit_breaker.record_success()
+                break
+            
+            logger.error(f"Streaming response error: {str(failure)}")
+            # Text already sent cannot be taken back, so only a stream that failed before its first chunk is retried
+            delay = self._retry_delay("generate", failure, attempt, retryable=not chunks)
+            if delay is None:
+                raise RuntimeError(f"Response generation failed: {str(failure)}") from failure
+            await asyncio.sleep(delay)
+        
+        hindi_response = "".join(chunks).strip()
+        logger.info(f"Streamed response generated: {hindi_response[:50]}...")
+        if cache_key is not None and hindi_response:
+            await self.response_cache.set(cache_key, hindi_response)
+    
+    async def _call(self, stage: str, priority: int, client_id: str, func: Callable, *args, hedge: bool = False):
+        """
+        Run a blocking backend call in a rate limit slot, retrying rate-limit and transient failures
+        
+        Every attempt takes its own slot, so retries count against the quota.
+        
+        Args:
+            stage: Stage name for logs and metrics
+            priority: Scheduler priority
+            client_id: Caller identity for fair scheduling
+            func: Blocking backend method
+            *args: Arguments for func
+            hedge: Duplicate the call if it runs long (when a hedge policy is set)
+            
+        Returns:
+            The backend's result
+            
+        Raises:
+            UpstreamError: If retries are exhausted or the circuit is open
+            Exception: The backend's own error for permanent failures
+        """
+        attempt = 0
+        while True:
+            self.circuit_breaker.check()
+            attempt += 1
+            try:
+                if hedge and self.hedge_policy is not None:
+                    result = await self._hedged_attempt(priority, client_id, func, *args)
+                else:
+                    async with self.scheduler.slot(priority, client_id):
+                        result = await asyncio.to_thread(func, *args)
+            except Exception as e:
+                delay = self._retry_delay(stage, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.circuit_breaker.record_success()
+            return result
+    
+    async def _hedged_attempt(self, priority: int, client_id: str, func: Callable, *args):
+        """
+        Run one call, duplicating it if it outlives the learned latency percentile
+        
+        The duplicate runs only if the scheduler has a slot free right now,
+        so hedging never exceeds the quota or delays queued callers. The
+        slower call cannot be interrupted (the SDK call is blocking); its
+        result is ignored and it keeps its slot until it returns.
+        
+        Returns:
+            The result of the first call to succeed
+            
+        Raises:
+            Exception: The first error, if every call failed
+        """
+        policy = self.hedge_policy
+        await self.scheduler.acquire(priority, client_id)
+        policy.calls += 1
+        primary = self._start_call(func, *args)
+        pending = {primary}
+        hedged = None
+        
+        delay = policy.delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                if self.scheduler.try_acquire():
+                    policy.hedged += 1
+                    hedged = self._start_call(func, *args)
+                    pending.add(hedged)
+                else:
+                    policy.skipped += 1
+        
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedged:
+                        policy.hedge_wins += 1
+                    return task.result()
+                first_error = first_error or task.exception()
+        raise first_error
+    
+    def _start_call(self, func: Callable, *args) -> asyncio.Future:
+        """Run a blocking call holding an acquired slot; the slot is released and the latency learned when it returns"""
+        started = time.perf_counter()
         
-        if time_since_last < self.min_request_interval:
-            wait_time = self.min_request_interval - time_since_last
-            await asyncio.sleep(wait_time)
+        def finished(task: asyncio.Future):
+            self.scheduler.release()
+            if not task.cancelled() and task.exception() is None:
+                self.hedge_policy.record(time.perf_counter() - started)
         
-        self.last_request_time = time.time()
+        task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        task.add_done_callback(finished)
+        return task
+    
+    def _retry_delay(self, stage: str, exc: Exception, attempt: int, retryable: bool = True) -> Optional[float]:
+        """
+        Record a failed call and decide whether to retry it
+        
+        Args:
+            stage: Stage name for logs and metrics
+            exc: The backend's error
+            attempt: Number of calls made so far
+            retryable: False if the call must not be repeated whatever the error
+            
+        Returns:
+            Seconds to wait before retrying, or None for a permanent failure
+            
+        Raises:
+            UpstreamError: For a rate-limit or transient failure that is not retried
+        """
+        UPSTREAM_ERRORS.inc(stage=stage, error_class=error_class(exc))
+        kind = classify_error(exc)
+        if kind == PERMANENT:
+            # The upstream answered: it is healthy even if this request was bad
+            self.circuit_breaker.record_success()
+            return None
+        
+        hint = retry_after_hint(exc)
+        self.circuit_breaker.record_failure(hint)
+        delay = self.retry_policy.delay(attempt, kind, hint) if retryable else None
+        if delay is None:
+            retry_after = hint or self.circuit_breaker.retry_after() or self.retry_policy.max_delay
+            raise UpstreamError(f"Gemini {stage} failed after {attempt} attempts: {str(exc)}", kind, retry_after) from exc
+        
+        self.retries += 1
+        UPSTREAM_RETRIES.inc(stage=stage, kind=kind)
+        logger.warning(f"Gemini {stage} failed ({kind}: {str(exc)}); retrying in {delay:.2f}s")
+        return delay
+    
+    def stats(self) -> dict:
+        """Return retry, circuit breaker and hedging figures"""
+        return {
+            "retries": self.retries,
+            "max_attempts": self.retry_policy.max_attempts,
+            "circuit": self.circuit_breaker.stats(),
+            "hedging": self.hedge_policy.stats() if self.hedge_policy else None
+        }
+    
+    @staticmethod
+    def _response_cache_key(user_input: str) -> str:
+        """Build the memoization key from the normalized input and prompt version"""
+        material = f"{PROMPT_VERSION}\x00{normalize_hindi_text(user_input)}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
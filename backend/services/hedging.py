@@ -0,0 +1,69 @@
+"""
+Hedging - Duplicate slow upstream calls to cut tail latency
+A call still running past a latency percentile learned from recent calls
+gets one duplicate; whichever finishes first is used
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """
+    Decides when to hedge and keeps the figures to judge whether it pays off
+
+    The hedge delay is the given percentile of the latencies of recent
+    successful calls. Until min_samples calls have been seen, nothing is
+    hedged.
+    """
+
+    def __init__(self, percentile: float = 95, window: int = 200, min_samples: int = 20, min_delay: float = 0.05):
+        """
+        Initialize the policy
+
+        Args:
+            percentile: Latency percentile after which a duplicate is sent
+            window: Number of recent call latencies the percentile is taken over
+            min_samples: Calls to observe before hedging starts
+            min_delay: Never hedge sooner than this, in seconds
+        """
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.min_delay = min_delay
+        self._latencies: Deque[float] = deque(maxlen=max(self.min_samples, window))
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+
+    def record(self, seconds: float):
+        """Add the latency of a successful call"""
+        self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for a call before hedging it, or None while still learning"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+        return max(self.min_delay, ordered[index])
+
+    def stats(self) -> dict:
+        """Return hedge and win rates with the current delay"""
+        delay = self.delay()
+        return {
+            "percentile": self.percentile,
+            "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            "samples": len(self._latencies),
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "skipped_no_budget": self.skipped,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+        }
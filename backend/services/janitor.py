@@ -0,0 +1,173 @@
+"""
+Retention Janitor - Background cleanup of uploads and generated audio
+Enforces per-directory age and size limits without blocking requests
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from services.shared_state import SharedState
+from utils.file_utils import cleanup_old_files, InFlightFiles
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """Limits enforced on one directory, reported under name"""
+    name: str
+    directory: Path
+    max_age_hours: float
+    max_total_bytes: Optional[int] = None
+
+
+class RetentionJanitor:
+    """
+    Periodically sweeps directories, evicting oldest files first
+
+    With shared_state, worker processes of one deployment elect a single
+    sweeper through a lease, so directories are not swept N times over. Every
+    worker publishes its in-flight files there and renews them each interval,
+    so the sweeper never deletes a file another worker is using.
+    """
+
+    LEASE_NAME = "retention_janitor"
+
+    def __init__(
+        self,
+        policies: List[RetentionPolicy],
+        interval_seconds: float,
+        in_flight: InFlightFiles,
+        on_delete: Optional[Callable[[Path], None]] = None,
+        shared_state: Optional[SharedState] = None
+    ):
+        """
+        Initialize the janitor
+
+        Args:
+            policies: Directories to sweep and their limits
+            interval_seconds: Time between sweeps
+            in_flight: Registry of files still used by requests (never deleted; shared
+                with the other workers through shared_state)
+            on_delete: Called with every deleted path (e.g. to update caches)
+            shared_state: Cross-process store used to elect the sweeping worker
+        """
+        self.policies = policies
+        self.interval_seconds = interval_seconds
+        self.in_flight = in_flight
+        self.on_delete = on_delete
+        self.shared_state = shared_state
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = shared_state is None
+
+        self._task: Optional[asyncio.Task] = None
+        self._sweep_lock = asyncio.Lock()
+
+        self.runs = 0
+        self.total_files_deleted = 0
+        self.total_bytes_reclaimed = 0
+        self.last_report: Optional[dict] = None
+
+    def start(self):
+        """Start sweeping in the background"""
+        if self._task is None:
+            if self.shared_state is not None:
+                # Holds outlive one interval so they are renewed before they lapse
+                self.in_flight.share(self.shared_state, ttl_seconds=self.interval_seconds * 3)
+            self._task = asyncio.create_task(self._run_forever())
+            logger.info(f"Retention janitor started (every {self.interval_seconds}s)")
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if self.shared_state is not None:
+                await asyncio.to_thread(self.in_flight.unshare)
+                if self.is_leader:
+                    await asyncio.to_thread(self.shared_state.release_lease, self.LEASE_NAME, self._owner)
+                    self.is_leader = False
+            logger.info("Retention janitor stopped")
+
+    async def run_once(self, purge: bool = False) -> dict:
+        """
+        Sweep every directory now, in a worker thread
+
+        Args:
+            purge: Delete every file that is not in flight, ignoring the limits
+
+        Returns:
+            Report with files deleted and bytes reclaimed per policy name, and runtime
+        """
+        async with self._sweep_lock:
+            started = time.monotonic()
+            directories = {}
+            for policy in self.policies:
+                deleted, reclaimed = await asyncio.to_thread(
+                    cleanup_old_files,
+                    str(policy.directory),
+                    max_age_hours=0 if purge else policy.max_age_hours,
+                    max_total_bytes=policy.max_total_bytes,
+                    is_protected=self.in_flight.is_held,
+                    on_delete=self.on_delete
+                )
+                directories[policy.name] = {
+                    "files_deleted": deleted,
+                    "bytes_reclaimed": reclaimed
+                }
+                self.total_files_deleted += deleted
+                self.total_bytes_reclaimed += reclaimed
+
+            self.runs += 1
+            self.last_report = {
+                "directories": directories,
+                "bytes_reclaimed": sum(d["bytes_reclaimed"] for d in directories.values()),
+                "runtime_seconds": round(time.monotonic() - started, 4)
+            }
+            logger.info(
+                f"Retention sweep reclaimed {self.last_report['bytes_reclaimed']} bytes "
+                f"in {self.last_report['runtime_seconds']}s"
+            )
+            return self.last_report
+
+    def stats(self) -> dict:
+        """Return cumulative cleanup figures and the last sweep report"""
+        return {
+            "runs": self.runs,
+            "leader": self.is_leader,
+            "files_deleted": self.total_files_deleted,
+            "bytes_reclaimed": self.total_bytes_reclaimed,
+            "last_report": self.last_report,
+        }
+
+    async def _run_forever(self):
+        while True:
+            try:
+                if self.shared_state is not None:
+                    await asyncio.to_thread(self.in_flight.renew)
+                if await asyncio.to_thread(self._hold_lease):
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def _hold_lease(self) -> bool:
+        """Acquire or renew the sweeper lease (always True for a single process; runs in a worker thread)"""
+        if self.shared_state is None:
+            return True
+        # Outlives one interval so the holder renews it before anyone else can take over
+        held = self.shared_state.try_lease(self.LEASE_NAME, self._owner, self.interval_seconds * 3)
+        if held != self.is_leader:
+            logger.info(f"Retention janitor {'acquired' if held else 'lost'} the sweeper lease")
+        self.is_leader = held
+        return held
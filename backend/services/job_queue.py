@@ -0,0 +1,351 @@
+"""
+Job Queue - In-process worker pool for asynchronous audio jobs
+Decouples the number of running pipelines from the number of open connections
+"""
+
+import asyncio
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from services.job_store import (
+    Job, JobStore, JOB_CANCELLED, JOB_FAILED, JOB_SUCCEEDED
+)
+from services.pipeline import AudioPipeline, PipelineError
+from utils.file_utils import InFlightFiles
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the queue is at capacity; retry_after estimates when room frees up"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobManager:
+    """
+    Runs queued jobs through the audio pipeline with a fixed number of workers
+
+    Each worker process of a multi-worker deployment runs its own manager
+    against the shared store; jobs of a process that stops heartbeating are
+    adopted by the others. Store calls run in worker threads, because a
+    write can wait for another process's lock.
+    """
+
+    HEARTBEAT_SECONDS = 10.0
+    # Poll interval while long-polling, to see jobs finished by another process
+    WAIT_POLL_SECONDS = 0.5
+
+    def __init__(
+        self,
+        store: JobStore,
+        pipeline: AudioPipeline,
+        workers: int,
+        max_queue: int,
+        result_ttl_seconds: float,
+        in_flight: InFlightFiles
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            store: Persistent job table
+            pipeline: Pipeline each job runs through
+            workers: Number of jobs processed concurrently
+            max_queue: Queued jobs accepted before submissions are refused
+            result_ttl_seconds: How long finished jobs stay retrievable
+            in_flight: Registry protecting job inputs from the retention janitor
+        """
+        self.store = store
+        self.pipeline = pipeline
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+        self.in_flight = in_flight
+
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        # Submissions counted against max_queue while their row is being written
+        self._submitting = 0
+        self._tasks = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+        # job id -> event set when the job finishes (for long-polling)
+        self._finished: Dict[str, asyncio.Event] = {}
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.avg_run_seconds = 0.0
+
+    async def start(self):
+        """Adopt interrupted jobs and start the workers"""
+        if self._tasks:
+            return
+        await asyncio.to_thread(self.store.heartbeat)
+        recovered = await self._adopt_orphans()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_forever()))
+        self._tasks.append(asyncio.create_task(self._heartbeat_forever()))
+        logger.info(f"Job manager started ({self.workers} workers, {recovered} recovered jobs)")
+
+    async def stop(self):
+        """Stop the workers; running jobs are requeued for the next start or another process"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.retire)
+        logger.info("Job manager stopped")
+
+    async def submit(self, input_path: Path, mime_type: str, use_cache: bool, client_id: str) -> Job:
+        """
+        Queue a saved upload for processing
+
+        Args:
+            input_path: Uploaded audio (deleted once the job finishes)
+            mime_type: MIME type derived from the upload's extension
+            use_cache: Serve memoized responses when available
+            client_id: Caller identity for fair scheduling
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFullError: If max_queue jobs are already waiting
+        """
+        if self._queue.qsize() + self._submitting >= self.max_queue:
+            self.rejected += 1
+            raise JobQueueFullError(self._retry_after())
+
+        self._submitting += 1
+        try:
+            job = await asyncio.to_thread(self.store.create, input_path, mime_type, use_cache, client_id)
+        finally:
+            self._submitting -= 1
+        self.in_flight.acquire(Path(input_path))
+        self._queue.put_nowait(job.id)
+        self.submitted += 1
+        logger.info(f"Job {job.id} queued ({self._queue.qsize()} waiting)")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Return a job, or None if unknown or expired"""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """
+        Wait up to timeout seconds for a job to finish (long-polling)
+
+        Returns:
+            The job in its latest state, or None if unknown or expired
+        """
+        job = await self.get(job_id)
+        deadline = time.monotonic() + timeout
+        while job is not None and not job.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # The event fires for jobs run here; polling catches jobs run by another process
+            event = self._finished.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, self.WAIT_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            job = await self.get(job_id)
+        # Events of jobs run elsewhere are never set; other waiters fall back to polling
+        self._finished.pop(job_id, None)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job
+
+        Returns:
+            The job in its latest state, or None if unknown or expired
+        """
+        cancelled = await asyncio.to_thread(
+            self.store.finish, job_id, JOB_CANCELLED, self.result_ttl_seconds, error="Cancelled by client"
+        )
+        if cancelled:
+            self.cancelled += 1
+            self._cancel_requested.add(job_id)
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+            self._notify(job_id)
+            logger.info(f"Job {job_id} cancelled")
+        return await self.get(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a worker in this process"""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        """Jobs being processed in this process"""
+        return len(self._running)
+
+    async def stats(self) -> dict:
+        """Return queue depth, worker usage, outcome counters and stored jobs per status"""
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "avg_run_seconds": round(self.avg_run_seconds, 3),
+            "stored": await asyncio.to_thread(self.store.counts),
+        }
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = await self.get(job_id)
+            if job is None or not await asyncio.to_thread(self.store.mark_running, job_id):
+                # Cancelled (or expired) while waiting; a job adopted by another
+                # process keeps its input
+                latest = await self.get(job_id)
+                if job is not None and (latest is None or latest.finished):
+                    self._discard_input(job)
+                elif job is not None:
+                    self.in_flight.release(Path(job.input_path))
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            self._running[job_id] = task
+            try:
+                await asyncio.wait({task})
+            finally:
+                if not task.done():
+                    # Shutting down: interrupt the job, it is requeued
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                self._running.pop(job_id, None)
+
+    async def _execute(self, job: Job):
+        """Run one job and store its outcome"""
+        started = time.monotonic()
+        interrupted = False
+        try:
+            audio_data = await asyncio.to_thread(Path(job.input_path).read_bytes)
+            result = await self.pipeline.run(
+                audio_data, job.mime_type, use_cache=job.use_cache, client_id=job.client_id
+            )
+            finished = await asyncio.to_thread(
+                self.store.finish, job.id, JOB_SUCCEEDED, self.result_ttl_seconds, result=result.to_dict()
+            )
+            # False if the client cancelled while the result was being stored
+            if finished:
+                self.succeeded += 1
+                logger.info(f"Job {job.id} succeeded")
+        except PipelineError as e:
+            await self._fail(job, e.detail, e.status_code)
+        except FileNotFoundError:
+            await self._fail(job, "Uploaded audio is no longer available", 500)
+        except asyncio.CancelledError:
+            if job.id not in self._cancel_requested:
+                # Shutdown, not a client cancellation: keep the input and run it after restart
+                interrupted = True
+                await asyncio.to_thread(self.store.requeue, job.id)
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            await self._fail(job, f"Internal server error: {str(e)}", 500)
+        finally:
+            elapsed = time.monotonic() - started
+            self.avg_run_seconds = elapsed if not self.avg_run_seconds else 0.8 * self.avg_run_seconds + 0.2 * elapsed
+            self._cancel_requested.discard(job.id)
+            if interrupted:
+                self.in_flight.release(Path(job.input_path))
+            else:
+                self._discard_input(job)
+            self._notify(job.id)
+
+    async def _fail(self, job: Job, detail: str, status_code: int):
+        if await asyncio.to_thread(
+            self.store.finish, job.id, JOB_FAILED, self.result_ttl_seconds, error=detail, error_status=status_code
+        ):
+            self.failed += 1
+            logger.info(f"Job {job.id} failed: {detail}")
+
+    def _discard_input(self, job: Job):
+        """Release and delete a job's uploaded audio"""
+        path = Path(job.input_path)
+        self.in_flight.release(path)
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to delete job input {path}: {str(e)}")
+
+    def _notify(self, job_id: str):
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up"""
+        per_job = self.avg_run_seconds or 5.0
+        return max(1, math.ceil(per_job / max(1, self.workers)))
+
+    async def _adopt_orphans(self) -> int:
+        """Queue jobs left behind by stopped processes; returns the number queued"""
+        # Recovery takes the store's write lock, which other workers may hold
+        jobs = await asyncio.to_thread(self._recover_orphans)
+        for job in jobs:
+            self.in_flight.acquire(Path(job.input_path))
+            self._queue.put_nowait(job.id)
+        return len(jobs)
+
+    def _recover_orphans(self) -> List[Job]:
+        """
+        Take over the jobs of stopped processes (blocking; runs in a worker thread)
+
+        Jobs whose upload is gone are failed instead.
+
+        Returns:
+            The adopted jobs that can run, oldest first
+        """
+        runnable = []
+        for job in self.store.recover(stale_after=self.HEARTBEAT_SECONDS * 3):
+            if Path(job.input_path).exists():
+                runnable.append(job)
+            else:
+                self.store.finish(
+                    job.id, JOB_FAILED, self.result_ttl_seconds,
+                    error="Uploaded audio is no longer available", error_status=500
+                )
+        return runnable
+
+    async def _heartbeat_forever(self):
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(self.store.heartbeat)
+                adopted = await self._adopt_orphans()
+                if adopted:
+                    logger.info(f"Adopted {adopted} jobs from a stopped worker")
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    async def _purge_forever(self):
+        interval = min(60.0, max(1.0, self.result_ttl_seconds / 2))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                purged = await asyncio.to_thread(self.store.purge_expired)
+                if purged:
+                    logger.info(f"Purged {purged} expired jobs")
+            except Exception as e:
+                logger.error(f"Job purge failed: {str(e)}")
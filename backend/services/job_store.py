@@ -0,0 +1,277 @@
+"""
+Job Store - Persistent state for asynchronous audio jobs
+Jobs and their results live in SQLite so they survive restarts and expire after a TTL
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+TERMINAL_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+_COLUMNS = (
+    "id, status, created_at, updated_at, expires_at, input_path, mime_type, "
+    "use_cache, client_id, result, error, error_status"
+)
+
+
+@dataclass
+class Job:
+    """One submitted recording and its outcome"""
+    id: str
+    status: str
+    created_at: float
+    updated_at: float
+    input_path: str
+    mime_type: str
+    use_cache: bool
+    client_id: str
+    expires_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def to_dict(self) -> dict:
+        """Public representation (no server paths or client identity)"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "expires_at": self.expires_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobStore:
+    """
+    SQLite-backed job table, safe to use from the event loop and worker threads
+
+    Several worker processes may share one database. Every store instance
+    owns the jobs it creates or adopts and keeps a heartbeat row; queued and
+    running jobs whose owner stopped heartbeating are adopted by survivors.
+    """
+
+    def __init__(self, sqlite_path: Optional[Path] = None):
+        """
+        Open (or create) the job database
+
+        Args:
+            sqlite_path: Database file (None keeps jobs in memory only)
+        """
+        if sqlite_path:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(sqlite_path) if sqlite_path else ":memory:", check_same_thread=False, timeout=5.0
+        )
+        self._lock = threading.Lock()
+        self.owner = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, expires_at REAL, input_path TEXT NOT NULL, "
+                "mime_type TEXT NOT NULL, use_cache INTEGER NOT NULL, client_id TEXT NOT NULL, "
+                "result TEXT, error TEXT, error_status INTEGER, owner TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS job_owners (owner TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        logger.info(f"Job store initialized (persistent={'yes' if sqlite_path else 'no'})")
+
+    def create(self, input_path: Path, mime_type: str, use_cache: bool, client_id: str) -> Job:
+        """Insert a queued job"""
+        now = time.time()
+        job = Job(
+            id=uuid.uuid4().hex,
+            status=JOB_QUEUED,
+            created_at=now,
+            updated_at=now,
+            input_path=str(input_path),
+            mime_type=mime_type,
+            use_cache=use_cache,
+            client_id=client_id
+        )
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO jobs ({_COLUMNS}, owner) VALUES (?, ?, ?, ?, NULL, ?, ?, ?, ?, NULL, NULL, NULL, ?)",
+                (job.id, job.status, now, now, job.input_path, mime_type, int(use_cache), client_id, self.owner)
+            )
+            self._db.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job, or None if it does not exist or has expired"""
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = self._from_row(row)
+        if job.expires_at is not None and job.expires_at <= time.time():
+            return None
+        return job
+
+    def mark_running(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it is no longer queued (e.g. cancelled)"""
+        return self._transition(job_id, (JOB_QUEUED,), JOB_RUNNING)
+
+    def requeue(self, job_id: str) -> bool:
+        """Put an interrupted running job back in the queue"""
+        return self._transition(job_id, (JOB_RUNNING,), JOB_QUEUED)
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        ttl_seconds: float,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        error_status: Optional[int] = None
+    ) -> bool:
+        """
+        Record the outcome of a job that is not finished yet
+
+        Args:
+            job_id: Job to update
+            status: One of TERMINAL_STATES
+            ttl_seconds: How long the outcome stays retrievable
+            result: Pipeline output for succeeded jobs
+            error: Failure detail
+            error_status: HTTP status matching the failure
+
+        Returns:
+            True if the job was updated
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, expires_at = ?, result = ?, error = ?, "
+                "error_status = ? WHERE id = ? AND status IN (?, ?)",
+                (
+                    status, now, now + ttl_seconds,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error, error_status, job_id, JOB_QUEUED, JOB_RUNNING
+                )
+            )
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def heartbeat(self):
+        """Record that this store's owner is alive"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_owners (owner, heartbeat_at) VALUES (?, ?)", (self.owner, time.time())
+            )
+            self._db.commit()
+
+    def retire(self):
+        """Drop this owner's heartbeat so its queued jobs are adopted right away"""
+        with self._lock:
+            self._db.execute("DELETE FROM job_owners WHERE owner = ?", (self.owner,))
+            self._db.commit()
+
+    def recover(self, stale_after: float) -> List[Job]:
+        """
+        Adopt jobs whose owner has stopped (restart or crashed worker)
+
+        Running jobs of a stopped owner are requeued. Adopted jobs belong to
+        this store from then on.
+
+        Args:
+            stale_after: Seconds without a heartbeat after which an owner is considered gone
+
+        Returns:
+            The adopted queued jobs, oldest first
+        """
+        now = time.time()
+        with self._lock:
+            # Take the write lock up front so two workers never adopt the same job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                orphaned = (
+                    "status IN (?, ?) AND (owner IS NULL OR owner NOT IN "
+                    "(SELECT owner FROM job_owners WHERE heartbeat_at > ?))"
+                )
+                params = (JOB_QUEUED, JOB_RUNNING, now - stale_after)
+                rows = self._db.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE {orphaned} ORDER BY created_at", params
+                ).fetchall()
+                self._db.execute(
+                    f"UPDATE jobs SET status = ?, updated_at = ?, owner = ? WHERE {orphaned}",
+                    (JOB_QUEUED, now, self.owner, *params)
+                )
+                self._db.execute("DELETE FROM job_owners WHERE heartbeat_at <= ?", (now - stale_after,))
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        jobs = [self._from_row(row) for row in rows]
+        for job in jobs:
+            job.status = JOB_QUEUED
+        return jobs
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs past their TTL; returns the number removed"""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of stored jobs per status"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def _transition(self, job_id: str, from_states: tuple, to_state: str) -> bool:
+        placeholders = ", ".join("?" for _ in from_states)
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN ({placeholders})",
+                (to_state, time.time(), job_id, *from_states)
+            )
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def _from_row(row) -> Job:
+        (job_id, status, created_at, updated_at, expires_at, input_path, mime_type,
+         use_cache, client_id, result, error, error_status) = row
+        return Job(
+            id=job_id,
+            status=status,
+            created_at=created_at,
+            updated_at=updated_at,
+            expires_at=expires_at,
+            input_path=input_path,
+            mime_type=mime_type,
+            use_cache=bool(use_cache),
+            client_id=client_id,
+            result=json.loads(result) if result else None,
+            error=error,
+            error_status=error_status
+        )
@@ -0,0 +1,274 @@
+"""
+Audio Pipeline - Preprocess, transcribe, respond and synthesize
+Shared by the synchronous /process-audio endpoint, the background job workers
+and the streaming text and voice endpoints
+"""
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+from services.audio_preprocessor import AudioPreprocessor
+from services.gemini_service import GeminiService, TRANSCRIPTION_PROMPT
+from services.response_cache import ResponseCache
+from services.resilience import UpstreamError
+from services.tts_service import TTSService
+from utils.text_utils import SentenceSplitter
+from utils.timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    """A pipeline step failed; carries the HTTP status, detail and Retry-After to report"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_upstream(cls, error: UpstreamError, action: str) -> "PipelineError":
+        """Report a rate-limited or unavailable upstream (429/503 with Retry-After)"""
+        reason = "rate limited" if error.status_code == 429 else "temporarily unavailable"
+        return cls(error.status_code, f"Failed to {action}: the AI service is {reason}. Please retry later.", error.retry_after)
+
+
+@dataclass
+class PipelineResult:
+    """Output of one pipeline run"""
+    transcription: str
+    response: str
+    audio_path: Path
+    preprocessing: Optional[dict] = None
+    transcription_cached: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "transcription": self.transcription,
+            "response": self.response,
+            "audio_url": f"/api/audio/{self.audio_path.name}",
+            "preprocessing": self.preprocessing,
+            "transcription_cached": self.transcription_cached
+        }
+
+
+class AudioPipeline:
+    """Runs the spoken question -> spoken answer pipeline for one recording"""
+
+    def __init__(
+        self,
+        gemini_service: GeminiService,
+        tts_service: TTSService,
+        preprocessor: Optional[AudioPreprocessor] = None,
+        transcription_cache: Optional[ResponseCache] = None
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            gemini_service: Transcription and response generation
+            tts_service: Speech synthesis
+            preprocessor: Optional audio shrinking step before transcription
+            transcription_cache: Optional cache of transcriptions by upload content
+        """
+        self.gemini_service = gemini_service
+        self.tts_service = tts_service
+        self.preprocessor = preprocessor
+        self.transcription_cache = transcription_cache
+
+    async def run(
+        self,
+        audio_data: bytes,
+        mime_type: str,
+        use_cache: bool = True,
+        client_id: str = "default",
+        timer: Optional[StageTimer] = None,
+        content_hash: Optional[str] = None
+    ) -> PipelineResult:
+        """
+        Process one recording
+
+        Args:
+            audio_data: Uploaded audio
+            mime_type: MIME type derived from the upload's extension
+            use_cache: Serve memoized transcriptions and responses when available
+            client_id: Caller identity for fair scheduling
+            timer: Stage timer to record into (a fresh one if omitted)
+            content_hash: SHA-256 of audio_data if already known (computed otherwise)
+
+        Returns:
+            PipelineResult with the texts and the synthesized audio path
+
+        Raises:
+            PipelineError: If transcription, generation or synthesis fails
+        """
+        timer = timer or StageTimer()
+
+        # The same recording sent again (client retry, canned prompt) skips
+        # preprocessing, the rate limit wait and the model call
+        cache_key = None
+        if self.transcription_cache is not None:
+            cache_key = self._transcription_cache_key(content_hash or hashlib.sha256(audio_data).hexdigest(), mime_type)
+            cached = await self.transcription_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                logger.info(f"Transcription cache hit: {cached[:50]}...")
+                return await self._respond(cached, None, use_cache, client_id, timer, transcription_cached=True)
+
+        # Shrink the payload before it is sent to Gemini
+        preprocessing = None
+        segments, segment_mime_type = [], None
+        if self.preprocessor is not None:
+            with timer.stage("preprocess"):
+                prepared = await self.preprocessor.process(audio_data, fallback_mime_type=mime_type)
+            audio_data, mime_type, segments = prepared.data, prepared.mime_type, prepared.segments
+            segment_mime_type = prepared.segment_mime_type
+            preprocessing = {
+                "source_format": prepared.source_format,
+                "original_bytes": prepared.original_bytes,
+                "processed_bytes": prepared.processed_bytes,
+                "bytes_saved": prepared.bytes_saved,
+                "trimmed_ms": prepared.trimmed_ms,
+                "segments": len(segments) or 1
+            }
+
+        # Step 1: Transcribe Hindi speech to text using Gemini
+        logger.info("Transcribing audio with Gemini...")
+        with timer.stage("transcribe"):
+            try:
+                if segments:
+                    # Long recording: segments are transcribed in parallel
+                    transcription = await self.gemini_service.transcribe_segments(
+                        segments, mime_type=segment_mime_type, client_id=client_id
+                    )
+                else:
+                    transcription = await self.gemini_service.transcribe_audio(
+                        audio_data, mime_type=mime_type, client_id=client_id
+                    )
+            except UpstreamError as e:
+                raise PipelineError.from_upstream(e, "transcribe audio")
+
+        if not transcription:
+            raise PipelineError(
+                422,
+                "Failed to transcribe audio. Please ensure the audio is clear and in Hindi."
+            )
+
+        logger.info(f"Transcription: {transcription}")
+        if cache_key is not None:
+            await self.transcription_cache.set(cache_key, transcription)
+
+        return await self._respond(transcription, preprocessing, use_cache, client_id, timer)
+
+    async def _respond(
+        self,
+        transcription: str,
+        preprocessing: Optional[dict],
+        use_cache: bool,
+        client_id: str,
+        timer: StageTimer,
+        transcription_cached: bool = False
+    ) -> PipelineResult:
+        """Generate and synthesize the reply to a transcription"""
+        # Step 2: Generate Hindi response using Gemini LLM
+        logger.info("Generating response with Gemini LLM...")
+        with timer.stage("generate"):
+            try:
+                response_text = await self.gemini_service.generate_response(
+                    transcription, use_cache=use_cache, client_id=client_id
+                )
+            except UpstreamError as e:
+                raise PipelineError.from_upstream(e, "generate response")
+
+        if not response_text:
+            raise PipelineError(500, "Failed to generate response")
+
+        logger.info(f"Response: {response_text}")
+
+        # Step 3: Convert response to speech using gTTS
+        logger.info("Converting response to speech...")
+        with timer.stage("tts"):
+            audio_output_path = await self.tts_service.synthesize(response_text)
+
+        if not audio_output_path:
+            raise PipelineError(500, "Failed to generate speech audio")
+
+        logger.info(f"Audio response saved to: {audio_output_path}")
+
+        return PipelineResult(
+            transcription=transcription,
+            response=response_text,
+            audio_path=audio_output_path,
+            preprocessing=preprocessing,
+            transcription_cached=transcription_cached
+        )
+
+    async def stream_reply(
+        self,
+        text: str,
+        use_cache: bool = True,
+        client_id: str = "default"
+    ) -> AsyncIterator[Tuple[str, Optional[Path]]]:
+        """
+        Generate a reply sentence by sentence, synthesizing each one as soon as it is complete
+        
+        The Gemini response is read as a stream and split at Devanagari
+        sentence boundaries; TTS for a sentence starts while later sentences
+        are still being generated. Closing the iterator early stops the
+        outstanding work.
+        
+        Args:
+            text: The user's words
+            use_cache: Serve and store memoized responses
+            client_id: Caller identity for fair scheduling
+            
+        Yields:
+            (sentence, audio path) in order; the path is None if synthesis failed
+            
+        Raises:
+            RuntimeError: If the model call fails permanently
+            UpstreamError: If Gemini is rate limited or unavailable (after retries)
+        """
+        # (sentence, TTS task) pairs in sentence order; None marks the end
+        pending: asyncio.Queue = asyncio.Queue()
+        
+        async def schedule_sentences():
+            """Read the Gemini stream and start TTS for every completed sentence"""
+            splitter = SentenceSplitter()
+            try:
+                async for chunk in self.gemini_service.stream_response(text, use_cache=use_cache, client_id=client_id):
+                    for sentence in splitter.feed(chunk):
+                        await pending.put((sentence, asyncio.create_task(self.tts_service.synthesize(sentence))))
+                for sentence in splitter.flush():
+                    await pending.put((sentence, asyncio.create_task(self.tts_service.synthesize(sentence))))
+                await pending.put(None)
+            except Exception as e:
+                await pending.put(e)
+        
+        scheduler = asyncio.create_task(schedule_sentences())
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                sentence, tts_task = item
+                yield sentence, await tts_task
+        finally:
+            # Consumer went away or the stream failed: stop outstanding work
+            scheduler.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if isinstance(item, tuple):
+                    item[1].cancel()
+
+    def _transcription_cache_key(self, content_hash: str, mime_type: str) -> str:
+        """Key a transcription by the upload's content, the preprocessing settings and the prompt"""
+        settings = self.preprocessor.settings_key() if self.preprocessor is not None else "raw"
+        material = f"{content_hash}\x00{mime_type}\x00{settings}\x00{TRANSCRIPTION_PROMPT}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
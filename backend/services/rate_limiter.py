@@ -0,0 +1,313 @@
+"""
+Rate Limit Scheduler - Concurrency-safe admission for upstream API calls
+Async token bucket with an in-flight cap, priority queue and per-client fairness
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from services.shared_state import SharedState
+from utils.metrics import RATE_LIMIT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+
+class RateLimitScheduler:
+    """
+    Grants call slots at a sustained rate without bursts above the quota
+
+    Waiters are queued per priority level; within a level, clients are
+    served round-robin so one busy client cannot starve the others. A slot
+    is granted when a token is available and the in-flight cap allows it.
+
+    With shared_state, tokens come from a bucket shared by every worker
+    process, so N workers together stay within one quota; queueing, priority
+    and the in-flight cap remain per process. Tokens are taken from the
+    shared bucket in a worker thread, as many as the queued callers can use
+    at once, and kept in a local reserve, so the event loop never waits on
+    another worker's database lock.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        burst: int = 1,
+        max_in_flight: int = 4,
+        shared_state: Optional[SharedState] = None,
+        bucket_name: str = "gemini"
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            requests_per_minute: Sustained token refill rate
+            burst: Bucket capacity (calls allowed back to back after idle time)
+            max_in_flight: Maximum number of calls running at once (per process)
+            shared_state: Cross-process store holding the token bucket (None keeps it in memory)
+            bucket_name: Name of the shared bucket
+        """
+        self.rate_per_second = requests_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.shared_state = shared_state
+        self.bucket_name = bucket_name
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+
+        # Shared mode: tokens taken from the shared bucket but not granted yet,
+        # the take in progress, when the shared bucket next has a token, and
+        # the bucket level the last take left (and when)
+        self._reserve = 0
+        self._shared_take: Optional[asyncio.Task] = None
+        self._shared_ready_at = 0.0
+        self._shared_tokens: Optional[float] = None
+        self._shared_seen_at = 0.0
+
+        # priority -> client_id -> FIFO of waiting futures
+        self._waiters: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {}
+        self._queue_depth = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        self.total_granted = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+        logger.info(
+            f"Rate limit scheduler initialized ({requests_per_minute} req/min, "
+            f"burst {self.burst}, max in flight {self.max_in_flight}, "
+            f"shared={'yes' if shared_state else 'no'})"
+        )
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL, client_id: str = "default"):
+        """
+        Hold a rate-limited call slot for the duration of the block
+
+        Args:
+            priority: Queue priority (PRIORITY_HIGH is served first)
+            client_id: Caller identity used for round-robin fairness
+        """
+        await self.acquire(priority, client_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL, client_id: str = "default") -> float:
+        """
+        Wait until a slot is granted
+
+        Args:
+            priority: Queue priority (PRIORITY_HIGH is served first)
+            client_id: Caller identity used for round-robin fairness
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        clients = self._waiters.setdefault(priority, OrderedDict())
+        clients.setdefault(client_id, deque()).append(future)
+        self._queue_depth += 1
+
+        enqueued_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before cancellation: give the slot back
+                self.release()
+            else:
+                self._remove_waiter(priority, client_id, future)
+            raise
+
+        waited = time.monotonic() - enqueued_at
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.last_wait_seconds = waited
+        RATE_LIMIT_WAIT_SECONDS.observe(waited, priority=PRIORITY_NAMES.get(priority, str(priority)))
+        return waited
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot only if one is free right now, without queueing
+
+        Used for optional extra calls (hedges): they never wait and never
+        go ahead of queued callers.
+
+        Returns:
+            True if a slot was granted (release it when done)
+        """
+        if self._queue_depth or self._in_flight >= self.max_in_flight:
+            return False
+        if self._take_token() != 0.0:
+            return False
+        self._in_flight += 1
+        self.total_granted += 1
+        return True
+
+    def release(self):
+        """Return an in-flight slot and serve the next waiter"""
+        self._in_flight -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        """
+        Return queue depth, in-flight count and wait-time figures
+
+        The shared bucket is not queried here (that could block on another
+        worker's lock): its level is the one the last take left, refilled
+        since, and ignores what other workers took meanwhile (None before
+        the first take).
+        """
+        if self.shared_state is not None:
+            tokens = None
+            if self._shared_tokens is not None:
+                refilled = (time.monotonic() - self._shared_seen_at) * self.rate_per_second
+                tokens = round(min(self.burst, self._shared_tokens + refilled), 3)
+        else:
+            self._refill()
+            tokens = round(self._tokens, 3)
+        return {
+            "queue_depth": self._queue_depth,
+            "in_flight": self._in_flight,
+            "tokens_available": tokens,
+            "shared": self.shared_state is not None,
+            "tokens_reserved": self._reserve,
+            "requests_per_minute": self.rate_per_second * 60,
+            "burst": self.burst,
+            "max_in_flight": self.max_in_flight,
+            "total_granted": self.total_granted,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.total_granted, 4) if self.total_granted else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+            "last_wait_seconds": round(self.last_wait_seconds, 4),
+        }
+
+    def _refill(self):
+        """Add tokens accrued since the last refill"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_per_second)
+        self._last_refill = now
+
+    def _take_token(self) -> Optional[float]:
+        """
+        Take one token
+
+        Returns:
+            0.0 if taken, seconds until the next one accrues, or None while
+            tokens are being fetched from the shared bucket (dispatching
+            resumes once they arrive)
+        """
+        if self.shared_state is not None:
+            if self._reserve:
+                self._reserve -= 1
+                return 0.0
+            if self._shared_take is not None:
+                return None
+            wait = self._shared_ready_at - time.monotonic()
+            if wait > 0:
+                return wait
+            self._shared_take = asyncio.get_running_loop().create_task(self._take_shared_tokens())
+            return None
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate_per_second if self.rate_per_second else 1.0
+
+    async def _take_shared_tokens(self):
+        """Fetch tokens for the queued callers from the shared bucket, then dispatch"""
+        wanted = max(1, min(self._queue_depth, self.max_in_flight - self._in_flight))
+        try:
+            taken, wait, left = await asyncio.to_thread(
+                self.shared_state.take_tokens, self.bucket_name, self.rate_per_second, self.burst, wanted
+            )
+            self._shared_tokens, self._shared_seen_at = left, time.monotonic()
+        except Exception as e:
+            logger.error(f"Shared rate limit bucket unavailable: {str(e)}")
+            taken, wait = 0, 1.0
+        self._shared_take = None
+        self._reserve += taken
+        self._shared_ready_at = time.monotonic() + wait
+        self._dispatch()
+
+    def _return_token(self):
+        """Give back a token taken for a waiter that was cancelled meanwhile"""
+        if self.shared_state is not None:
+            self._reserve += 1
+        else:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def _dispatch(self):
+        """Grant slots to queued waiters while tokens and in-flight capacity allow"""
+        delay = 0.0
+        while self._queue_depth and self._in_flight < self.max_in_flight:
+            delay = self._take_token()
+            if delay is None:
+                # A shared take is under way and dispatches when it completes
+                return
+            if delay > 0:
+                break
+            future = self._next_waiter()
+            if future is None:
+                self._return_token()
+                break
+            self._in_flight += 1
+            self.total_granted += 1
+            future.set_result(None)
+
+        # Out of tokens with work queued: wake up when the next token accrues
+        if self._queue_depth and self._in_flight < self.max_in_flight and self._wakeup is None:
+            self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.0), self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Pop the next waiter: highest priority first, round-robin across clients"""
+        for priority in sorted(self._waiters):
+            clients = self._waiters[priority]
+            while clients:
+                client_id, queue = next(iter(clients.items()))
+                future = queue.popleft()
+                if queue:
+                    clients.move_to_end(client_id)
+                else:
+                    del clients[client_id]
+                self._queue_depth -= 1
+                if not future.done():
+                    return future
+            del self._waiters[priority]
+        return None
+
+    def _remove_waiter(self, priority: int, client_id: str, future: asyncio.Future):
+        """Drop a cancelled waiter from its queue"""
+        clients = self._waiters.get(priority)
+        if not clients or client_id not in clients:
+            return
+        try:
+            clients[client_id].remove(future)
+            self._queue_depth -= 1
+        except ValueError:
+            return
+        if not clients[client_id]:
+            del clients[client_id]
+        if not clients:
+            del self._waiters[priority]
@@ -0,0 +1,241 @@
+"""
+Resilience - Error classification, retry with backoff and circuit breaking
+Keeps transient upstream failures from reaching clients and stops calls
+from piling onto an upstream that is already failing
+"""
+
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Error kinds
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# Upstream HTTP statuses worth retrying besides 429
+TRANSIENT_STATUSES = {408, 500, 502, 503, 504}
+
+# Retry hints Gemini puts in its error text ("retry_delay { seconds: 37 }", "Please retry in 37.5s")
+RETRY_HINT_RES = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)"),
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+]
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Gauge values exported on /metrics
+CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 0.5, CIRCUIT_OPEN: 1}
+
+
+class UpstreamError(Exception):
+    """
+    An upstream call failed for a reason the client should retry later
+
+    Raised after retries are exhausted or while the circuit is open; carries
+    the HTTP status and Retry-After value to report.
+    """
+
+    def __init__(self, message: str, kind: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self) -> int:
+        """429 when the quota is exhausted, 503 while the upstream is unavailable"""
+        return 429 if self.kind == RATE_LIMIT else 503
+
+
+class CircuitOpenError(UpstreamError):
+    """The circuit breaker is failing calls fast"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)", TRANSIENT, retry_after)
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    Classify an upstream failure
+
+    Uses the HTTP status carried by BackendError and the Google API
+    exceptions (status_code or code), falling back to the exception type
+    for network errors.
+
+    Args:
+        exc: Exception raised by a backend call
+
+    Returns:
+        RATE_LIMIT, TRANSIENT or PERMANENT
+    """
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return RATE_LIMIT
+        if status in TRANSIENT_STATUSES:
+            return TRANSIENT
+        return PERMANENT
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+    return PERMANENT
+
+
+def retry_after_hint(exc: BaseException) -> Optional[float]:
+    """Seconds the upstream asked us to wait, if the error says so"""
+    retry_after = getattr(exc, "retry_after", None)
+    if isinstance(retry_after, (int, float)):
+        return float(retry_after)
+    message = str(exc)
+    for pattern in RETRY_HINT_RES:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter
+
+    Attributes:
+        max_attempts: Calls made in total, including the first
+        base_delay: Backoff before the first retry (before jitter), in seconds
+        max_delay: Cap on the backoff, in seconds
+        max_retry_after: Longest upstream Retry-After hint waited out inline;
+            longer hints are passed on to the client instead
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    max_retry_after: float = 10.0
+
+    def delay(self, attempt: int, kind: str, hint: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to wait before retrying a failed call
+
+        Args:
+            attempt: Number of calls already made (1 after the first failure)
+            kind: Error kind of the failure
+            hint: Upstream Retry-After hint, if any
+
+        Returns:
+            The delay, or None if the call should not be retried
+        """
+        if kind == PERMANENT or attempt >= self.max_attempts:
+            return None
+        if hint is not None and hint > self.max_retry_after:
+            return None
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        # Honour the hint, spreading retries a little so callers don't return in lockstep
+        return hint + backoff / 2 if hint is not None else backoff
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while an upstream is degraded
+
+    Closed: calls flow, consecutive rate-limit and transient failures are
+    counted. Open: calls are rejected with a Retry-After until the reset
+    timeout passes. Half-open: one probe call is let through; success
+    closes the circuit, failure opens it again. Permanent errors mean the
+    upstream answered, so they count as success here.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Upstream name used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open before a probe
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+
+        self.state = CIRCUIT_CLOSED
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_started_at: Optional[float] = None
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    def check(self):
+        """
+        Admit a call or fail it fast
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or a half-open probe is running
+        """
+        now = time.monotonic()
+        if self.state == CIRCUIT_OPEN:
+            if now < self._open_until:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._open_until - now)
+            self.state = CIRCUIT_HALF_OPEN
+            self._probe_started_at = None
+            logger.info(f"Circuit for {self.name} half-open: probing")
+
+        if self.state == CIRCUIT_HALF_OPEN:
+            # A probe that never reported back (cancelled caller) expires after reset_seconds
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_seconds - (now - self._probe_started_at))
+            self._probe_started_at = now
+
+    def record_success(self):
+        """Report a call the upstream answered"""
+        if self.state != CIRCUIT_CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = CIRCUIT_CLOSED
+        self._consecutive_failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        """
+        Report a rate-limit or transient failure
+
+        Args:
+            retry_after: Upstream hint; the circuit stays open at least this long
+        """
+        self._consecutive_failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._open(max(self.reset_seconds, retry_after or 0.0))
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit admits calls again (0 if closed)"""
+        if self.state != CIRCUIT_OPEN:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    def _open(self, seconds: float):
+        """Reject calls for the given time"""
+        if self.state != CIRCUIT_OPEN:
+            self.times_opened += 1
+            logger.warning(
+                f"Circuit for {self.name} opened after {self._consecutive_failures} failures "
+                f"(failing fast for {seconds:.0f}s)"
+            )
+        self.state = CIRCUIT_OPEN
+        self._open_until = time.monotonic() + seconds
+        self._probe_started_at = None
+
+    def stats(self) -> dict:
+        """Return state and counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 2),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,202 @@
+"""
+Response Cache - Memoization for Gemini responses and transcriptions
+Bounded in-memory LRU tier with an optional persistent SQLite tier, which is
+accessed from worker threads so disk I/O never blocks the event loop
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Two-tier TTL cache for generated text"""
+
+    # The persistent tier is trimmed once per this many writes, not on every
+    # insert, so it may exceed max_persistent_entries by up to this much
+    TRIM_EVERY_WRITES = 100
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        sqlite_path: Optional[Path] = None,
+        table: str = "response_cache",
+        max_persistent_entries: Optional[int] = None
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            ttl_seconds: Time-to-live for every entry
+            max_entries: Capacity of the in-memory tier
+            sqlite_path: Database file for the persistent tier (None disables it)
+            table: Table holding the persistent tier (lets several caches share a file)
+            max_persistent_entries: Capacity of the persistent tier, enforced every
+                TRIM_EVERY_WRITES writes; the entries closest to expiry are dropped
+                first (None leaves it bounded by TTL only)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.table = table
+        self.max_persistent_entries = max_persistent_entries
+
+        # key -> (value, expires_at), least recently used first
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes the persistent tier's connection across worker threads
+        self._db_lock = threading.Lock()
+        self._writes_since_trim = 0
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            self._db = self._open_db(Path(sqlite_path))
+            if max_persistent_entries is not None:
+                self._trim_persistent()
+                self._db.commit()
+
+        logger.info(
+            f"Cache {table} initialized (ttl={ttl_seconds}s, max_entries={max_entries}, "
+            f"persistent={'yes' if self._db else 'no'})"
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached value
+
+        The persistent tier is read in a worker thread; if it fails the
+        lookup is treated as a miss.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        row = None
+        if self._db is not None:
+            try:
+                row = await asyncio.to_thread(self._read_persistent, key, now)
+            except sqlite3.Error as e:
+                logger.error(f"Cache {self.table} read failed: {str(e)}")
+
+        with self._lock:
+            if row is not None:
+                value, expires_at = row
+                self._remember(key, value, expires_at)
+                self.persistent_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    async def set(self, key: str, value: str) -> None:
+        """
+        Store a value in both tiers
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._write_persistent, key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.error(f"Cache {self.table} write failed: {str(e)}")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and occupancy"""
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+            }
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        """Insert into the memory tier and evict LRU entries (caller holds the lock)"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_persistent(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        """Fetch an unexpired row from the persistent tier, dropping an expired one (worker thread)"""
+        with self._db_lock:
+            row = self._db.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] > now:
+                return row
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+
+    def _write_persistent(self, key: str, value: str, expires_at: float):
+        """Upsert a row into the persistent tier (worker thread)"""
+        with self._db_lock:
+            try:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+                self._writes_since_trim += 1
+                if self.max_persistent_entries is not None and self._writes_since_trim >= self.TRIM_EVERY_WRITES:
+                    self._trim_persistent()
+                    self._writes_since_trim = 0
+                self._db.commit()
+            except sqlite3.Error:
+                self._db.rollback()
+                raise
+
+    def _trim_persistent(self):
+        """Drop the entries closest to expiry beyond max_persistent_entries (caller holds the DB lock)"""
+        self._db.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY expires_at "
+            f"LIMIT MAX(0, (SELECT COUNT(*) FROM {self.table}) - ?))",
+            (self.max_persistent_entries,)
+        )
+
+    def _open_db(self, sqlite_path: Path) -> sqlite3.Connection:
+        """Open the persistent tier and drop expired rows"""
+        sqlite_path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(sqlite_path), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_expires_at ON {self.table} (expires_at)")
+        db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        db.commit()
+        return db
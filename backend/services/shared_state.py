@@ -0,0 +1,172 @@
+"""
+Shared State - Cross-process coordination for multi-worker deployments
+Token buckets, leases and file holds kept in a local SQLite file every worker process opens
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedState:
+    """
+    SQLite-backed state shared by every worker process on the host
+
+    Each operation runs in its own short IMMEDIATE transaction, so SQLite's
+    write lock serializes workers; rows are tiny and locks are held for
+    microseconds. Calls can still wait up to busy_timeout on another worker,
+    so async callers run them in a worker thread.
+    """
+
+    def __init__(self, sqlite_path: Path, busy_timeout_ms: int = 5000):
+        """
+        Open (or create) the shared database
+
+        Args:
+            sqlite_path: Database file every worker points at
+            busy_timeout_ms: How long to wait for another worker's write lock
+        """
+        Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(str(sqlite_path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS file_holds ("
+                "path TEXT NOT NULL, owner TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (path, owner))"
+            )
+        logger.info(f"Shared state opened at {sqlite_path}")
+
+    def take_tokens(self, name: str, rate_per_second: float, burst: int, count: int = 1) -> Tuple[int, float, float]:
+        """
+        Take up to count whole tokens from a named bucket
+
+        Blocks for up to busy_timeout when workers contend: call it from a
+        worker thread, not the event loop.
+
+        Args:
+            name: Bucket name
+            rate_per_second: Refill rate
+            burst: Bucket capacity
+            count: Tokens wanted
+
+        Returns:
+            (tokens taken, seconds until the next token accrues if none were taken, else 0.0,
+            tokens left in the bucket)
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                tokens = self._current_tokens(name, rate_per_second, burst, now)
+                taken = min(max(1, count), int(tokens))
+                tokens -= taken
+                wait = 0.0
+                if not taken:
+                    wait = (1 - tokens) / rate_per_second if rate_per_second else 1.0
+                self._db.execute(
+                    "INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (name, tokens, now)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return taken, wait, tokens
+
+    def try_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Acquire or renew a named lease
+
+        Args:
+            name: Lease name (one holder at a time)
+            owner: Identity of the caller
+            ttl_seconds: How long the lease stays valid without renewal
+
+        Returns:
+            True if the caller holds the lease
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                held = row is None or row[0] == owner or row[1] <= now
+                if held:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                        (name, owner, now + ttl_seconds)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return held
+
+    def release_lease(self, name: str, owner: str):
+        """Give up a lease so another worker can take it right away"""
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def hold_file(self, path: str, owner: str, ttl_seconds: float):
+        """
+        Record that a worker is using a file
+
+        Args:
+            path: Resolved file path
+            owner: Identity of the holding worker
+            ttl_seconds: How long the hold stays valid without renew_file_holds()
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO file_holds (path, owner, expires_at) VALUES (?, ?, ?)",
+                (path, owner, time.time() + ttl_seconds)
+            )
+
+    def release_file(self, path: str, owner: str):
+        """Drop a worker's hold on a file"""
+        with self._lock:
+            self._db.execute("DELETE FROM file_holds WHERE path = ? AND owner = ?", (path, owner))
+
+    def renew_file_holds(self, owner: str, ttl_seconds: float):
+        """Extend every hold of a worker, and drop holds whose owner stopped renewing them"""
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE file_holds SET expires_at = ? WHERE owner = ?", (now + ttl_seconds, owner))
+            self._db.execute("DELETE FROM file_holds WHERE expires_at <= ?", (now,))
+
+    def release_file_holds(self, owner: str):
+        """Drop every hold of a worker (on shutdown)"""
+        with self._lock:
+            self._db.execute("DELETE FROM file_holds WHERE owner = ?", (owner,))
+
+    def is_file_held(self, path: str) -> bool:
+        """Return True if any worker holds the file"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM file_holds WHERE path = ? AND expires_at > ? LIMIT 1", (path, time.time())
+            ).fetchone()
+        return row is not None
+
+    def _current_tokens(self, name: str, rate_per_second: float, burst: int, now: float) -> float:
+        """Tokens in a bucket after refilling up to now (caller holds the lock)"""
+        row = self._db.execute("SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return float(burst)
+        tokens, updated_at = row
+        return min(burst, tokens + max(0.0, now - updated_at) * rate_per_second)
@@ -0,0 +1,70 @@
+"""
+Singleflight - Coalescing of identical in-flight calls
+Concurrent callers with the same key share one execution
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self, name: str):
+        """
+        Initialize the coalescing group
+
+        Args:
+            name: Label used in logs and stats
+        """
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func once per key, sharing the result with concurrent callers
+
+        A caller that is cancelled does not cancel the shared execution,
+        which keeps running for the remaining callers.
+
+        Args:
+            key: Identity of the call
+            func: Zero-argument coroutine factory performing the call
+
+        Returns:
+            The shared result
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            logger.info(f"[{self.name}] Joined in-flight call {key[:16]}")
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        self.executions += 1
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        """Return execution and deduplication counters"""
+        callers = self.executions + self.deduplicated
+        return {
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "dedup_ratio": round(self.deduplicated / callers, 4) if callers else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+    def _forget(self, key: str, future: asyncio.Future):
+        """Drop a finished call so later callers start a fresh one"""
+        if self._calls.get(key) is future:
+            del self._calls[key]
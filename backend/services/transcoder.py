@@ -0,0 +1,259 @@
+"""
+Audio Transcoder - Compact variants of generated replies
+MP3 replies are re-encoded on request (Opus in OGG or WebM) by ffmpeg in a
+process pool, and each variant is kept on disk next to the clip it came from
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.singleflight import SingleFlight
+from utils.http_utils import parse_accept
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """An encoding replies can be served in"""
+    name: str
+    suffix: str
+    container: str
+    codec: str
+    media_type: str
+
+
+# The source format: served as stored, never transcoded
+SOURCE_FORMAT = "mp3"
+
+OUTPUT_FORMATS = {
+    "opus": OutputFormat("opus", ".ogg", "ogg", "libopus", "audio/ogg; codecs=opus"),
+    "webm": OutputFormat("webm", ".webm", "webm", "libopus", "audio/webm; codecs=opus"),
+}
+
+# Names accepted in the ?format= parameter
+FORMAT_ALIASES = {"mp3": SOURCE_FORMAT, "mpeg": SOURCE_FORMAT, "opus": "opus", "ogg": "opus", "webm": "webm"}
+
+# Accept media types (without parameters) and the format each selects
+ACCEPT_FORMATS = {
+    "audio/mpeg": SOURCE_FORMAT,
+    "audio/mp3": SOURCE_FORMAT,
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "application/ogg": "opus",
+    "audio/webm": "webm",
+}
+
+
+def _encode(ffmpeg: str, source: str, target: str, output_format: OutputFormat, bitrate: str, timeout: float) -> int:
+    """
+    Encode one variant (runs in a pool process)
+
+    The result is written to a temporary name and renamed into place, so a
+    reader never sees a partial file. The .tmp suffix (as in write_file_atomic)
+    keeps the retention janitor off the file while it is being encoded.
+
+    Returns:
+        Size of the variant in bytes
+    """
+    temp = f"{target}.{uuid.uuid4().hex}.tmp"
+    command = [
+        ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source, "-vn",
+        "-c:a", output_format.codec, "-b:a", bitrate, "-application", "voip",
+        "-f", output_format.container, temp
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=timeout)
+        os.replace(temp, target)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    return os.path.getsize(target)
+
+
+class AudioTranscoder:
+    """Produces and caches per-format variants of MP3 replies"""
+
+    def __init__(
+        self,
+        output_dir: Path,
+        default_bitrate: str = "24k",
+        bitrates: Optional[List[str]] = None,
+        max_workers: int = 2,
+        timeout_seconds: float = 30
+    ):
+        """
+        Initialize the transcoder
+
+        The process pool is created on the first transcode, so startup does
+        not pay for spawning it.
+
+        Args:
+            output_dir: Directory holding the source clips and their variants
+            default_bitrate: Bitrate used when the client does not pick one
+            bitrates: Bitrates clients may pick (bounds the variants kept per clip)
+            max_workers: Transcodes running at once
+            timeout_seconds: Give up on an encode after this long
+        """
+        self.output_dir = Path(output_dir)
+        self.default_bitrate = default_bitrate
+        self.bitrates = list(dict.fromkeys([default_bitrate, *(bitrates or [])]))
+        self.max_workers = max(1, max_workers)
+        self.timeout_seconds = timeout_seconds
+
+        self.ffmpeg = shutil.which("ffmpeg")
+        if self.ffmpeg is None:
+            logger.warning("ffmpeg not found: replies are served as MP3 only")
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Concurrent requests for the same variant share one encode
+        self.singleflight = SingleFlight("transcode")
+
+        self.transcodes: Dict[str, int] = {name: 0 for name in OUTPUT_FORMATS}
+        self.variant_hits: Dict[str, int] = {name: 0 for name in OUTPUT_FORMATS}
+        self.failures = 0
+        self.transcode_seconds_total = 0.0
+
+    @property
+    def available(self) -> bool:
+        """True if variants can be produced"""
+        return self.ffmpeg is not None
+
+    @staticmethod
+    def resolve_format(name: str) -> Optional[str]:
+        """Map a ?format= value to a format name, or None if it is not supported"""
+        return FORMAT_ALIASES.get(name.strip().lower())
+
+    def is_valid_bitrate(self, bitrate: str) -> bool:
+        """Return True if clients may request this bitrate"""
+        return bitrate in self.bitrates
+
+    def negotiate(self, accept: Optional[str]) -> str:
+        """
+        Pick a format from an Accept header
+
+        Only media types naming a format explicitly select a variant;
+        wildcards keep the stored MP3.
+
+        Args:
+            accept: Value of the Accept header (or None)
+
+        Returns:
+            The format name to serve
+        """
+        if not self.available:
+            return SOURCE_FORMAT
+        for media_range, quality in parse_accept(accept):
+            if quality <= 0:
+                continue
+            if media_range in ACCEPT_FORMATS:
+                return ACCEPT_FORMATS[media_range]
+        return SOURCE_FORMAT
+
+    def variant_filename(self, filename: str, format_name: str, bitrate: str) -> str:
+        """Name a variant is stored under, e.g. tts_<key>.24k.ogg"""
+        return f"{Path(filename).stem}.{bitrate}{OUTPUT_FORMATS[format_name].suffix}"
+
+    async def get_variant(self, filename: str, format_name: str, bitrate: str) -> Optional[str]:
+        """
+        Return the name of a variant, transcoding it if needed
+
+        A variant older than its source is produced again.
+
+        Args:
+            filename: Name of the source MP3 in the output directory
+            format_name: One of OUTPUT_FORMATS
+            bitrate: Target bitrate, e.g. "24k"
+
+        Returns:
+            The variant's filename, or None if it could not be produced
+        """
+        if not self.available:
+            return None
+
+        variant = self.variant_filename(filename, format_name, bitrate)
+        source_path = self.output_dir / filename
+        variant_path = self.output_dir / variant
+
+        if await asyncio.to_thread(self._is_current, source_path, variant_path):
+            self.variant_hits[format_name] += 1
+            return variant
+
+        try:
+            await self.singleflight.do(
+                variant,
+                lambda: self._transcode(source_path, variant_path, format_name, bitrate)
+            )
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Transcoding {filename} to {format_name} ({bitrate}) failed: {str(e)}")
+            return None
+        return variant
+
+    async def _transcode(self, source_path: Path, variant_path: Path, format_name: str, bitrate: str) -> int:
+        """Encode a variant in the process pool"""
+        started = time.perf_counter()
+        size = await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(),
+            _encode,
+            self.ffmpeg,
+            str(source_path),
+            str(variant_path),
+            OUTPUT_FORMATS[format_name],
+            bitrate,
+            self.timeout_seconds
+        )
+        elapsed = time.perf_counter() - started
+        self.transcodes[format_name] += 1
+        self.transcode_seconds_total += elapsed
+        logger.info(f"Transcoded {source_path.name} to {variant_path.name} ({size} bytes, {elapsed * 1000:.0f} ms)")
+        return size
+
+    @staticmethod
+    def _is_current(source_path: Path, variant_path: Path) -> bool:
+        """True if the variant exists and is not older than its source (blocking)"""
+        try:
+            return variant_path.stat().st_mtime_ns >= source_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use"""
+        if self._pool is None:
+            # Spawned, not forked: the server process runs threads and an event loop
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def shutdown(self):
+        """Stop the process pool, abandoning queued transcodes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        """Return transcoding counters"""
+        return {
+            "available": self.available,
+            "formats": [SOURCE_FORMAT, *OUTPUT_FORMATS],
+            "default_bitrate": self.default_bitrate,
+            "bitrates": self.bitrates,
+            "transcodes": dict(self.transcodes),
+            "variant_hits": dict(self.variant_hits),
+            "failures": self.failures,
+            "transcode_seconds_total": round(self.transcode_seconds_total, 3),
+            "pool_started": self._pool is not None
+        }
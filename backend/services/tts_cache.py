@@ -0,0 +1,221 @@
+"""
+TTS Cache - Content-addressed on-disk store for synthesized audio
+Stores each MP3 once, keyed by a hash of the text and voice settings
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from utils.file_utils import InFlightFiles
+from utils.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """
+    LRU cache of MP3 files bounded by a total byte budget
+
+    lookup() and store() touch the filesystem (and store() may evict):
+    call them from a worker thread, not the event loop.
+    """
+
+    FILE_PREFIX = "tts_"
+    FILE_SUFFIX = ".mp3"
+
+    def __init__(self, cache_dir: Path, max_bytes: int, in_flight: Optional[InFlightFiles] = None):
+        """
+        Initialize the cache and index files already on disk
+
+        Args:
+            cache_dir: Directory holding the cached MP3 files
+            max_bytes: Total size budget before LRU eviction kicks in
+            in_flight: Registry of files requests are using; eviction skips them
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.in_flight = in_flight
+
+        # filename -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load_existing()
+        logger.info(
+            f"TTS cache initialized: {len(self._entries)} files, "
+            f"{self._total_bytes} bytes (budget {self.max_bytes})"
+        )
+
+    @staticmethod
+    def make_key(text: str, language: str, slow: bool = False, tld: str = "com") -> str:
+        """
+        Build the content address for a synthesis request
+
+        Args:
+            text: Text to synthesize
+            language: Language code
+            slow: gTTS slow-speech flag
+            tld: gTTS top-level domain (selects the regional voice)
+
+        Returns:
+            Hex digest identifying the audio
+        """
+        material = "\x00".join([normalize_text(text), language, tld, str(bool(slow))])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def filename_for(self, key: str) -> str:
+        """Return the cache filename for a key"""
+        return f"{self.FILE_PREFIX}{key}{self.FILE_SUFFIX}"
+
+    def path_for(self, key: str) -> Path:
+        """Return the cache path for a key"""
+        return self.cache_dir / self.filename_for(key)
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """
+        Look up cached audio and mark it as recently used
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Path to the cached MP3 or None on a miss
+        """
+        filename = self.filename_for(key)
+        path = self.cache_dir / filename
+
+        with self._lock:
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                self._forget(filename)
+                self.misses += 1
+                return None
+
+            if filename not in self._entries:
+                # Written by another process sharing the directory
+                self._entries[filename] = size
+                self._total_bytes += size
+            self._entries.move_to_end(filename)
+            self.hits += 1
+
+        # Persist recency so LRU order survives restarts
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return path
+
+    def store(self, key: str) -> None:
+        """
+        Register a freshly written file and evict to stay within budget
+
+        Args:
+            key: Cache key whose file was just written to path_for(key)
+        """
+        filename = self.filename_for(key)
+        try:
+            size = self.path_for(key).stat().st_size
+        except FileNotFoundError:
+            return
+
+        with self._lock:
+            self._forget(filename)
+            self._entries[filename] = size
+            self._total_bytes += size
+        self._evict()
+
+    def discard(self, filename: str) -> None:
+        """
+        Forget a file that was deleted outside the cache (e.g. by the janitor)
+
+        Args:
+            filename: Name of the deleted file
+        """
+        with self._lock:
+            self._forget(filename)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _load_existing(self):
+        """Index files left over from previous runs, oldest first"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.cache_dir.glob(f"{self.FILE_PREFIX}*{self.FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, filename, size in sorted(files):
+            self._entries[filename] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    def _forget(self, filename: str):
+        """Drop an index entry (caller holds the lock)"""
+        size = self._entries.pop(filename, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """
+        Remove least recently used files until within budget
+
+        Files a request is still using (e.g. members of a batch archive) are
+        passed over and stay at the old end of the index, so they go first
+        once released. The files are checked and deleted outside the lock.
+        """
+        held: Set[str] = set()
+        while True:
+            with self._lock:
+                victims: List[Tuple[str, int]] = []
+                for filename in list(self._entries):
+                    if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                        break
+                    if filename in held:
+                        continue
+                    size = self._entries.pop(filename)
+                    self._total_bytes -= size
+                    victims.append((filename, size))
+            if not victims:
+                return
+
+            for filename, size in victims:
+                path = self.cache_dir / filename
+                if self.in_flight is not None and self.in_flight.is_held(path):
+                    held.add(filename)
+                    with self._lock:
+                        if filename not in self._entries:
+                            self._entries[filename] = size
+                            self._entries.move_to_end(filename, last=False)
+                            self._total_bytes += size
+                    continue
+                try:
+                    path.unlink()
+                    logger.info(f"Evicted cached audio: {filename} ({size} bytes)")
+                except FileNotFoundError:
+                    pass
@@ -3,10 +3,21 @@ Text-to-Speech Service using Google TTS
 Converts Hindi text to speech audio
 """
 
-from gtts import gTTS
 import logging
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+from services.audio_store import AudioStore
+from services.backends import Synthesizer
+from services.singleflight import SingleFlight
+from services.tts_cache import TTSCache
+from utils.file_utils import write_file_atomic
+from utils.metrics import UPSTREAM_ERRORS, error_class
+from utils.mp3_utils import concat_mp3
+from utils.text_utils import split_for_tts
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +25,96 @@ logger = logging.getLogger(__name__)
 class TTSService:
     """Service for Text-to-Speech conversion"""
     
-    def __init__(self):
-        """Initialize TTS service"""
-        logger.info("TTS Service initialized")
+    def __init__(
+        self,
+        cache: TTSCache,
+        synthesizer: Synthesizer,
+        audio_store: Optional[AudioStore] = None,
+        slow: bool = False,
+        tld: str = "com",
+        segment_max_chars: int = 0,
+        max_concurrency: int = 8
+    ):
+        """
+        Initialize TTS service
+        
+        Args:
+            cache: Content-addressed store for synthesized audio
+            synthesizer: Speech synthesis backend (gTTS or a stand-in)
+            audio_store: Optional hot tier that keeps new clips in memory for serving
+            slow: Use gTTS slow speech
+            tld: gTTS top-level domain (selects the regional voice)
+            segment_max_chars: Split longer text at sentence and clause boundaries and
+                synthesize the segments concurrently (0 synthesizes text in one call)
+            max_concurrency: Synthesizer calls running at once (size of the TTS thread pool)
+        """
+        self.cache = cache
+        self.synthesizer = synthesizer
+        self.audio_store = audio_store
+        self.slow = slow
+        self.tld = tld
+        self.segment_max_chars = segment_max_chars
+        
+        # Dedicated pool so TTS fan-out cannot exhaust the default executor
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="tts")
+        
+        # Identical concurrent syntheses share one gTTS request
+        self.singleflight = SingleFlight("tts")
+        
+        self.segmented_syntheses = 0
+        self.segments_synthesized = 0
+        self.segment_cache_hits = 0
+        logger.info(
+            f"TTS Service initialized (segments up to {segment_max_chars or 'unlimited'} chars, "
+            f"{max_concurrency} concurrent calls)"
+        )
+    
+    async def synthesize(self, text: str, language: str = 'hi') -> Optional[Path]:
+        """
+        Convert text to speech, reusing cached audio when available
+        
+        Args:
+            text: Hindi text to convert
+            language: Language code (default: 'hi' for Hindi)
+            
+        Returns:
+            Path to the MP3 file or None if synthesis failed
+        """
+        if not text or not text.strip():
+            logger.error("Empty text provided")
+            return None
+        
+        key = self.cache.make_key(text, language, slow=self.slow, tld=self.tld)
+        cached_path = await asyncio.to_thread(self.cache.lookup, key)
+        if cached_path:
+            logger.info(f"TTS cache hit: {cached_path.name}")
+            return cached_path
+        
+        return await self.singleflight.do(key, lambda: self._synthesize(text, language, key))
+    
+    async def _synthesize(self, text: str, language: str, key: str) -> Optional[Path]:
+        """Synthesize into the cache under the given key"""
+        try:
+            audio_data = await self._synthesize_audio(text, language)
+        except Exception as e:
+            logger.error(f"TTS error: {str(e)}")
+            UPSTREAM_ERRORS.inc(stage="tts", error_class=error_class(e))
+            return None
+        
+        if not audio_data:
+            logger.error("TTS returned no audio")
+            return None
+        
+        # Atomic write so concurrent readers never see a partial file
+        output_path = self.cache.path_for(key)
+        mtime_ns = await asyncio.to_thread(write_file_atomic, output_path, audio_data)
+        await asyncio.to_thread(self.cache.store, key)
+        logger.info(f"Audio saved: {output_path}")
+        
+        if self.audio_store is not None:
+            self.audio_store.put(output_path.name, audio_data, mtime_ns)
+        
+        return output_path
     
     async def text_to_speech(self, text: str, output_path: str, language: str = 'hi') -> bool:
         """
@@ -35,11 +133,9 @@ class TTSService:
                 logger.error("Empty text provided")
                 return False
             
-            # Create TTS object
-            tts = gTTS(text=text, lang=language, slow=False)
-            
-            # Save audio file
-            await asyncio.to_thread(tts.save, output_path)
+            # Synthesize and save audio file
+            audio_data = await self._synthesize_audio(text, language)
+            await asyncio.to_thread(Path(output_path).write_bytes, audio_data)
             
             # Verify file creation
             if Path(output_path).exists():
@@ -52,3 +148,62 @@ class TTSService:
         except Exception as e:
             logger.error(f"TTS error: {str(e)}")
             return False
+    
+    def stats(self) -> dict:
+        """Return segmented synthesis counters"""
+        return {
+            "segment_max_chars": self.segment_max_chars,
+            "segmented_syntheses": self.segmented_syntheses,
+            "segments_synthesized": self.segments_synthesized,
+            "segment_cache_hits": self.segment_cache_hits,
+            "connections": self.synthesizer.connection_stats(),
+        }
+    
+    async def _synthesize_audio(self, text: str, language: str) -> bytes:
+        """
+        Synthesize text into MP3 bytes
+        
+        Long text is split into segments that are synthesized concurrently and
+        joined frame by frame, so it takes about as long as its slowest segment.
+        
+        Raises:
+            Exception: Whatever the synthesizer raised for the text or any segment
+        """
+        segments = split_for_tts(text, self.segment_max_chars) if self.segment_max_chars else []
+        if len(segments) <= 1:
+            return await self._call_synthesizer(text, language)
+        
+        self.segmented_syntheses += 1
+        parts = await asyncio.gather(*(self._segment_audio(segment, language) for segment in segments))
+        return concat_mp3(parts)
+    
+    async def _segment_audio(self, text: str, language: str) -> bytes:
+        """Audio for one segment, cached under its own key so other replies can reuse it"""
+        key = self.cache.make_key(text, language, slow=self.slow, tld=self.tld)
+        cached_path = await asyncio.to_thread(self.cache.lookup, key)
+        if cached_path:
+            try:
+                audio_data = await asyncio.to_thread(cached_path.read_bytes)
+                self.segment_cache_hits += 1
+                return audio_data
+            except FileNotFoundError:
+                # Evicted since the lookup
+                pass
+        return await self.singleflight.do(f"segment:{key}", lambda: self._synthesize_segment(text, language, key))
+    
+    async def _synthesize_segment(self, text: str, language: str, key: str) -> bytes:
+        audio_data = await self._call_synthesizer(text, language)
+        if not audio_data:
+            raise RuntimeError(f"TTS returned no audio for segment: {text[:40]}")
+        await asyncio.to_thread(write_file_atomic, self.cache.path_for(key), audio_data)
+        await asyncio.to_thread(self.cache.store, key)
+        self.segments_synthesized += 1
+        return audio_data
+    
+    async def _call_synthesizer(self, text: str, language: str) -> bytes:
+        """Run the blocking synthesizer on the TTS thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(self.synthesizer.synthesize, text, language, self.slow, self.tld)
+        )
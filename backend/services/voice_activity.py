@@ -0,0 +1,245 @@
+"""
+Voice Activity Detection - Split a live PCM stream at pauses
+Energy-based detection against an adaptive noise floor: short pauses end a
+segment (which can be transcribed right away), a longer one ends the turn
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+from utils.pcm_utils import SAMPLE_WIDTH, frame_dbfs
+
+logger = logging.getLogger(__name__)
+
+# Event kinds
+SPEECH_START = "speech_start"
+SEGMENT = "segment"
+END_OF_TURN = "end_of_turn"
+
+# The noise floor follows quieter frames at once and louder ones over this many seconds,
+# so steady background noise raises the threshold but a long utterance does not
+NOISE_FLOOR_RISE_SECONDS = 10.0
+
+
+@dataclass
+class SpeechEvent:
+    """
+    Something the segmenter found in the stream
+
+    Attributes:
+        kind: SPEECH_START, SEGMENT or END_OF_TURN
+        pcm: The segment's audio, with a little padding either side (SEGMENT only)
+        start_ms: Stream time the speech started at
+        end_ms: Stream time the speech ended at (SEGMENT and END_OF_TURN)
+    """
+    kind: str
+    pcm: bytes = b""
+    start_ms: float = 0.0
+    end_ms: float = 0.0
+
+
+class SpeechSegmenter:
+    """Incremental segmenter for one 16-bit mono PCM stream"""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        threshold_dbfs: float = -45.0,
+        noise_margin_db: float = 10.0,
+        segment_silence_ms: float = 300,
+        end_of_turn_ms: float = 700,
+        min_speech_ms: float = 200,
+        max_segment_seconds: float = 10,
+        padding_ms: float = 200
+    ):
+        """
+        Initialize the segmenter
+
+        Args:
+            sample_rate: Samples per second of the stream
+            frame_ms: Analysis frame length
+            threshold_dbfs: Frames below this level are never speech
+            noise_margin_db: Frames must also be this far above the noise floor
+            segment_silence_ms: Pause that closes a segment
+            end_of_turn_ms: Pause after the last segment that ends the turn
+            min_speech_ms: Voiced audio a segment needs; shorter bursts are dropped as noise
+            max_segment_seconds: Segments are cut at this length even without a pause
+            padding_ms: Audio kept before the onset and after the end of each segment
+        """
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.threshold_dbfs = threshold_dbfs
+        self.noise_margin_db = noise_margin_db
+
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.segment_silence_frames = max(1, round(segment_silence_ms / frame_ms))
+        self.end_of_turn_frames = max(self.segment_silence_frames, round(end_of_turn_ms / frame_ms))
+        self.min_speech_frames = max(1, round(min_speech_ms / frame_ms))
+        self.max_segment_frames = max(self.min_speech_frames, round(max_segment_seconds * 1000 / frame_ms))
+        self.padding_frames = max(0, round(padding_ms / frame_ms))
+        self._noise_rise = min(1.0, frame_ms / 1000 / NOISE_FLOOR_RISE_SECONDS)
+
+        self._pending = bytearray()
+        self._frames = 0
+        self._noise_dbfs = threshold_dbfs - noise_margin_db
+        self._pre_roll: Deque[bytes] = deque(maxlen=self.padding_frames or 1)
+
+        # Open segment: its frames (with pre-roll), first frame index, onset, last voiced frame, voiced frame count
+        self._segment: Optional[List[bytes]] = None
+        self._segment_start = 0
+        self._onset = 0
+        self._last_voiced = 0
+        self._voiced = 0
+
+        # Turn: open once speech has been confirmed, until the long pause
+        self._in_turn = False
+        self._turn_start = 0
+        self._turn_last_voiced = 0
+
+        self.segments = 0
+        self.discarded = 0
+        self.turns = 0
+
+    @property
+    def in_turn(self) -> bool:
+        """True while the speaker has an unfinished turn"""
+        return self._in_turn
+
+    @property
+    def stream_ms(self) -> float:
+        """Stream time analysed so far"""
+        return self._frames * self.frame_ms
+
+    @property
+    def noise_dbfs(self) -> float:
+        """Current noise floor estimate"""
+        return self._noise_dbfs
+
+    def feed(self, pcm: bytes) -> List[SpeechEvent]:
+        """
+        Add audio and return what it completed
+
+        Args:
+            pcm: 16-bit little-endian mono samples, any length
+
+        Returns:
+            Events in stream order
+        """
+        self._pending += pcm
+        events = []
+        offset = 0
+        while len(self._pending) - offset >= self.frame_bytes:
+            self._process_frame(bytes(self._pending[offset:offset + self.frame_bytes]), events)
+            offset += self.frame_bytes
+        del self._pending[:offset]
+        return events
+
+    def flush(self) -> List[SpeechEvent]:
+        """
+        End the turn now (the client says the speaker has stopped)
+
+        Returns:
+            The open segment, if it holds enough speech, and END_OF_TURN if a turn was open
+        """
+        events = []
+        if self._segment is not None:
+            self._close_segment(events)
+        if self._in_turn:
+            self._end_turn(events)
+        self._pending.clear()
+        return events
+
+    def _process_frame(self, frame: bytes, events: List[SpeechEvent]):
+        """Classify one frame and advance the state machine"""
+        index = self._frames
+        self._frames += 1
+
+        level = frame_dbfs(frame)
+        voiced = level > max(self.threshold_dbfs, self._noise_dbfs + self.noise_margin_db)
+        if level < self._noise_dbfs:
+            self._noise_dbfs = level
+        elif not voiced:
+            self._noise_dbfs += (level - self._noise_dbfs) * self._noise_rise
+
+        if self._segment is None:
+            if voiced:
+                self._segment = list(self._pre_roll) + [frame]
+                self._segment_start = index - len(self._pre_roll)
+                self._onset = index
+                self._last_voiced = index
+                self._voiced = 1
+                self._pre_roll.clear()
+            elif self.padding_frames:
+                self._pre_roll.append(frame)
+        else:
+            self._segment.append(frame)
+            if voiced:
+                self._last_voiced = index
+                self._voiced += 1
+            silence = index - self._last_voiced
+            if silence >= self.segment_silence_frames or len(self._segment) >= self.max_segment_frames:
+                self._close_segment(events)
+
+        if self._segment is not None and not self._in_turn and self._voiced >= self.min_speech_frames:
+            self._start_turn(events)
+
+        if self._segment is not None and self._in_turn:
+            self._turn_last_voiced = self._last_voiced
+        elif self._in_turn and index - self._turn_last_voiced >= self.end_of_turn_frames:
+            self._end_turn(events)
+
+    def _close_segment(self, events: List[SpeechEvent]):
+        """Emit the open segment, or drop it if it is too short to be speech"""
+        frames = self._segment
+        self._segment = None
+        if self._voiced < self.min_speech_frames:
+            self.discarded += 1
+            return
+
+        if not self._in_turn:
+            # Cut at max length on the very frame that confirmed the speech
+            self._start_turn(events)
+
+        # Keep only padding_frames of the trailing silence
+        keep = min(len(frames), self._last_voiced - self._segment_start + 1 + self.padding_frames)
+        self.segments += 1
+        self._turn_last_voiced = self._last_voiced
+        events.append(SpeechEvent(
+            SEGMENT,
+            pcm=b"".join(frames[:keep]),
+            start_ms=self._ms(self._onset),
+            end_ms=self._ms(self._last_voiced + 1)
+        ))
+
+    def _start_turn(self, events: List[SpeechEvent]):
+        """Open a turn at the current segment's onset"""
+        self._in_turn = True
+        self._turn_start = self._onset
+        self.turns += 1
+        events.append(SpeechEvent(SPEECH_START, start_ms=self._ms(self._onset)))
+
+    def _end_turn(self, events: List[SpeechEvent]):
+        """Emit END_OF_TURN for the open turn"""
+        self._in_turn = False
+        events.append(SpeechEvent(
+            END_OF_TURN,
+            start_ms=self._ms(self._turn_start),
+            end_ms=self._ms(self._turn_last_voiced + 1)
+        ))
+
+    def _ms(self, frame_index: int) -> float:
+        """Stream time at the start of a frame"""
+        return frame_index * self.frame_ms
+
+    def stats(self) -> dict:
+        """Return segmentation counters and the noise floor"""
+        return {
+            "stream_ms": self.stream_ms,
+            "segments": self.segments,
+            "discarded": self.discarded,
+            "turns": self.turns,
+            "noise_dbfs": round(self._noise_dbfs, 1),
+        }
@@ -0,0 +1,323 @@
+"""
+Voice Session - One full-duplex conversation over a WebSocket
+Microphone PCM is segmented at pauses as it arrives; each segment is
+transcribed while the user is still talking, so at the end of the turn only
+the last segment is outstanding before the reply is generated and streamed back
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+
+from services.audio_store import AudioStore
+from services.pipeline import AudioPipeline, PipelineError
+from services.resilience import UpstreamError
+from services.voice_activity import SpeechSegmenter, SpeechEvent, SPEECH_START, SEGMENT, END_OF_TURN
+from utils.metrics import VOICE_REPLY_SECONDS
+from utils.pcm_utils import SAMPLE_WIDTH, pcm_to_wav
+
+logger = logging.getLogger(__name__)
+
+# Arrival times kept for mapping stream time to wall-clock time (a few minutes of typical chunks)
+MAX_ARRIVALS = 10000
+
+
+class VoiceSession:
+    """
+    Drives the segmenter and the pipeline for one connection
+
+    Turns are numbered from 1. When barge-in is enabled, speech that starts
+    while a reply is being prepared cancels it: if no reply audio was sent
+    yet, the earlier turn's segments are carried into the new turn (the
+    speaker had only paused), otherwise the client is told the reply was
+    interrupted.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        pipeline: AudioPipeline,
+        audio_store: AudioStore,
+        segmenter: SpeechSegmenter,
+        client_id: str = "default",
+        use_cache: bool = True,
+        send_audio: bool = True,
+        barge_in: bool = True
+    ):
+        """
+        Initialize the session
+
+        Args:
+            websocket: Accepted connection (send_text and send_bytes are used)
+            pipeline: Transcription, generation and synthesis
+            audio_store: Hot tier the reply audio is read from when possible
+            segmenter: VAD state for this stream
+            client_id: Caller identity for fair scheduling
+            use_cache: Serve memoized responses when available
+            send_audio: Send reply audio as binary messages (otherwise only URLs)
+            barge_in: Let new speech cancel a reply in progress
+        """
+        self.websocket = websocket
+        self.pipeline = pipeline
+        self.audio_store = audio_store
+        self.segmenter = segmenter
+        self.client_id = client_id
+        self.use_cache = use_cache
+        self.send_audio = send_audio
+        self.barge_in = barge_in
+
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+
+        self._turn = 0
+        self._segments: List[asyncio.Task] = []
+        self._tasks: List[asyncio.Task] = []
+
+        self._reply: Optional[asyncio.Task] = None
+        self._reply_turn = 0
+        self._reply_segments: List[asyncio.Task] = []
+        self._reply_audio_sent = False
+
+        # (stream ms received, arrival time) per chunk, to date the end of speech
+        self._received_ms = 0.0
+        self._arrivals: Deque[Tuple[float, float]] = deque(maxlen=MAX_ARRIVALS)
+
+        self.replies = 0
+        self.interrupted = 0
+
+    async def start(self):
+        """Tell the client the stream parameters"""
+        await self.send({
+            "type": "ready",
+            "sample_rate": self.segmenter.sample_rate,
+            "encoding": "pcm_s16le",
+            "channels": 1,
+            "end_of_turn_ms": self.segmenter.end_of_turn_frames * self.segmenter.frame_ms,
+        })
+
+    async def feed(self, pcm: bytes):
+        """
+        Process a chunk of microphone audio
+
+        Args:
+            pcm: 16-bit little-endian mono samples
+        """
+        self._received_ms += len(pcm) / SAMPLE_WIDTH / self.segmenter.sample_rate * 1000
+        self._arrivals.append((self._received_ms, time.perf_counter()))
+        for event in self.segmenter.feed(pcm):
+            await self._handle(event)
+
+    async def end_turn(self):
+        """The client says the speaker has stopped: end the turn without waiting for the pause"""
+        for event in self.segmenter.flush():
+            await self._handle(event)
+
+    async def cancel_reply(self):
+        """Stop the reply in progress at the client's request"""
+        if self._reply is not None and not self._reply.done():
+            self._reply.cancel()
+            self.interrupted += 1
+            await self.send({"type": "interrupted", "turn": self._reply_turn})
+
+    async def close(self):
+        """Stop all outstanding work"""
+        self._closed = True
+        tasks = [*self._tasks, *([self._reply] if self._reply is not None else [])]
+        for task in tasks:
+            task.cancel()
+        # Collect the outcomes so failed transcriptions are not reported as unretrieved
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle(self, event: SpeechEvent):
+        """React to one segmenter event"""
+        if event.kind == SPEECH_START:
+            if self.barge_in and self._reply is not None and not self._reply.done():
+                self._reply.cancel()
+                if self._reply_audio_sent:
+                    self.interrupted += 1
+                    await self.send({"type": "interrupted", "turn": self._reply_turn})
+                else:
+                    # The speaker only paused: answer the whole utterance once they finish
+                    self._segments = self._reply_segments + self._segments
+            self._turn += 1
+            await self.send({"type": "speech_start", "turn": self._turn, "start_ms": event.start_ms})
+
+        elif event.kind == SEGMENT:
+            index = len(self._segments)
+            task = asyncio.create_task(self._transcribe_segment(self._turn, index, event))
+            self._segments.append(task)
+            self._tasks.append(task)
+
+        elif event.kind == END_OF_TURN:
+            ended_at = time.perf_counter()
+            segments, self._segments = self._segments, []
+            if not segments:
+                return
+            self._tasks = [task for task in self._tasks if not task.done()]
+            self._reply_turn = self._turn
+            self._reply_segments = segments
+            self._reply_audio_sent = False
+            self._reply = asyncio.create_task(
+                self._respond(self._turn, segments, event.end_ms, self._spoken_at(event.end_ms), ended_at)
+            )
+
+    async def _transcribe_segment(self, turn: int, index: int, event: SpeechEvent) -> Optional[str]:
+        """Transcribe one segment and report it as a partial transcript"""
+        wav = pcm_to_wav(event.pcm, self.segmenter.sample_rate)
+        text = await self.pipeline.gemini_service.transcribe_audio(
+            wav, mime_type="audio/wav", client_id=self.client_id
+        )
+        await self.send({
+            "type": "partial",
+            "turn": turn,
+            "segment": index,
+            "text": text or "",
+            "start_ms": event.start_ms,
+            "end_ms": event.end_ms,
+        })
+        return text
+
+    async def _respond(self, turn: int, segments: List[asyncio.Task], end_ms: float, spoken_at: float, ended_at: float):
+        """
+        Wait for the turn's transcripts, then stream the reply
+
+        Args:
+            turn: Turn number
+            segments: Transcription tasks in stream order
+            end_ms: Stream time the speech ended at
+            spoken_at: Wall-clock time the end of speech arrived
+            ended_at: Wall-clock time the end of the turn was detected
+        """
+        # asyncio.wait (unlike gather) leaves the segments running if this reply is cancelled
+        await asyncio.wait(segments)
+        failures = [task.exception() for task in segments if task.exception() is not None]
+        if failures:
+            failure = failures[0]
+            logger.error(f"Voice transcription failed: {str(failure)}")
+            await self._send_error(turn, failure, "transcribe audio")
+            return
+
+        transcript = " ".join(task.result() for task in segments if task.result())
+        transcribed_at = time.perf_counter()
+        if not transcript:
+            await self.send({
+                "type": "error",
+                "turn": turn,
+                "status_code": 422,
+                "detail": "Failed to transcribe audio. Please ensure the audio is clear and in Hindi."
+            })
+            return
+        await self.send({"type": "transcript", "turn": turn, "text": transcript, "end_ms": end_ms})
+
+        sentences = []
+        first_audio_at = None
+        replies = self.pipeline.stream_reply(transcript, use_cache=self.use_cache, client_id=self.client_id)
+        try:
+            async for sentence, audio_path in replies:
+                if not audio_path:
+                    await self.send({"type": "error", "turn": turn, "detail": "Failed to generate speech audio"})
+                    return
+                audio = await self._load_audio(audio_path) if self.send_audio else None
+                await self.send({
+                    "type": "reply",
+                    "turn": turn,
+                    "index": len(sentences),
+                    "text": sentence,
+                    "audio_url": f"/api/audio/{audio_path.name}",
+                    "audio_bytes": len(audio) if audio else 0,
+                }, audio)
+                if first_audio_at is None:
+                    first_audio_at = time.perf_counter()
+                    self._reply_audio_sent = True
+                    VOICE_REPLY_SECONDS.observe(first_audio_at - spoken_at)
+                sentences.append(sentence)
+        except Exception as e:
+            logger.error(f"Error generating voice reply: {str(e)}")
+            await self._send_error(turn, e, "generate response")
+            return
+        finally:
+            await replies.aclose()
+
+        if not sentences:
+            await self.send({"type": "error", "turn": turn, "detail": "Failed to generate response"})
+            return
+
+        self.replies += 1
+        await self.send({
+            "type": "reply_done",
+            "turn": turn,
+            "response": " ".join(sentences),
+            "latency_ms": {
+                "end_of_speech_to_first_audio": _ms(first_audio_at - spoken_at),
+                "end_of_turn_detection": _ms(ended_at - spoken_at),
+                "transcript_wait": _ms(transcribed_at - ended_at),
+                "first_sentence": _ms(first_audio_at - transcribed_at),
+            },
+        })
+
+    async def _load_audio(self, audio_path: Path) -> Optional[bytes]:
+        """Read a reply clip from the hot tier or disk"""
+        blob = self.audio_store.get(audio_path.name)
+        if blob is not None:
+            return blob.data
+        try:
+            return await asyncio.to_thread(audio_path.read_bytes)
+        except OSError as e:
+            logger.error(f"Failed to read reply audio {audio_path.name}: {str(e)}")
+            return None
+
+    def _spoken_at(self, end_ms: float) -> float:
+        """Wall-clock time the chunk holding the given stream time arrived"""
+        # Turns end in stream order, so earlier chunks are no longer needed
+        while len(self._arrivals) > 1 and self._arrivals[0][0] < end_ms:
+            self._arrivals.popleft()
+        return self._arrivals[0][1] if self._arrivals else time.perf_counter()
+
+    async def _send_error(self, turn: int, error: Exception, action: str):
+        """Report a failed turn; upstream outages carry the status and a retry_after hint"""
+        event = {"type": "error", "turn": turn, "detail": f"Failed to {action}"}
+        if isinstance(error, UpstreamError):
+            event.update(
+                detail=PipelineError.from_upstream(error, action).detail,
+                status_code=error.status_code,
+                retry_after=max(1, math.ceil(error.retry_after or 1))
+            )
+        await self.send(event)
+
+    async def send(self, event: dict, audio: Optional[bytes] = None) -> bool:
+        """
+        Send an event, followed by its audio as a binary message
+
+        Returns:
+            True if sent, False once the client has gone away
+        """
+        if self._closed:
+            return False
+        try:
+            async with self._send_lock:
+                await self.websocket.send_text(json.dumps(event, ensure_ascii=False))
+                if audio:
+                    await self.websocket.send_bytes(audio)
+            return True
+        except Exception as e:
+            logger.debug(f"Voice client went away: {str(e)}")
+            self._closed = True
+            return False
+
+    def stats(self) -> dict:
+        """Return turn and reply counters with the segmenter's"""
+        return {
+            "turns": self._turn,
+            "replies": self.replies,
+            "interrupted": self.interrupted,
+            **self.segmenter.stats(),
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
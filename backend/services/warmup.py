@@ -0,0 +1,55 @@
+"""
+Startup Warmup - Prepare backends and caches in the background after startup
+Loads SDKs, opens upstream connections and synthesizes common phrases, so
+the first requests after a (re)start do not pay for it
+"""
+
+import asyncio
+import logging
+import time
+from typing import List
+
+from services.backends import BackendSet
+from services.tts_service import TTSService
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(backends: BackendSet, tts_service: TTSService, phrases: List[str]) -> dict:
+    """
+    Warm up the backends and the TTS cache
+
+    Failures are logged and reported, never raised: warmup is an optimization
+    and the server is already serving requests while it runs.
+
+    Args:
+        backends: Backends to load and connect
+        tts_service: Service whose cache receives the phrases
+        phrases: Texts synthesized ahead of time (already cached ones cost nothing)
+
+    Returns:
+        Report with the time spent per step and the number of phrases cached
+    """
+    report = {"backends_ms": None, "phrases": len(phrases), "phrases_cached": 0, "phrases_ms": None, "errors": []}
+
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(backends.warm_up)
+    except Exception as e:
+        logger.warning(f"Backend warmup failed: {str(e)}")
+        report["errors"].append(f"backends: {str(e)}")
+    report["backends_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    started = time.perf_counter()
+    for phrase in phrases:
+        if await tts_service.synthesize(phrase):
+            report["phrases_cached"] += 1
+        else:
+            report["errors"].append(f"phrase: {phrase[:40]}")
+    report["phrases_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    logger.info(
+        f"Warmup finished: backends in {report['backends_ms']:.0f} ms, "
+        f"{report['phrases_cached']}/{len(phrases)} phrases cached in {report['phrases_ms']:.0f} ms"
+    )
+    return report
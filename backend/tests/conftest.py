@@ -0,0 +1,10 @@
+"""
+Shared test setup: make the backend modules importable when pytest runs from the repository root
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
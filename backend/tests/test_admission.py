@@ -0,0 +1,177 @@
+"""
+Tests for admission control: slots, the FIFO queue, rejection and wait estimates
+"""
+
+import asyncio
+import json
+
+from middleware.admission import AdmissionControlMiddleware, AdmissionController
+
+
+async def settle():
+    """Let woken waiters run (asyncio.wait_for adds a few loop iterations)"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_limit_then_queues_in_order():
+    async def run():
+        controller = AdmissionController(max_in_flight=2, max_queue=4, max_queue_wait=5)
+        assert await controller.admit()
+        assert await controller.admit()
+
+        order = []
+
+        async def waiter(name):
+            assert await controller.admit()
+            order.append(name)
+
+        waiters = [asyncio.create_task(waiter(name)) for name in ("first", "second")]
+        await settle()
+        assert controller.queue_depth == 2
+        assert order == []
+
+        controller.release()
+        await settle()
+        assert order == ["first"]
+
+        controller.release()
+        await asyncio.gather(*waiters)
+        assert order == ["first", "second"]
+        # Slots were handed over, not freed
+        assert controller.stats()["in_flight"] == 2
+
+        controller.release()
+        controller.release()
+        return controller.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 4
+    assert stats["queued"] == 2
+
+
+def test_rejects_when_queue_full():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, max_queue_wait=5)
+        assert await controller.admit()
+        queued = asyncio.create_task(controller.admit())
+        await settle()
+
+        assert not await controller.admit()
+        controller.release()
+        assert await queued
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.rejected == 1
+
+
+def test_rejects_when_estimated_wait_too_long():
+    async def run():
+        controller = AdmissionController(
+            max_in_flight=2, max_queue=10, max_queue_wait=1.0, initial_service_seconds=0.8
+        )
+        await controller.admit()
+        await controller.admit()
+        # Positions 1 and 2 wait 0.4s and 0.8s; position 3 would wait 1.2s
+        queued = [asyncio.create_task(controller.admit()) for _ in range(2)]
+        await settle()
+        assert controller.estimated_wait(controller.queue_depth + 1) > controller.max_queue_wait
+
+        rejected = not await controller.admit()
+        retry_after = controller.retry_after()
+        for _ in range(4):
+            controller.release()
+        await asyncio.gather(*queued)
+        return rejected, retry_after
+
+    rejected, retry_after = asyncio.run(run())
+    assert rejected
+    assert retry_after == 2
+
+
+def test_queued_request_times_out():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, max_queue_wait=0.05, initial_service_seconds=0.01)
+        await controller.admit()
+        admitted = await controller.admit()
+        return controller, admitted
+
+    controller, admitted = asyncio.run(run())
+    assert not admitted
+    assert controller.timed_out == 1
+    assert controller.queue_depth == 0
+    # The timed-out waiter must not be handed the slot
+    controller.release()
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=2, max_queue_wait=5)
+        await controller.admit()
+        waiter = asyncio.create_task(controller.admit())
+        await settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.queue_depth == 0
+
+        controller.release()
+        return controller.stats()
+
+    assert asyncio.run(run())["in_flight"] == 0
+
+
+def test_release_refines_service_time():
+    controller = AdmissionController(max_in_flight=1, initial_service_seconds=1.0, smoothing=0.5)
+    controller._in_flight = 1
+    controller.release(service_seconds=3.0)
+    assert controller.service_seconds == 2.0
+    assert controller.estimated_wait(2) == 4.0
+
+
+def test_middleware_sheds_load_with_retry_after():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=0, max_queue_wait=5)
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def app(scope, receive, send):
+            started.set()
+            await finish.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        middleware = AdmissionControlMiddleware(app, controller, ["/api/process-audio"])
+
+        async def request(path, method="POST"):
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {"type": "http", "path": path, "method": method, "headers": []}
+            await middleware(scope, receive, send)
+            return messages
+
+        first = asyncio.create_task(request("/api/process-audio"))
+        await started.wait()
+        rejected = await request("/api/process-audio")
+
+        # Preflight and other paths are not counted
+        finish.set()
+        other = await request("/api/health", method="GET")
+        await first
+        return rejected, other, controller.stats()
+
+    rejected, other, stats = asyncio.run(run())
+    start, body = rejected
+    assert start["status"] == 503
+    assert dict(start["headers"])[b"retry-after"] == b"1"
+    assert json.loads(body["body"])["detail"] == "Server is busy. Please retry later."
+    assert other[0]["status"] == 200
+    assert stats["in_flight"] == 0
+    assert stats["rejected"] == 1
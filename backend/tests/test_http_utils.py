@@ -0,0 +1,68 @@
+"""
+Tests for Range and If-None-Match handling
+"""
+
+import pytest
+
+from utils.http_utils import RangeNotSatisfiableError, etag_matches, parse_range_header
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes= 10 - 20 ", (10, 20)),
+    ("bytes=999-999", (999, 999)),
+])
+def test_parse_range_header_single_range(header, expected):
+    assert parse_range_header(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",
+    "bytes=0-10,20-30",
+    "bytes=10",
+    "bytes=a-b",
+    "bytes=10-x",
+])
+def test_parse_range_header_falls_back_to_full_response(header):
+    assert parse_range_header(header, SIZE) is None
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-",
+    "bytes=5000-6000",
+    "bytes=20-10",
+    "bytes=-0",
+])
+def test_parse_range_header_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range_header(header, SIZE)
+
+
+def test_parse_range_header_empty_resource():
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range_header("bytes=0-", 0)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    (' * ', True),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz",W/"abc"', True),
+    ('"xyz"', False),
+    ('abc', False),
+    ('"ABC"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
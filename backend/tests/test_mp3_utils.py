@@ -0,0 +1,75 @@
+"""
+Tests for MP3 frame parsing and joining, using the fake TTS backend's frames
+"""
+
+from services.backends import FakeTTSBackend, FaultInjector, LatencyModel
+from utils.mp3_utils import concat_mp3, frame_length, split_frames, strip_id3
+
+FRAME = FakeTTSBackend.SILENT_FRAME
+
+
+def id3v2_tag(body: bytes = b"TIT2\x00\x00\x00\x05\x00\x00\x03abcd") -> bytes:
+    """An ID3v2.4 tag with a syncsafe size"""
+    size = len(body)
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00\x00" + syncsafe + body
+
+
+def id3v1_tag() -> bytes:
+    return b"TAG" + b"\x00" * 125
+
+
+def info_frame() -> bytes:
+    """A LAME-style Info header frame (mono MPEG-1 without CRC: tag after 17 bytes of side info)"""
+    frame = bytearray(FRAME)
+    frame[21:25] = b"Info"
+    return bytes(frame)
+
+
+def synthesize(text: str) -> bytes:
+    backend = FakeTTSBackend(LatencyModel(0), FaultInjector())
+    return backend.synthesize(text, "hi")
+
+
+def test_frame_length_of_fake_frame():
+    assert frame_length(FRAME) == len(FRAME) == 104
+
+
+def test_frame_length_rejects_non_headers():
+    assert frame_length(b"\x00\x00\x00\x00") is None
+    assert frame_length(b"\xff\xfb") is None
+    # Free-format bitrate (index 0) and reserved sample rate (index 3)
+    assert frame_length(b"\xff\xfb\x00\xc4") is None
+    assert frame_length(b"\xff\xfb\x1c\xc4") is None
+
+
+def test_strip_id3_removes_both_tags():
+    assert strip_id3(id3v2_tag() + FRAME * 2 + id3v1_tag()) == FRAME * 2
+    assert strip_id3(FRAME) == FRAME
+
+
+def test_split_frames_drops_info_frame_and_resyncs():
+    data = id3v2_tag() + info_frame() + FRAME + b"\x00\x01junk" + FRAME
+    assert split_frames(data) == [FRAME, FRAME]
+
+
+def test_split_frames_keeps_info_marker_after_first_frame():
+    assert split_frames(FRAME + info_frame()) == [FRAME, info_frame()]
+
+
+def test_concat_mp3_joins_synthesized_clips():
+    first, second = synthesize("नमस्ते"), synthesize("आप कैसे हैं?")
+    joined = concat_mp3([first, second])
+    assert joined == first + second
+    assert len(split_frames(joined)) == (len(first) + len(second)) // len(FRAME)
+
+
+def test_concat_mp3_drops_per_clip_tags_and_headers():
+    first = id3v2_tag() + info_frame() + FRAME * 3 + id3v1_tag()
+    second = id3v2_tag() + info_frame() + FRAME * 2
+    assert concat_mp3([first, second]) == FRAME * 5
+
+
+def test_concat_mp3_appends_unparsable_parts_unchanged():
+    assert concat_mp3([FRAME, b"not audio"]) == FRAME + b"not audio"
+    assert concat_mp3([]) == b""
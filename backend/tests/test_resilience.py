@@ -0,0 +1,234 @@
+"""
+Tests for error classification, retry backoff and circuit breaker state changes,
+and for GeminiService retries driven by the fake backend's fault injection
+"""
+
+import asyncio
+
+import pytest
+
+from services import resilience
+from services.backends import BackendError, FakeGeminiBackend, FaultInjector, LatencyModel
+from services.gemini_service import GeminiService
+from services.rate_limiter import RateLimitScheduler
+from services.resilience import (
+    CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, PERMANENT, RATE_LIMIT, TRANSIENT,
+    CircuitBreaker, CircuitOpenError, RetryPolicy, UpstreamError, classify_error, retry_after_hint
+)
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+@pytest.mark.parametrize("exc, kind", [
+    (BackendError("quota", 429, 2.0), RATE_LIMIT),
+    (BackendError("down", 500), TRANSIENT),
+    (BackendError("unavailable", 503), TRANSIENT),
+    (BackendError("bad request", 400), PERMANENT),
+    (TimeoutError("slow"), TRANSIENT),
+    (ConnectionResetError("reset"), TRANSIENT),
+    (ValueError("bug"), PERMANENT),
+])
+def test_classify_error(exc, kind):
+    assert classify_error(exc) == kind
+
+
+def test_retry_after_hint():
+    assert retry_after_hint(BackendError("quota", 429, 3)) == 3.0
+    assert retry_after_hint(Exception("429 Resource exhausted. Please retry in 37.5s.")) == 37.5
+    assert retry_after_hint(Exception("retry_delay { seconds: 12 }")) == 12.0
+    assert retry_after_hint(Exception("no hint")) is None
+
+
+def test_retry_policy_gives_up():
+    policy = RetryPolicy(max_attempts=3, max_retry_after=10.0)
+    assert policy.delay(1, PERMANENT) is None
+    assert policy.delay(3, TRANSIENT) is None
+    assert policy.delay(1, RATE_LIMIT, hint=11.0) is None
+
+
+def test_retry_policy_backoff_bounds(monkeypatch):
+    policy = RetryPolicy(max_attempts=10, base_delay=0.5, max_delay=2.0)
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    assert [policy.delay(attempt, TRANSIENT) for attempt in (1, 2, 3, 4)] == [0.5, 1.0, 2.0, 2.0]
+    # A hint is waited out in full, plus half the jittered backoff
+    assert policy.delay(1, RATE_LIMIT, hint=3.0) == 3.25
+
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: low)
+    assert policy.delay(4, TRANSIENT) == 0.0
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+    for _ in range(2):
+        breaker.check()
+        breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+    # A success resets the count
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.times_opened == 1
+    assert breaker.retry_after() == 30
+
+    clock.advance(10)
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.check()
+    assert raised.value.retry_after == pytest.approx(20)
+    assert raised.value.status_code == 503
+    assert breaker.rejected == 1
+
+
+def test_breaker_stays_open_for_longer_hint(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure(retry_after=60)
+    assert breaker.retry_after() == 60
+    clock.advance(45)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_breaker_half_open_probe_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.advance(30)
+
+    breaker.check()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+    breaker.check()
+
+
+def test_breaker_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.advance(30)
+
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.times_opened == 2
+    assert breaker.retry_after() == 30
+
+
+def test_breaker_abandoned_probe_expires(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.check()
+
+    clock.advance(30)
+    breaker.check()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+
+def make_service(faults: FaultInjector, max_attempts: int = 3, failure_threshold: int = 5) -> GeminiService:
+    """GeminiService on the fake backend with no latency, an unthrottled scheduler and no backoff"""
+    backend = FakeGeminiBackend(LatencyModel(0), LatencyModel(0), faults)
+    return GeminiService(
+        backend,
+        backend,
+        scheduler=RateLimitScheduler(requests_per_minute=60000, burst=100, max_in_flight=4),
+        retry_policy=RetryPolicy(max_attempts=max_attempts, base_delay=0, max_delay=0),
+        circuit_breaker=CircuitBreaker("gemini", failure_threshold=failure_threshold, reset_seconds=30)
+    )
+
+
+def fail_first(faults: FaultInjector, failures: int, status_code: int = 500):
+    """Make the injector fail the first calls, then defer to its configured rates"""
+    check = faults.check
+
+    def flaky(operation: str):
+        if faults.calls < failures:
+            faults.calls += 1
+            raise BackendError(f"Injected failure in {operation}", status_code)
+        check(operation)
+
+    faults.check = flaky
+
+
+def test_service_retries_transient_failure():
+    faults = FaultInjector()
+    fail_first(faults, 2)
+    service = make_service(faults)
+
+    response = asyncio.run(service.generate_response("नमस्ते", use_cache=False))
+
+    assert response
+    assert faults.calls == 3
+    assert service.retries == 2
+    assert service.circuit_breaker.state == CIRCUIT_CLOSED
+
+
+def test_service_reports_exhausted_rate_limit():
+    faults = FaultInjector(rate_limit_rate=1.0, retry_after=0.01)
+    service = make_service(faults, max_attempts=3)
+
+    with pytest.raises(UpstreamError) as raised:
+        asyncio.run(service.generate_response("नमस्ते", use_cache=False))
+
+    assert raised.value.status_code == 429
+    assert raised.value.retry_after == 0.01
+    assert faults.rate_limits == 3
+    assert service.retries == 2
+
+
+def test_service_does_not_retry_permanent_failure():
+    faults = FaultInjector()
+    fail_first(faults, 1, status_code=400)
+    service = make_service(faults, failure_threshold=1)
+
+    # Permanent failures are not UpstreamErrors: generate_response reports them as no response
+    assert asyncio.run(service.generate_response("नमस्ते", use_cache=False)) is None
+    assert faults.calls == 1
+    assert service.retries == 0
+    # The upstream answered, so the breaker stays closed
+    assert service.circuit_breaker.state == CIRCUIT_CLOSED
+
+
+def test_service_fails_fast_once_circuit_opens():
+    faults = FaultInjector(error_rate=1.0)
+    service = make_service(faults, max_attempts=2, failure_threshold=2)
+
+    async def run():
+        with pytest.raises(UpstreamError) as first:
+            await service.generate_response("नमस्ते", use_cache=False)
+        with pytest.raises(CircuitOpenError):
+            await service.generate_response("नमस्ते", use_cache=False)
+        return first.value
+
+    error = asyncio.run(run())
+
+    assert error.status_code == 503
+    assert error.retry_after == pytest.approx(30, abs=1)
+    assert service.circuit_breaker.state == CIRCUIT_OPEN
+    # The second request never reached the backend
+    assert faults.calls == 2
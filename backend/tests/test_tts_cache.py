@@ -0,0 +1,44 @@
+"""
+Tests for TTS cache eviction
+"""
+
+from services.tts_cache import TTSCache
+from utils.file_utils import InFlightFiles
+
+
+def add(cache: TTSCache, key: str, size: int = 100):
+    cache.path_for(key).write_bytes(b"\x00" * size)
+    cache.store(key)
+
+
+def names(cache: TTSCache) -> list:
+    return sorted(path.name for path in cache.cache_dir.iterdir())
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(tmp_path, max_bytes=250)
+    add(cache, "a")
+    add(cache, "b")
+    assert cache.lookup("a") is not None
+    add(cache, "c")
+
+    assert names(cache) == [cache.filename_for("a"), cache.filename_for("c")]
+    assert cache.lookup("b") is None
+
+
+def test_eviction_skips_files_in_use(tmp_path):
+    in_flight = InFlightFiles()
+    cache = TTSCache(tmp_path, max_bytes=250, in_flight=in_flight)
+    add(cache, "a")
+    in_flight.acquire(cache.path_for("a"))
+    add(cache, "b")
+    add(cache, "c")
+
+    # b goes instead of the held a, which stays first in line
+    assert names(cache) == [cache.filename_for("a"), cache.filename_for("c")]
+    add(cache, "d")
+    assert names(cache) == [cache.filename_for("a"), cache.filename_for("d")]
+
+    in_flight.release(cache.path_for("a"))
+    add(cache, "e")
+    assert names(cache) == [cache.filename_for("d"), cache.filename_for("e")]
@@ -0,0 +1,146 @@
+"""
+Tests for the speech segmenter on synthesized PCM
+"""
+
+import math
+import sys
+from array import array
+
+from services.voice_activity import END_OF_TURN, SEGMENT, SPEECH_START, SpeechSegmenter
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = SAMPLE_RATE * 20 // 1000 * 2
+
+
+def tone(ms: int, amplitude: int = 6000) -> bytes:
+    """A 200 Hz sine (about -18 dBFS at the default amplitude)"""
+    samples = array("h", (
+        int(amplitude * math.sin(2 * math.pi * 200 * n / SAMPLE_RATE))
+        for n in range(SAMPLE_RATE * ms // 1000)
+    ))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def silence(ms: int) -> bytes:
+    return bytes(SAMPLE_RATE * ms // 1000 * 2)
+
+
+def kinds(events) -> list:
+    return [event.kind for event in events]
+
+
+def test_silence_produces_nothing():
+    segmenter = SpeechSegmenter()
+    assert segmenter.feed(silence(2000)) == []
+    assert not segmenter.in_turn
+    assert segmenter.stream_ms == 2000
+
+
+def test_utterance_then_pause_ends_turn():
+    segmenter = SpeechSegmenter()
+    events = segmenter.feed(silence(300) + tone(1000) + silence(1000))
+
+    assert kinds(events) == [SPEECH_START, SEGMENT, END_OF_TURN]
+    start, segment, end = events
+    assert start.start_ms == 300
+    assert (segment.start_ms, segment.end_ms) == (300, 1300)
+    # 200 ms of padding either side of the voiced frames
+    assert len(segment.pcm) == (1000 + 400) // 20 * FRAME_BYTES
+    assert (end.start_ms, end.end_ms) == (300, 1300)
+    assert segmenter.stats()["turns"] == 1
+    assert not segmenter.in_turn
+
+
+def test_short_pause_splits_segments_within_one_turn():
+    segmenter = SpeechSegmenter()
+    events = segmenter.feed(tone(600) + silence(400) + tone(600) + silence(1000))
+
+    assert kinds(events) == [SPEECH_START, SEGMENT, SEGMENT, END_OF_TURN]
+    assert [(e.start_ms, e.end_ms) for e in events if e.kind == SEGMENT] == [(0, 600), (1000, 1600)]
+    assert events[-1].start_ms == 0
+    assert events[-1].end_ms == 1600
+
+
+def test_pause_between_segment_and_end_of_turn():
+    segmenter = SpeechSegmenter()
+    # The segment closes after 300 ms of silence but the turn stays open until 700 ms
+    events = segmenter.feed(tone(600) + silence(500))
+    assert kinds(events) == [SPEECH_START, SEGMENT]
+    assert segmenter.in_turn
+
+    assert kinds(segmenter.feed(silence(300))) == [END_OF_TURN]
+
+
+def test_short_burst_is_discarded():
+    segmenter = SpeechSegmenter()
+    events = segmenter.feed(silence(200) + tone(100) + silence(1000))
+
+    assert events == []
+    assert segmenter.stats()["discarded"] == 1
+    assert segmenter.stats()["turns"] == 0
+
+
+def test_long_speech_is_cut_at_max_length():
+    segmenter = SpeechSegmenter(max_segment_seconds=1, padding_ms=0)
+    events = segmenter.feed(tone(2500) + silence(1000))
+
+    segments = [event for event in events if event.kind == SEGMENT]
+    assert [(s.start_ms, s.end_ms) for s in segments] == [(0, 1000), (1000, 2000), (2000, 2500)]
+    assert kinds(events).count(SPEECH_START) == 1
+    assert kinds(events)[-1] == END_OF_TURN
+
+
+def test_flush_ends_turn_without_pause():
+    segmenter = SpeechSegmenter()
+    assert kinds(segmenter.feed(tone(500))) == [SPEECH_START]
+
+    events = segmenter.flush()
+    assert kinds(events) == [SEGMENT, END_OF_TURN]
+    assert events[0].end_ms == 500
+    assert not segmenter.in_turn
+    assert segmenter.flush() == []
+
+
+def test_flush_drops_unconfirmed_speech():
+    segmenter = SpeechSegmenter()
+    segmenter.feed(tone(100))
+    assert segmenter.flush() == []
+    assert segmenter.stats()["discarded"] == 1
+
+
+def test_chunking_does_not_change_events():
+    audio = silence(300) + tone(700) + silence(400) + tone(500) + silence(1200)
+    whole = SpeechSegmenter().feed(audio)
+
+    segmenter = SpeechSegmenter()
+    chunked = []
+    for offset in range(0, len(audio), 1234):
+        chunked += segmenter.feed(audio[offset:offset + 1234])
+
+    assert [(e.kind, e.start_ms, e.end_ms, e.pcm) for e in chunked] == \
+        [(e.kind, e.start_ms, e.end_ms, e.pcm) for e in whole]
+
+
+def test_quiet_noise_is_not_speech():
+    segmenter = SpeechSegmenter()
+    events = segmenter.feed(tone(3000, amplitude=30))
+
+    assert events == []
+    # The floor drops to the quieter level at once
+    assert segmenter.noise_dbfs < -55
+
+
+def test_steady_noise_raises_threshold():
+    # About -65 dBFS of background noise and a -58 dBFS murmur, both under the floor margin
+    noise, murmur = tone(20000, amplitude=26), tone(1000, amplitude=58)
+
+    fresh = SpeechSegmenter(threshold_dbfs=-60, noise_margin_db=10)
+    assert kinds(fresh.feed(murmur + silence(1000))) == [SPEECH_START, SEGMENT, END_OF_TURN]
+
+    segmenter = SpeechSegmenter(threshold_dbfs=-60, noise_margin_db=10)
+    assert segmenter.feed(noise) == []
+    assert -67 < segmenter.noise_dbfs < -65
+    assert segmenter.feed(murmur + noise[:32000]) == []
+    assert kinds(segmenter.feed(tone(1000) + noise[:32000])) == [SPEECH_START, SEGMENT, END_OF_TURN]
@@ -2,13 +2,160 @@
 Utility functions for audio processing and file handling
 """
 
+import hashlib
 import os
 import logging
+import threading
+import uuid
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiofiles
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 256 * 1024  # 256KB
+
+# Temporary files may still be being written; never clean them up sooner
+TEMP_FILE_GRACE_SECONDS = 3600
+
+AUDIO_MIME_TYPES = {
+    '.mp3': 'audio/mp3',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/mp4',
+    '.ogg': 'audio/ogg',
+    '.webm': 'audio/webm',
+    '.weba': 'audio/webm',
+}
+
+# MIME types for containers returned by detect_audio_format()
+CONTAINER_MIME_TYPES = {
+    'wav': 'audio/wav',
+    'ogg': 'audio/ogg',
+    'webm': 'audio/webm',
+    'flac': 'audio/flac',
+    'mp4': 'audio/mp4',
+    'mp3': 'audio/mp3',
+}
+
+
+class InFlightFiles:
+    """
+    Registry of files that requests are still using
+    
+    Holds are counted in memory. Once share() is called (multi-worker mode),
+    the first acquire and last release of each path are also recorded in the
+    shared state, so the one worker that sweeps skips files any worker is
+    using. Those writes go through a dedicated thread and never block the
+    caller; holds expire unless renew() is called.
+    """
+    
+    def __init__(self):
+        self._refs: Counter = Counter()
+        self._lock = threading.Lock()
+        self._shared = None
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._ttl_seconds = 0.0
+        self._publisher: Optional[ThreadPoolExecutor] = None
+    
+    def share(self, shared_state, ttl_seconds: float):
+        """
+        Publish holds to a cross-process store
+        
+        Args:
+            shared_state: SharedState every worker opens
+            ttl_seconds: How long a hold survives without renew()
+        """
+        with self._lock:
+            self._shared = shared_state
+            self._ttl_seconds = ttl_seconds
+            self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-holds")
+            for key in self._refs:
+                self._publish(self._shared.hold_file, key, self._owner, ttl_seconds)
+    
+    def unshare(self):
+        """Stop publishing and drop this worker's published holds"""
+        with self._lock:
+            shared, publisher = self._shared, self._publisher
+            self._shared = self._publisher = None
+        if publisher is not None:
+            publisher.shutdown(wait=True)
+            shared.release_file_holds(self._owner)
+    
+    def renew(self):
+        """Extend this worker's published holds (blocking; call from a worker thread)"""
+        shared = self._shared
+        if shared is not None:
+            shared.renew_file_holds(self._owner, self._ttl_seconds)
+    
+    def acquire(self, path: Path):
+        """Protect path from cleanup until release() is called"""
+        key = str(Path(path).resolve())
+        with self._lock:
+            self._refs[key] += 1
+            if self._refs[key] == 1 and self._shared is not None:
+                self._publish(self._shared.hold_file, key, self._owner, self._ttl_seconds)
+    
+    def release(self, path: Path):
+        """Drop one protection taken with acquire()"""
+        key = str(Path(path).resolve())
+        with self._lock:
+            self._refs[key] -= 1
+            if self._refs[key] <= 0:
+                del self._refs[key]
+                if self._shared is not None:
+                    self._publish(self._shared.release_file, key, self._owner)
+    
+    @contextmanager
+    def hold(self, path: Path):
+        """Protect path from cleanup for the duration of the block"""
+        self.acquire(path)
+        try:
+            yield
+        finally:
+            self.release(path)
+    
+    def is_held(self, path: Path) -> bool:
+        """
+        Return True if a request is still using path
+        
+        In shared mode this also asks the shared state about other workers,
+        which blocks: call it from a worker thread (as the janitor does).
+        """
+        key = str(Path(path).resolve())
+        with self._lock:
+            if self._refs[key] > 0:
+                return True
+            shared = self._shared
+        return shared is not None and shared.is_file_held(key)
+    
+    def _publish(self, func: Callable, *args):
+        """Run a shared-state write on the publisher thread (caller holds the lock, so order is kept)"""
+        future = self._publisher.submit(func, *args)
+        future.add_done_callback(_log_publish_failure)
+
+
+def _log_publish_failure(future):
+    """Report a hold that could not be recorded in the shared state"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Failed to publish file hold: {str(future.exception())}")
+
+
+# Shared by the routes (which hold files) and the retention janitor (which skips them)
+in_flight_files = InFlightFiles()
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+    
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds the maximum size of {max_size} bytes")
+        self.max_size = max_size
+
 
 def validate_audio_file(file_path: str) -> bool:
     """
@@ -52,33 +199,88 @@ def validate_audio_file(file_path: str) -> bool:
         return False
 
 
-def cleanup_old_files(directory: str, max_age_hours: int = 24):
+def cleanup_old_files(
+    directory: str,
+    max_age_hours: float = 24,
+    max_total_bytes: Optional[int] = None,
+    is_protected: Optional[Callable[[Path], bool]] = None,
+    on_delete: Optional[Callable[[Path], None]] = None
+) -> Tuple[int, int]:
     """
     Clean up old files from a directory
     
+    Files older than max_age_hours are deleted. If the directory is still
+    larger than max_total_bytes, the oldest remaining files are deleted
+    until it fits. Dotfiles (e.g. .gitkeep) and protected files are never
+    deleted. Temporary (.tmp) files are not evicted for size and are kept
+    for at least TEMP_FILE_GRACE_SECONDS, since they may still be written.
+    
     Args:
         directory: Directory path to clean
         max_age_hours: Maximum age of files in hours
+        max_total_bytes: Optional size budget for the directory
+        is_protected: Returns True for files that must be kept (e.g. in-flight)
+        on_delete: Called with the path of every deleted file
+        
+    Returns:
+        Tuple of (files deleted, bytes reclaimed)
     """
+    deleted = 0
+    reclaimed = 0
     try:
         import time
         
         dir_path = Path(directory)
         if not dir_path.exists():
-            return
+            return 0, 0
         
         current_time = time.time()
         max_age_seconds = max_age_hours * 3600
         
+        def delete(file_path: Path, size: int):
+            nonlocal deleted, reclaimed
+            try:
+                file_path.unlink()
+            except FileNotFoundError:
+                return
+            deleted += 1
+            reclaimed += size
+            logger.info(f"Deleted old file: {file_path}")
+            if on_delete is not None:
+                on_delete(file_path)
+        
+        # (mtime, path, size) of every file that survives the age pass
+        remaining = []
         for file_path in dir_path.glob("*"):
-            if file_path.is_file():
-                file_age = current_time - file_path.stat().st_mtime
-                if file_age > max_age_seconds:
-                    file_path.unlink()
-                    logger.info(f"Deleted old file: {file_path}")
+            if file_path.name.startswith(".") or not file_path.is_file():
+                continue
+            if is_protected is not None and is_protected(file_path):
+                continue
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            file_age = current_time - stat.st_mtime
+            if file_path.name.endswith(".tmp"):
+                if file_age > max(max_age_seconds, TEMP_FILE_GRACE_SECONDS):
+                    delete(file_path, stat.st_size)
+            elif file_age > max_age_seconds:
+                delete(file_path, stat.st_size)
+            else:
+                remaining.append((stat.st_mtime, file_path, stat.st_size))
+        
+        if max_total_bytes is not None:
+            total = sum(size for _, _, size in remaining)
+            for _, file_path, size in sorted(remaining, key=lambda item: item[0]):
+                if total <= max_total_bytes:
+                    break
+                delete(file_path, size)
+                total -= size
                     
     except Exception as e:
         logger.error(f"Error cleaning up files: {str(e)}")
+    
+    return deleted, reclaimed
 
 
 def ensure_directories_exist():
@@ -107,3 +309,157 @@ def get_file_size_mb(file_path: str) -> float:
     except Exception as e:
         logger.error(f"Error getting file size: {str(e)}")
         return 0.0
+
+
+def get_audio_mime_type(file_ext: str) -> str:
+    """
+    Get the MIME type for an audio file extension
+    
+    Args:
+        file_ext: File extension including the dot
+        
+    Returns:
+        MIME type (defaults to audio/webm, the browser recorder format)
+    """
+    return AUDIO_MIME_TYPES.get(file_ext.lower(), 'audio/webm')
+
+
+async def save_upload(upload, directory: Path, max_size: int, keep_contents: bool = True) -> Tuple[Path, bytearray, str]:
+    """
+    Stream an upload to disk in chunks, enforcing a size limit
+    
+    The file gets a collision-free name so concurrent uploads with the same
+    client filename never overwrite each other. Writes go through aiofiles
+    so the event loop is never blocked on disk I/O, and the received bytes
+    are returned so callers do not need to read the file back. The content
+    hash is computed chunk by chunk as the upload arrives.
+    
+    Starlette has already spooled the multipart body by the time this runs,
+    so max_size bounds what is kept rather than what is received; requests
+    declaring an oversized body are turned away earlier by
+    UploadLimitMiddleware.
+    
+    Args:
+        upload: FastAPI UploadFile
+        directory: Destination directory
+        max_size: Maximum accepted size in bytes
+        keep_contents: Return the contents (callers that only need the file pass False)
+        
+    Returns:
+        Tuple of (saved file path, file contents or an empty buffer, SHA-256 hex digest of the contents)
+        
+    Raises:
+        UploadTooLargeError: If the upload exceeds max_size (partial file is removed)
+    """
+    file_ext = Path(upload.filename or "").suffix.lower()
+    path = Path(directory) / f"{uuid.uuid4().hex}{file_ext}"
+    data = bytearray()
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        with in_flight_files.hold(path):
+            async with aiofiles.open(path, "wb") as f:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise UploadTooLargeError(max_size)
+                    if keep_contents:
+                        data.extend(chunk)
+                    digest.update(chunk)
+                    await f.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    
+    # The buffer is returned as is; copying it to bytes would hold the upload twice
+    return path, data, digest.hexdigest()
+
+
+def write_file_atomic(path: Path, data: bytes) -> int:
+    """
+    Write a file via a temporary name and rename it into place
+    
+    Readers (including other worker processes) never observe a partially
+    written file.
+    
+    Args:
+        path: Final file path
+        data: File contents
+        
+    Returns:
+        Modification time of the written file in nanoseconds
+    """
+    path = Path(path)
+    temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return path.stat().st_mtime_ns
+
+
+def write_zip_archive(path: Path, members: List[Tuple[str, Path]], extra: Optional[Dict[str, bytes]] = None) -> int:
+    """
+    Bundle files into a zip archive, written atomically
+    
+    Members are stored without compression (MP3 does not compress further)
+    and streamed from disk. Files that disappeared are skipped.
+    
+    Args:
+        path: Final archive path
+        members: (name inside the archive, file on disk) pairs
+        extra: Additional in-memory entries (e.g. a manifest)
+        
+    Returns:
+        Number of files from members that were added
+    """
+    path = Path(path)
+    temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    added = 0
+    try:
+        with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for arcname, member_path in members:
+                try:
+                    archive.write(member_path, arcname)
+                    added += 1
+                except FileNotFoundError:
+                    logger.warning(f"Skipping missing archive member: {member_path}")
+            for arcname, data in (extra or {}).items():
+                archive.writestr(arcname, data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return added
+
+
+def detect_audio_format(data: bytes) -> Optional[str]:
+    """
+    Detect the audio container from its leading magic bytes
+    
+    Args:
+        data: Start of the audio file (the first 12 bytes are enough)
+        
+    Returns:
+        Container name ('wav', 'ogg', 'webm', 'mp3', 'mp4', 'flac') or None if unknown
+    """
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        return 'wav'
+    if data[:4] == b'OggS':
+        return 'ogg'
+    if data[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if data[:4] == b'fLaC':
+        return 'flac'
+    if data[4:8] == b'ftyp':
+        return 'mp4'
+    if data[:3] == b'ID3' or (len(data) > 1 and data[0] == 0xFF and (data[1] & 0xE0) == 0xE0):
+        return 'mp3'
+    return None
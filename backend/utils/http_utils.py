@@ -0,0 +1,103 @@
+"""
+Utility functions for HTTP conditional and partial responses and content negotiation
+"""
+
+from typing import List, Optional, Tuple
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised when a Range header cannot be served for the resource size"""
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range from a Range header
+
+    Supports "bytes=start-end", "bytes=start-" and "bytes=-suffix". Multiple
+    ranges are not supported and are treated as no range (full response).
+
+    Args:
+        range_header: Value of the Range header (or None)
+        size: Size of the resource in bytes
+
+    Returns:
+        Inclusive (start, end) byte positions, or None to serve the whole resource
+
+    Raises:
+        RangeNotSatisfiableError: If the range lies outside the resource
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    start_text, end_text = (part.strip() for part in spec.split("-", 1))
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiableError(range_header)
+            return max(0, size - length), size - 1
+
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        raise RangeNotSatisfiableError(range_header)
+    return start, min(end, size - 1)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+
+    Args:
+        if_none_match: Value of the If-None-Match header (or None)
+        etag: Current quoted ETag of the resource
+
+    Returns:
+        True if the client's cached copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_accept(accept: Optional[str]) -> List[Tuple[str, float]]:
+    """
+    Parse an Accept header into media ranges ordered by preference
+
+    Args:
+        accept: Value of the Accept header (or None)
+
+    Returns:
+        (media range, quality) pairs, lowercased and without parameters other
+        than q, highest quality first; ties keep the client's order
+    """
+    if not accept:
+        return []
+
+    ranges = []
+    for item in accept.split(","):
+        media_range, *params = (part.strip() for part in item.split(";"))
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_range.lower(), quality))
+    return sorted(ranges, key=lambda item: -item[1])
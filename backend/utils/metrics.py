@@ -0,0 +1,280 @@
+"""
+Utility classes for Prometheus-style metrics
+A small in-process registry (counters and histograms) rendered in the
+Prometheus text exposition format, plus an ASGI middleware for HTTP metrics
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Starlette appends "; charset=utf-8" to text responses
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; covers cache hits (milliseconds) up to slow Gemini calls under rate limiting
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (labels, value) pairs produced by a collector callback
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Add amount to the counter for the given labels"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            labels = _format_labels(dict(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets per label set"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation for the given labels"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors, and renders them all"""
+
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(
+        self,
+        name: str,
+        metric_type: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Sample]]
+    ):
+        """
+        Register a metric whose samples are read at scrape time
+
+        Used for figures components already track (cache hits, queue depth),
+        so the hot path pays nothing extra for them.
+
+        Args:
+            name: Metric name
+            metric_type: "counter" or "gauge"
+            documentation: HELP text
+            collect: Callable returning (labels, value) pairs
+        """
+        self._collectors.append((name, metric_type, documentation, collect))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, metric_type, documentation, collect in self._collectors:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def error_class(exc: BaseException) -> str:
+    """Short label for an exception: the upstream HTTP status when known, else the type name"""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return f"http_{status}"
+    return type(exc).__name__
+
+
+REGISTRY = MetricsRegistry()
+
+# Application metrics
+STAGE_SECONDS = REGISTRY.histogram(
+    "hindi_stage_duration_seconds",
+    "Time spent in each pipeline stage (upload, preprocess, transcribe, generate, tts, ...)",
+    ["stage"]
+)
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "hindi_rate_limit_wait_seconds",
+    "Time spent queued for a Gemini rate limit slot",
+    ["priority"]
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "hindi_upstream_errors_total",
+    "Failed transcription, generation and TTS calls by error class",
+    ["stage", "error_class"]
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "hindi_upstream_retries_total",
+    "Gemini calls retried after a rate-limit or transient failure",
+    ["stage", "kind"]
+)
+VOICE_REPLY_SECONDS = REGISTRY.histogram(
+    "hindi_voice_reply_latency_seconds",
+    "Voice WebSocket: end of speech to the first reply audio sent",
+    buckets=(0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "hindi_http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "hindi_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["route"]
+)
+HTTP_RECEIVED_BYTES = REGISTRY.counter(
+    "hindi_http_received_bytes_total",
+    "Request body bytes received by route",
+    ["route"]
+)
+HTTP_SENT_BYTES = REGISTRY.counter(
+    "hindi_http_sent_bytes_total",
+    "Response body bytes sent by route",
+    ["route"]
+)
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording request counts, latency and body sizes per route"""
+
+    def __init__(self, app):
+        self.app = app
+        # endpoint -> route path template, built on first use
+        self._route_paths: Optional[Dict[Callable, str]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        received = 0
+        sent = 0
+
+        async def receive_wrapper():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            # The router stores the matched endpoint in the shared scope
+            route = self._route_path(scope)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route)
+            if received:
+                HTTP_RECEIVED_BYTES.inc(received, route=route)
+            if sent:
+                HTTP_SENT_BYTES.inc(sent, route=route)
+
+    def _route_path(self, scope) -> str:
+        """Route template for the request (keeps label cardinality bounded)"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in getattr(scope.get("app"), "routes", [])
+                if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
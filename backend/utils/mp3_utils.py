@@ -0,0 +1,135 @@
+"""
+Utility functions for MP3 streams
+Frame-level parsing used to join separately synthesized clips without re-encoding
+"""
+
+from typing import List, Optional
+
+# Bitrates in kbps by (MPEG-1?, layer) and bitrate index 1-14
+_BITRATES = {
+    (True, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Sample rates by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def frame_length(header: bytes) -> Optional[int]:
+    """
+    Length in bytes of the MPEG audio frame starting with header
+
+    Args:
+        header: At least the 4 header bytes of a frame
+
+    Returns:
+        Frame length including the header, or None if header is not a valid frame header
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        # Reserved values, or free-format bitrate (length cannot be derived)
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index - 1] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x01
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    samples_per_frame = 576 if layer == 3 and not mpeg1 else 1152
+    return samples_per_frame // 8 * bitrate // sample_rate + padding
+
+
+def strip_id3(data: bytes) -> bytes:
+    """
+    Remove ID3v2 tags at the start and an ID3v1 tag at the end
+
+    Args:
+        data: MP3 file contents
+
+    Returns:
+        The audio frames without tags
+    """
+    start = 0
+    while data[start:start + 3] == b"ID3" and len(data) >= start + 10:
+        size = 0
+        for byte in data[start + 6:start + 10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[start + 5] & 0x10 else 0
+        start += 10 + size + footer
+    end = len(data)
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return data[start:end]
+
+
+def _is_info_frame(frame: bytes) -> bool:
+    """True for the Xing/Info/VBRI frame encoders put first (it describes the whole file)"""
+    mpeg1 = ((frame[1] >> 3) & 0x03) == 3
+    mono = (frame[3] >> 6) == 3
+    crc = 0 if frame[1] & 0x01 else 2
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    offset = 4 + crc + side_info
+    return frame[offset:offset + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def split_frames(data: bytes) -> List[bytes]:
+    """
+    Split an MP3 stream into its audio frames
+
+    Tags and the Xing/Info header frame are dropped; bytes between frames
+    that do not parse are skipped until the next frame header.
+
+    Args:
+        data: MP3 file contents
+
+    Returns:
+        Audio frames in order
+    """
+    data = strip_id3(data)
+    frames = []
+    position = 0
+    while position + 4 <= len(data):
+        length = frame_length(data[position:position + 4])
+        if length is None:
+            # Resynchronize on the next possible frame header
+            position = data.find(b"\xff", position + 1)
+            if position < 0:
+                break
+            continue
+        frame = data[position:position + length]
+        if frames or not _is_info_frame(frame):
+            frames.append(frame)
+        position += length
+    return frames
+
+
+def concat_mp3(parts: List[bytes]) -> bytes:
+    """
+    Join MP3 clips into one stream without re-encoding
+
+    Frames are copied as-is; per-clip tags and Xing/Info headers are dropped,
+    because a header from the first clip would misreport the joined length.
+    Clips that contain no parsable frames are appended unchanged.
+
+    Args:
+        parts: MP3 clips in playback order
+
+    Returns:
+        One MP3 stream
+    """
+    joined = bytearray()
+    for part in parts:
+        frames = split_frames(part)
+        joined += b"".join(frames) if frames else strip_id3(part)
+    return bytes(joined)
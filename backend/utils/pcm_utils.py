@@ -0,0 +1,56 @@
+"""
+Utility functions for raw PCM audio
+Level measurement and WAV framing for 16-bit mono PCM streamed by clients
+"""
+
+import io
+import math
+import sys
+import wave
+from array import array
+
+SAMPLE_WIDTH = 2  # bytes per 16-bit sample
+
+# Level reported for digital silence
+SILENCE_DBFS = -100.0
+
+
+def frame_dbfs(frame: bytes) -> float:
+    """
+    RMS level of a block of 16-bit little-endian PCM
+
+    Args:
+        frame: PCM samples (an odd trailing byte is ignored)
+
+    Returns:
+        Level in dBFS (0 for a full-scale square wave, SILENCE_DBFS for silence)
+    """
+    samples = array("h", frame[:len(frame) - len(frame) % SAMPLE_WIDTH])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return SILENCE_DBFS
+    mean_square = sum(sample * sample for sample in samples) / len(samples)
+    if mean_square <= 0:
+        return SILENCE_DBFS
+    return max(SILENCE_DBFS, 10 * math.log10(mean_square / (32768 * 32768)))
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """
+    Wrap 16-bit mono PCM in a WAV container
+
+    Args:
+        pcm: PCM samples
+        sample_rate: Samples per second
+
+    Returns:
+        WAV file contents
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
@@ -0,0 +1,197 @@
+"""
+Utility functions for Hindi text handling
+"""
+
+import re
+import unicodedata
+from typing import List
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for use in cache keys
+
+    Applies Unicode NFC normalization and collapses runs of whitespace so
+    that visually identical strings map to the same key.
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Normalized text
+    """
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+# Danda variants and ASCII stand-ins commonly typed for them
+_DANDA_RE = re.compile(r"\s*(?:॥|\||।)+\s*")
+_TRAILING_PUNCT_RE = re.compile(r"[\s।?!.,;:]+$")
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([।?!.,;:])")
+
+
+def normalize_hindi_text(text: str) -> str:
+    """
+    Normalize Hindi user input for response memoization
+
+    On top of normalize_text(), folds danda variants (॥, |) into a single
+    danda, drops whitespace before punctuation and strips trailing sentence
+    punctuation, so "नमस्ते।" and "नमस्ते ||" produce the same key.
+
+    Args:
+        text: Hindi text to normalize
+
+    Returns:
+        Normalized text
+    """
+    text = normalize_text(text).casefold()
+    text = _DANDA_RE.sub("। ", text)
+    text = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", text)
+    text = _TRAILING_PUNCT_RE.sub("", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+# Sentence terminators in Hindi output: danda, double danda, ? and !
+_SENTENCE_END_RE = re.compile(r"[^।॥?!]*[।॥?!]+")
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text at Devanagari sentence boundaries"""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Add streamed text and return any sentences it completed
+
+        Args:
+            chunk: Next piece of streamed text
+
+        Returns:
+            Complete sentences, in order
+        """
+        self._buffer += chunk
+        sentences = []
+        consumed = 0
+        for match in _SENTENCE_END_RE.finditer(self._buffer):
+            sentence = match.group().strip()
+            if sentence:
+                sentences.append(sentence)
+            consumed = match.end()
+        self._buffer = self._buffer[consumed:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        Return whatever text is left once the stream has ended
+
+        Returns:
+            The trailing sentence, if any
+        """
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return [remainder] if remainder else []
+
+
+# Clause boundaries inside a sentence: comma, semicolon, colon and dashes
+_CLAUSE_END_RE = re.compile(r"[^,;:—–]*[,;:—–]+")
+
+
+def split_for_tts(text: str, max_chars: int = 100) -> List[str]:
+    """
+    Split text into segments that can be synthesized independently
+
+    Every sentence (ending in a danda, ? or !) starts a new segment, so
+    segments line up with the sentences the streaming endpoint synthesizes
+    and share their cached audio. Sentences longer than max_chars are broken
+    at clause punctuation, then between words; clauses are merged back up
+    to max_chars so a long sentence is not over-fragmented.
+
+    Args:
+        text: Text to split
+        max_chars: Target maximum segment length (a single longer word stays whole)
+
+    Returns:
+        Segments in order
+    """
+    splitter = SentenceSplitter()
+    sentences = splitter.feed(text) + splitter.flush()
+
+    segments = []
+    for sentence in sentences:
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+
+        pieces = []
+        consumed = 0
+        for match in _CLAUSE_END_RE.finditer(sentence):
+            pieces.append(match.group().strip())
+            consumed = match.end()
+        pieces.append(sentence[consumed:].strip())
+
+        current = ""
+        for piece in pieces:
+            for part in _split_words(piece, max_chars) if len(piece) > max_chars else [piece]:
+                if not part:
+                    continue
+                if current and len(current) + 1 + len(part) > max_chars:
+                    segments.append(current)
+                    current = part
+                else:
+                    current = f"{current} {part}" if current else part
+        if current:
+            segments.append(current)
+    return segments
+
+
+def _split_words(text: str, max_chars: int) -> List[str]:
+    """Break text between words into pieces of at most max_chars"""
+    pieces = []
+    current = ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _comparable_word(word: str) -> str:
+    """Strip punctuation so overlapping words compare equal across segments"""
+    return word.strip("।॥?!.,;:\"'").casefold()
+
+
+def merge_overlapping_transcripts(parts: List[str], max_overlap_words: int = 12) -> str:
+    """
+    Join transcripts of overlapping audio segments
+
+    Consecutive segments share a little audio, so the end of one transcript
+    usually repeats at the start of the next. The longest such repeated run
+    of words (up to max_overlap_words) is dropped from the later transcript.
+
+    Args:
+        parts: Transcripts in segment order
+        max_overlap_words: Longest word run considered a duplicate
+
+    Returns:
+        The stitched transcript
+    """
+    words: List[str] = []
+    for part in parts:
+        next_words = part.split()
+        limit = min(max_overlap_words, len(words), len(next_words))
+        for size in range(limit, 0, -1):
+            tail = [_comparable_word(w) for w in words[-size:]]
+            head = [_comparable_word(w) for w in next_words[:size]]
+            if tail == head:
+                next_words = next_words[size:]
+                break
+        words.extend(next_words)
+    return " ".join(words)
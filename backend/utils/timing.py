@@ -0,0 +1,66 @@
+"""
+Utility functions for per-request stage timing
+Stage durations are reported to clients in a Server-Timing header and
+recorded in the stage latency histogram served on /metrics
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.metrics import STAGE_SECONDS
+
+
+class StageTimer:
+    """Accumulates wall-clock time spent in named pipeline stages"""
+
+    def __init__(self, record_metrics: bool = True):
+        """
+        Initialize the timer
+
+        Args:
+            record_metrics: Also observe each stage in the stage latency histogram
+                (off for timings that are not pipeline stages, e.g. startup)
+        """
+        self.record_metrics = record_metrics
+        # stage name -> milliseconds, in the order stages first ran
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block under name (repeated stages add up)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed * 1000
+            if self.record_metrics:
+                STAGE_SECONDS.observe(elapsed, stage=name)
+
+    def header(self) -> str:
+        """Format the stages as a Server-Timing header value"""
+        return ", ".join(f"{name};dur={duration:.2f}" for name, duration in self.stages.items())
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a Server-Timing header into stage durations
+
+    Args:
+        header: Value of the Server-Timing header (or None)
+
+    Returns:
+        Dict of stage name -> milliseconds (metrics without a duration are skipped)
+    """
+    stages = {}
+    for metric in (header or "").split(","):
+        name, _, params = metric.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages